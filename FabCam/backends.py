@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+카메라 백엔드 - 카메라 감지, 스트림 캡처, 스냅샷 촬영 명령을 한곳에서 생성
+
+  - rpicam: 라즈베리파이 카메라 (rpicam-hello / rpicam-vid / rpicam-still)
+  - replay: 하드웨어 없이 MJPEG 파일, 일반 동영상(ffmpeg로 MJPEG 변환), 합성 프레임을
+            같은 FIFO/stdout 경로로 출력 (일반 리눅스 PC에서 서버 전체 실행/프로파일링용)
+
+SharedStreamManager와 CameraManager는 명령만 받아 실행하므로 프로세스 관리, FIFO 읽기,
+카메라 넘겨주기(run_exclusive) 등은 백엔드와 무관하게 그대로 동작한다.
+백엔드 선택: FABCAM_CAMERA_BACKEND=rpicam(기본) | replay
+"""
+
+import os
+import subprocess
+import sys
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from replay import read_stamp
+
+REPLAY_SCRIPT = Path(__file__).with_name("replay.py")
+MJPEG_SUFFIXES = (".mjpeg", ".mjpg")
+
+
+class CameraBackend(ABC):
+    """카메라 백엔드 인터페이스 (빠진 메서드가 있으면 생성 시 TypeError)"""
+
+    name = "base"
+    still_source = "still"  # 스냅샷 응답의 source 값
+    process_names: Tuple[str, ...] = ()  # 리소스 모니터가 추적할 프로세스 이름
+
+    @abstractmethod
+    def detect_cameras(self) -> Optional[int]:
+        """사용 가능한 카메라 수 (감지 실패 시 None)"""
+
+    @abstractmethod
+    def video_command(self, camera_num: int, width: int, height: int, framerate: int, output: str) -> List[str]:
+        """MJPEG 스트림을 output(FIFO 경로 또는 "-" = stdout)에 계속 쓰는 명령"""
+
+    @abstractmethod
+    def still_command(self, camera_num: int, width: int, height: int, output: str) -> List[str]:
+        """JPEG 한 장을 output에 저장하는 명령"""
+
+    def capture_time(self, data: bytes) -> Optional[float]:
+        """프레임이 캡처된 epoch 초 (소스가 프레임에 기록하지 않으면 None - FIFO 수신 시각을 대신 사용)"""
+        return None
+
+
+class RpicamBackend(CameraBackend):
+    """라즈베리파이 카메라 (rpicam-apps)"""
+
+    name = "rpicam"
+    still_source = "rpicam-still"
+    process_names = ("rpicam-vid", "rpicam-still")
+
+    def detect_cameras(self) -> Optional[int]:
+        result = subprocess.run(
+            ["rpicam-hello", "--list-cameras"],
+            capture_output=True,
+            text=True,
+            timeout=3
+        )
+        if result.returncode != 0 or "Available cameras" not in result.stdout:
+            return None
+        return sum(1 for line in result.stdout.split('\n') if line.strip().startswith(('0 :', '1 :')))
+
+    def video_command(self, camera_num: int, width: int, height: int, framerate: int, output: str) -> List[str]:
+        return [
+            "rpicam-vid",
+            "--camera", str(camera_num),
+            "--width", str(width),
+            "--height", str(height),
+            "--framerate", str(framerate),
+            "--codec", "mjpeg",
+            "--output", output,
+            "--timeout", "0",  # 무한 실행
+            "--nopreview"
+        ]
+
+    def still_command(self, camera_num: int, width: int, height: int, output: str) -> List[str]:
+        return [
+            "rpicam-still",
+            "--camera", str(camera_num),
+            "--width", str(width),
+            "--height", str(height),
+            "-o", output,
+            "-t", "100",
+            "--nopreview"
+        ]
+
+
+class ReplayBackend(CameraBackend):
+    """파일/합성 프레임 재생 (카메라 하드웨어 불필요)
+
+    sources: 카메라별 소스 ("synthetic", MJPEG 파일, ffmpeg가 읽을 수 있는 동영상), 하나면 모든 카메라 공통
+    fps: 출력 속도 (None이면 스트림 설정 framerate)
+    """
+
+    name = "replay"
+    still_source = "replay"
+    process_names = ("replay.py", "ffmpeg")
+
+    def __init__(self, sources: List[str], cameras: int = 2, fps: Optional[float] = None):
+        self.sources = sources or ["synthetic"]
+        self.cameras = cameras
+        self.fps = fps
+
+    def source_for(self, camera_num: int) -> str:
+        return self.sources[camera_num] if camera_num < len(self.sources) else self.sources[-1]
+
+    def detect_cameras(self) -> Optional[int]:
+        for camera_num in range(self.cameras):
+            source = self.source_for(camera_num)
+            if source != "synthetic" and not Path(source).is_file():
+                print(f"❌ 재생 소스 없음 (카메라 {camera_num}): {source}")
+                return camera_num
+        return self.cameras
+
+    def video_command(self, camera_num: int, width: int, height: int, framerate: int, output: str) -> List[str]:
+        source = self.source_for(camera_num)
+        fps = self.fps or framerate
+        if self._replays_frames(source):
+            return self._replay_command(camera_num, source, width, height, output) + ["--framerate", str(fps)]
+        # 그 밖의 동영상(H.264/MP4 등)은 ffmpeg가 실시간 속도로 디코딩해 MJPEG로 출력 (끝나면 처음부터 반복)
+        return [
+            "ffmpeg", "-hide_banner", "-loglevel", "error", "-nostdin",
+            "-re", "-stream_loop", "-1", "-i", source,
+            "-an", "-vf", f"scale={width}:{height},fps={fps}",
+            "-c:v", "mjpeg", "-q:v", "5", "-f", "mjpeg", "-y", "pipe:1" if output == "-" else output
+        ]
+
+    def still_command(self, camera_num: int, width: int, height: int, output: str) -> List[str]:
+        source = self.source_for(camera_num)
+        if self._replays_frames(source):
+            return self._replay_command(camera_num, source, width, height, output) + ["--still"]
+        return [
+            "ffmpeg", "-hide_banner", "-loglevel", "error", "-nostdin",
+            "-i", source, "-frames:v", "1", "-vf", f"scale={width}:{height}", "-q:v", "2", "-y", output
+        ]
+
+    def capture_time(self, data: bytes) -> Optional[float]:
+        """replay.py가 프레임에 넣은 출력 시각 (ffmpeg 변환 소스는 None)"""
+        stamp = read_stamp(data)
+        return stamp[1] if stamp else None
+
+    @staticmethod
+    def _replays_frames(source: str) -> bool:
+        """replay.py가 직접 내보내는 소스인지 (그 밖의 동영상은 ffmpeg가 변환)"""
+        return source == "synthetic" or source.lower().endswith(MJPEG_SUFFIXES)
+
+    def _replay_command(self, camera_num: int, source: str, width: int, height: int, output: str) -> List[str]:
+        return [
+            sys.executable, str(REPLAY_SCRIPT),
+            "--camera", str(camera_num),
+            "--source", source,
+            "--width", str(width),
+            "--height", str(height),
+            "--output", output
+        ]
+
+
+def backend_from_env() -> CameraBackend:
+    """FABCAM_CAMERA_BACKEND, FABCAM_REPLAY_SOURCE/CAMERAS/FPS 환경 변수로 생성"""
+    name = os.environ.get("FABCAM_CAMERA_BACKEND", "rpicam").strip().lower()
+    if name == "replay":
+        sources = [item.strip() for item in os.environ.get("FABCAM_REPLAY_SOURCE", "synthetic").split(",") if item.strip()]
+        fps = os.environ.get("FABCAM_REPLAY_FPS")
+        return ReplayBackend(
+            sources,
+            cameras=int(os.environ.get("FABCAM_REPLAY_CAMERAS", "2")),
+            fps=float(fps) if fps else None
+        )
+    if name != "rpicam":
+        print(f"⚠️ 알 수 없는 카메라 백엔드 '{name}' - rpicam 사용")
+    return RpicamBackend()
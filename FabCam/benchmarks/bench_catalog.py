@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+파일 카탈로그 페이지 조회 비용 - 파일 수에 따른 /api/files 한 페이지 응답 시간
+
+임시 static 디렉토리에 블랙박스 세그먼트 형태의 빈 파일을 N개 만들고 다음을 비교한다:
+  - 기존 방식: listdir + stat 전체 후 정렬
+  - 카탈로그: 첫 페이지, 필터(카메라 + 시간 범위) 페이지, 커서로 100페이지 넘긴 뒤의 페이지
+
+사용법:
+    python benchmarks/bench_catalog.py [--sizes 1000 10000 50000] [--limit 50]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from catalog import FileCatalog  # noqa: E402
+
+BASE_TIME = 1_767_225_600  # 2026-01-01 00:00 UTC
+
+
+def populate(static_dir: Path, count: int):
+    """30초 간격 세그먼트 파일 생성 (카메라 2대에 번갈아)"""
+    for cam in (0, 1):
+        (static_dir / "rec" / f"camera{cam}").mkdir(parents=True, exist_ok=True)
+    for i in range(count):
+        cam = i % 2
+        path = static_dir / "rec" / f"camera{cam}" / f"rec_{cam}_{i:08d}.mp4"
+        path.touch()
+        ts = BASE_TIME + i * 30
+        os.utime(path, (ts, ts))
+
+
+def listdir_scan(static_dir: Path) -> list:
+    """기존 get_files 방식"""
+    files = []
+    for cam_dir in (static_dir / "rec").iterdir():
+        for name in os.listdir(cam_dir):
+            stat = os.stat(cam_dir / name)
+            files.append((stat.st_mtime, name))
+    return sorted(files, reverse=True)
+
+
+def timed(func, repeat: int = 20) -> float:
+    """최소 소요 시간 (ms)"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    ap.add_argument("--limit", type=int, default=50)
+    args = ap.parse_args()
+
+    print(f"{'파일 수':>8} {'listdir+stat(ms)':>17} {'첫 페이지(ms)':>14} {'필터(ms)':>9} {'100페이지 뒤(ms)':>16} {'동기화(s)':>10}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            static_dir = Path(tmp) / "static"
+            populate(static_dir, size)
+            catalog = FileCatalog(Path(tmp) / "catalog.db", static_dir)
+
+            started = time.perf_counter()
+            catalog.reconcile()
+            reconcile_s = time.perf_counter() - started
+
+            # 100페이지 넘긴 커서
+            cursor = None
+            for _ in range(min(100, size // args.limit - 1)):
+                cursor = catalog.query(cursor=cursor, limit=args.limit)["next_cursor"]
+
+            since = BASE_TIME + size * 15  # 시간 범위 가운데
+            scan_ms = timed(lambda: listdir_scan(static_dir), repeat=3)
+            first_ms = timed(lambda: catalog.query(limit=args.limit))
+            filter_ms = timed(lambda: catalog.query(file_types=["rec"], camera=1, since=since,
+                                                    until=since + 3600, limit=args.limit))
+            deep_ms = timed(lambda: catalog.query(cursor=cursor, limit=args.limit))
+            catalog.close()
+
+        print(f"{size:>8} {scan_ms:>17.1f} {first_ms:>14.2f} {filter_ms:>9.2f} {deep_ms:>16.2f} {reconcile_s:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
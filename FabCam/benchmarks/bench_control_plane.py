@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+제어 API가 실시간 프레임 전달을 막는지 확인 - 스냅샷/녹화 요청 중 프레임 간격 측정
+
+서버(main.app)를 같은 프로세스의 별도 스레드에서 띄우고, 시청자 하나가
+/video_feed/0을 받는 동안 스냅샷·수동 녹화 API를 차례로 호출한다.
+각 요청 구간에서 측정하는 값:
+  - 최대 프레임 간격: 시청자에게 프레임이 끊긴 최장 시간
+  - 최대 상태 응답 시간: 50 ms마다 보내는 /api/camera/status 응답 시간 (이벤트 루프 정체)
+
+rpicam-still(hd/fhd) 스냅샷은 카메라를 잠시 넘겨주므로 프레임 간격이 늘어나는 것이
+정상이며, 이때도 상태 응답 시간은 짧아야 한다.
+
+사용법:
+    python benchmarks/bench_control_plane.py [--port 8011]
+"""
+
+import argparse
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import uvicorn  # noqa: E402
+
+from main import app  # noqa: E402
+
+
+async def http_request(port: int, method: str, path: str) -> float:
+    """요청 한 번의 응답 시간 (ms)"""
+    started = time.perf_counter()
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: 0\r\nConnection: close\r\n\r\n".encode())
+    await writer.drain()
+    await reader.read()
+    writer.close()
+    return (time.perf_counter() - started) * 1000
+
+
+async def viewer(port: int, arrivals: list, stop: asyncio.Event):
+    """MJPEG 스트림을 받아 프레임 도착 시각 기록"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"GET /video_feed/0 HTTP/1.1\r\nHost: localhost\r\n\r\n")
+    await writer.drain()
+    while not stop.is_set():
+        chunk = await reader.read(65536)
+        if not chunk:
+            break
+        # 파트 헤더마다 한 프레임
+        for _ in range(chunk.count(b"Content-Type: image/jpeg")):
+            arrivals.append(time.perf_counter())
+    writer.close()
+
+
+async def probe(port: int, samples: list, stop: asyncio.Event):
+    """상태 API 응답 시간 주기 측정"""
+    while not stop.is_set():
+        samples.append((time.perf_counter(), await http_request(port, "GET", "/api/camera/status")))
+        await asyncio.sleep(0.05)
+
+
+def max_gap(arrivals: list, start: float, end: float) -> float:
+    """구간 안에서 프레임이 끊긴 최장 시간 (구간 시작 직전 프레임과 구간 끝까지 포함)"""
+    before = [t for t in arrivals if t < start][-1:]
+    window = before + [t for t in arrivals if start <= t <= end] + [end]
+    if len(window) < 2:
+        return float("nan")
+    return max(b - a for a, b in zip(window, window[1:])) * 1000
+
+
+async def run(port: int):
+    arrivals: list = []
+    samples: list = []
+    stop = asyncio.Event()
+    tasks = [asyncio.create_task(viewer(port, arrivals, stop)), asyncio.create_task(probe(port, samples, stop))]
+
+    await asyncio.sleep(2.0)  # 스트림 안정화
+
+    actions = [
+        ("기준 (요청 없음)", None, None),
+        ("스냅샷 vga (스트림 프레임)", "POST", "/api/snapshot/0?resolution=vga"),
+        ("수동 녹화 시작", "POST", "/api/recording/start"),
+        ("수동 녹화 중지", "POST", "/api/recording/stop"),
+        ("스냅샷 hd (rpicam-still)", "POST", "/api/snapshot/0?resolution=hd"),
+    ]
+    results = []
+    for name, method, path in actions:
+        start = time.perf_counter()
+        elapsed = await http_request(port, method, path) if method else 0.0
+        await asyncio.sleep(1.0)  # 요청 직후 구간까지 관찰
+        end = time.perf_counter()
+        probe_max = max((ms for t, ms in samples if start <= t <= end), default=float("nan"))
+        results.append((name, elapsed, max_gap(arrivals, start, end), probe_max))
+
+    stop.set()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    print(f"\n{'구간':<26} {'요청(ms)':>9} {'최대 프레임 간격(ms)':>20} {'최대 상태 응답(ms)':>18}")
+    for name, elapsed, gap, probe_ms in results:
+        print(f"{name:<26} {elapsed:>9.1f} {gap:>20.1f} {probe_ms:>18.1f}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8011)
+    args = ap.parse_args()
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    try:
+        asyncio.run(run(args.port))
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
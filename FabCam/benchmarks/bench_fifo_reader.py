@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+FIFO 리더 대기 방식 비교 - 10 ms sleep 폴링 vs selectors 이벤트 대기
+
+합성 MJPEG 프레임을 30 FPS로 FIFO에 쓰고(스트리밍 구간), 이어서 아무것도
+쓰지 않는 구간(유휴)을 둔 뒤 리더의 초당 깨어남 횟수와 프레임 지연을 측정한다.
+
+사용법:
+    python benchmarks/bench_fifo_reader.py [--seconds 5] [--idle 3]
+"""
+
+import argparse
+import os
+import random
+import selectors
+import statistics
+import struct
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mjpeg import MJPEGFrameParser, SOI, EOI  # noqa: E402
+
+
+def writer(path: str, fps: int, seconds: float, idle: float, sent: dict):
+    """프레임 번호를 페이로드에 담아 일정 간격으로 기록"""
+    rng = random.Random(0)
+    fd = os.open(path, os.O_WRONLY)
+    try:
+        interval = 1.0 / fps
+        next_due = time.perf_counter()
+        for seq in range(int(seconds * fps)):
+            payload = struct.pack(">I", seq) + rng.randbytes(30 * 1024).replace(b"\xff", b"\xfe")
+            view = memoryview(SOI + payload)
+            while view:
+                view = view[os.write(fd, view):]
+            # EOI를 쓰기 직전 시각 기록 (리더는 EOI 이후에만 프레임을 완성)
+            sent[seq] = time.perf_counter()
+            os.write(fd, EOI)
+            next_due += interval
+            time.sleep(max(0.0, next_due - time.perf_counter()))
+        time.sleep(idle)
+    finally:
+        os.close(fd)
+
+
+def poll_reader(fd: int, on_frame, stop: threading.Event) -> int:
+    """기존 방식: non-blocking read + 10 ms sleep"""
+    parser = MJPEGFrameParser()
+    wakeups = 0
+    while not stop.is_set():
+        wakeups += 1
+        try:
+            if not parser.read_from(fd):
+                time.sleep(0.01)
+                continue
+        except BlockingIOError:
+            time.sleep(0.01)
+            continue
+        for frame in parser.frames_available():
+            on_frame(frame)
+    return wakeups
+
+
+def selector_reader(fd: int, on_frame, stop: threading.Event) -> int:
+    """개선 방식: selectors로 읽기 가능할 때만 깨어남"""
+    parser = MJPEGFrameParser()
+    wakeups = 0
+    with selectors.DefaultSelector() as sel:
+        sel.register(fd, selectors.EVENT_READ)
+        while not stop.is_set():
+            events = sel.select(timeout=1.0)
+            wakeups += 1
+            if not events:
+                continue
+            try:
+                if not parser.read_from(fd):
+                    break
+            except BlockingIOError:
+                continue
+            for frame in parser.frames_available():
+                on_frame(frame)
+    return wakeups
+
+
+def measure(name: str, reader, fps: int, seconds: float, idle: float) -> dict:
+    tmp_dir = tempfile.TemporaryDirectory()
+    path = os.path.join(tmp_dir.name, "bench_fifo")
+    os.mkfifo(path)
+
+    sent: dict = {}
+    latencies = []
+
+    def on_frame(frame):
+        seq = struct.unpack(">I", frame.data[2:6])[0]
+        latencies.append(time.perf_counter() - sent[seq])
+
+    fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+    stop = threading.Event()
+    counter = {}
+
+    def run_reader():
+        counter["wakeups"] = reader(fd, on_frame, stop)
+
+    w = threading.Thread(target=writer, args=(path, fps, seconds, idle, sent))
+    r = threading.Thread(target=run_reader)
+    r.start()
+    started = time.perf_counter()
+    w.start()
+    w.join()
+    stop.set()
+    r.join()
+    elapsed = time.perf_counter() - started
+    os.close(fd)
+    tmp_dir.cleanup()
+
+    latencies_ms = sorted(x * 1000 for x in latencies)
+    return {
+        "reader": name,
+        "frames": len(latencies),
+        "wakeups_per_s": round(counter["wakeups"] / elapsed, 1),
+        "latency_mean_ms": round(statistics.mean(latencies_ms), 2),
+        "latency_p99_ms": round(latencies_ms[int(len(latencies_ms) * 0.99) - 1], 2),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--fps", type=int, default=30)
+    ap.add_argument("--seconds", type=float, default=5.0, help="스트리밍 구간 길이")
+    ap.add_argument("--idle", type=float, default=3.0, help="유휴 구간 길이")
+    args = ap.parse_args()
+
+    for name, reader in (("sleep-poll", poll_reader), ("selectors", selector_reader)):
+        r = measure(name, reader, args.fps, args.seconds, args.idle)
+        print(f"{r['reader']:<11} frames={r['frames']:<5} wakeups/s={r['wakeups_per_s']:<7} "
+              f"latency mean={r['latency_mean_ms']} ms p99={r['latency_p99_ms']} ms")
+
+
+if __name__ == "__main__":
+    main()
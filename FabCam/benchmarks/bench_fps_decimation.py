@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+시청자별 fps 솎아내기 효과 - 같은 수의 시청자가 30 fps / 목표 fps로 볼 때 전송량과 CPU 비교
+
+서버(main.app)를 같은 프로세스의 별도 스레드에서 띄우고, 시청자 N명이 /video_feed/0?fps=F를
+duration초 동안 받는다. 시청자별 수신 fps, 프레임 간격의 표준편차(고른 정도),
+총 수신 바이트와 서버 프로세스 CPU 시간을 출력한다.
+
+사용법:
+    python benchmarks/bench_fps_decimation.py [--clients 8] [--fps 2 5] [--duration 5]
+"""
+
+import argparse
+import asyncio
+import resource
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import uvicorn  # noqa: E402
+
+from main import app  # noqa: E402
+
+
+async def viewer(port: int, fps, duration: float) -> tuple:
+    """(수신 프레임 도착 시각 목록, 수신 바이트)"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    query = f"?fps={fps}" if fps else ""
+    writer.write(f"GET /video_feed/0{query} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+    await writer.drain()
+    arrivals = []
+    received = 0
+    deadline = time.perf_counter() + duration
+    while True:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            break
+        try:
+            chunk = await asyncio.wait_for(reader.read(65536), remaining)
+        except asyncio.TimeoutError:
+            break
+        if not chunk:
+            break
+        received += len(chunk)
+        now = time.perf_counter()
+        arrivals += [now] * chunk.count(b"Content-Type: image/jpeg")
+    writer.close()
+    return arrivals, received
+
+
+def cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+async def run_case(port: int, clients: int, fps, duration: float) -> tuple:
+    cpu_before = cpu_seconds()
+    results = await asyncio.gather(*(viewer(port, fps, duration) for _ in range(clients)))
+    cpu_used = cpu_seconds() - cpu_before
+
+    rates, jitters, total_bytes = [], [], 0
+    for arrivals, received in results:
+        total_bytes += received
+        # 연결 직후 첫 1초는 제외
+        steady = [t for t in arrivals if t - arrivals[0] >= 1.0] if arrivals else []
+        if len(steady) > 2:
+            gaps = [b - a for a, b in zip(steady, steady[1:])]
+            rates.append(len(gaps) / (steady[-1] - steady[0]))
+            jitters.append(statistics.pstdev(gaps) * 1000)
+    return (statistics.mean(rates) if rates else 0.0,
+            statistics.mean(jitters) if jitters else 0.0,
+            total_bytes, cpu_used)
+
+
+async def run(port: int, clients: int, targets: list, duration: float):
+    await asyncio.sleep(2.0)  # 스트림 안정화 대기
+    print(f"\n{'목표 fps':>8} {'시청자':>6} {'수신 fps':>9} {'간격 편차(ms)':>13} {'수신(MB)':>9} {'CPU(s)':>7}")
+    for fps in [None] + targets:
+        rate, jitter, total, cpu = await run_case(port, clients, fps, duration)
+        label = fps if fps else "전체"
+        print(f"{label:>8} {clients:>6} {rate:>9.2f} {jitter:>13.1f} {total / (1024 ** 2):>9.1f} {cpu:>7.2f}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8011)
+    ap.add_argument("--clients", type=int, default=8)
+    ap.add_argument("--fps", type=float, nargs="+", default=[2, 5])
+    ap.add_argument("--duration", type=float, default=5)
+    args = ap.parse_args()
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    try:
+        asyncio.run(run(args.port, args.clients, args.fps, args.duration))
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
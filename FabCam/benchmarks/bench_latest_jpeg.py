@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+latest.jpg 폴링 벤치마크 - 스틸만 필요한 클라이언트(NVR 연동, 상태 페이지) N개가 서버에 주는 부담
+
+  - 주기 폴링 (기본): 클라이언트마다 --interval초마다 GET /api/camera/{id}/latest.jpg (If-None-Match 포함)
+  - 롱 폴링 (--long-poll): 받은 X-Frame-Seq를 ?after=로 넘겨 새 프레임이 나오자마자 다시 받음
+
+클라이언트는 keep-alive 연결 하나를 계속 쓰고, 시작 시각을 interval 안에서 흩뜨린다.
+시나리오마다 응답 시간, 프레임 나이(캡처 → 수신 완료, X-Capture-Time 기준), 200/304 수,
+서버 CPU(uvicorn 프로세스 / 캡처 자식 프로세스, 코어 하나 대비 %)를 출력한다.
+캡처 비용은 폴링 수와 무관하므로 폴링 수를 늘려도 서버 CPU가 거의 그대로인지 보면 된다.
+
+사용법:
+    python benchmarks/bench_latest_jpeg.py [--pollers 10 100 300] [--interval 2] [--long-poll]
+                                           [--duration 10] [--json result.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+from datetime import datetime
+from pathlib import Path
+
+import psutil
+
+from bench_load import ResourceSampler, latency_summary, start_server, wait_ready
+
+
+async def poller(port: int, camera: int, interval: float, long_poll: bool, started: float, deadline: float) -> dict:
+    """latest.jpg 클라이언트 하나 (측정 구간의 요청만 집계)"""
+    result = {"ok": 0, "not_modified": 0, "request": [], "age": [], "error": None}
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    except OSError as e:
+        result["error"] = str(e)
+        return result
+    etag, seq = None, None
+    if not long_poll:
+        await asyncio.sleep(random.uniform(0, interval))
+    try:
+        while time.perf_counter() < deadline:
+            path = f"/api/camera/{camera}/latest.jpg" + (f"?after={seq}" if long_poll and seq is not None else "")
+            condition = f"If-None-Match: {etag}\r\n" if etag else ""
+            sent = time.perf_counter()
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n{condition}\r\n".encode())
+            await writer.drain()
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 30)
+            lines = head.split(b"\r\n")
+            status = int(lines[0].split(b" ", 2)[1])
+            fields = {}
+            for line in lines[1:]:
+                if b":" in line:
+                    name, value = line.split(b":", 1)
+                    fields[name.strip().lower()] = value.strip().decode()
+            length = int(fields.get(b"content-length", 0))
+            if length:
+                await asyncio.wait_for(reader.readexactly(length), 30)
+            received = time.perf_counter()
+            if status not in (200, 304):
+                raise RuntimeError(f"응답 오류: {status}")
+
+            etag = fields.get(b"etag", etag)
+            seq = int(fields[b"x-frame-seq"]) if b"x-frame-seq" in fields else seq
+            if sent >= started:
+                result["ok" if status == 200 else "not_modified"] += 1
+                result["request"].append((received - sent) * 1000)
+                if status == 200 and b"x-capture-time" in fields:
+                    result["age"].append(time.time() * 1000 - float(fields[b"x-capture-time"]))
+            if not long_poll:
+                await asyncio.sleep(max(0.0, interval - (received - sent)))
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        writer.close()
+    return result
+
+
+async def run_scenario(port: int, sampler: ResourceSampler, pollers: int, args) -> dict:
+    warmup = 1.0 if args.long_poll else args.interval
+    started = time.perf_counter() + warmup
+    deadline = started + args.duration
+    tasks = [
+        asyncio.create_task(poller(args.port, i % 2, args.interval, args.long_poll, started, deadline))
+        for i in range(pollers)
+    ]
+    await asyncio.sleep(max(0.0, started - time.perf_counter()))
+    cpu_before = sampler.cpu_times()
+    results = await asyncio.gather(*tasks)
+    cpu_after = sampler.cpu_times()
+    elapsed = time.perf_counter() - started
+
+    requests = [value for result in results for value in result["request"]]
+    ages = [value for result in results for value in result["age"]]
+    return {
+        "name": f"pollers={pollers}",
+        "pollers": pollers,
+        "requests_per_second": round(len(requests) / elapsed, 1),
+        "ok": sum(result["ok"] for result in results),
+        "not_modified": sum(result["not_modified"] for result in results),
+        "errors": sum(1 for result in results if result["error"]),
+        "request_ms": latency_summary(requests),
+        "frame_age_ms": latency_summary(ages),
+        "server": {
+            "cpu_percent": round((cpu_after[0] - cpu_before[0]) / elapsed * 100, 1),
+            "children_cpu_percent": round((cpu_after[1] - cpu_before[1]) / elapsed * 100, 1)
+        }
+    }
+
+
+async def run(args, server_pid: int) -> list:
+    await wait_ready(args.port)
+    sampler = ResourceSampler(server_pid)
+    results = []
+    print(f"{'폴링 수':>8} {'요청/s':>8} {'200':>7} {'304':>6} {'오류':>4} {'응답 p50/p99(ms)':>18} "
+          f"{'프레임 나이 p50/p99(ms)':>24} {'서버 CPU':>9} {'캡처 CPU':>9}")
+    for pollers in args.pollers:
+        result = await run_scenario(args.port, sampler, pollers, args)
+        request, age = result["request_ms"], result["frame_age_ms"]
+        print(f"{pollers:>8} {result['requests_per_second']:>8} {result['ok']:>7} {result['not_modified']:>6} "
+              f"{result['errors']:>4} {str(request['p50']) + ' / ' + str(request['p99']):>18} "
+              f"{str(age['p50']) + ' / ' + str(age['p99']):>24} "
+              f"{result['server']['cpu_percent']:>8}% {result['server']['children_cpu_percent']:>8}%")
+        results.append(result)
+        await asyncio.sleep(1.0)  # 연결 정리 대기
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8011)
+    ap.add_argument("--pollers", type=int, nargs="+", default=[10, 100, 300], help="시나리오별 클라이언트 수")
+    ap.add_argument("--interval", type=float, default=2.0, help="주기 폴링 간격 (초)")
+    ap.add_argument("--long-poll", action="store_true", help="?after=로 새 프레임마다 받음")
+    ap.add_argument("--duration", type=float, default=10)
+    ap.add_argument("--json", type=Path, help="결과 저장 경로")
+    args = ap.parse_args()
+
+    server = start_server(args.port)
+    try:
+        results = asyncio.run(run(args, server.pid))
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+    if args.json:
+        report = {
+            "meta": {
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "host": platform.node(),
+                "machine": platform.machine(),
+                "cpus": psutil.cpu_count(),
+                "python": platform.python_version(),
+                "backend": os.environ.get("FABCAM_CAMERA_BACKEND", "replay"),
+                "config": {key: value for key, value in vars(args).items() if key != "json"}
+            },
+            "scenarios": results
+        }
+        args.json.write_text(json.dumps(report, ensure_ascii=False, indent=2))
+        print(f"\n💾 결과 저장: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
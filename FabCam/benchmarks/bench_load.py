@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+"""
+종단 부하 벤치마크 - 시청자 N명(일부는 느림) + 제어 API 요청을 함께 걸고 전달 품질과 서버 자원 측정
+
+서버는 별도 프로세스(uvicorn main:app)로 띄우고, 기본값으로 재생 백엔드(FABCAM_CAMERA_BACKEND=replay,
+합성 화면)를 쓰므로 카메라 없이 실행된다. 재생 소스가 프레임마다 넣는 순번/출력 시각 주석(replay.stamp)으로
+시청자가 받은 프레임에서 바로 지연(캡처 → 수신 완료)과 건너뛴 프레임을 계산한다.
+라즈베리파이에서 FABCAM_CAMERA_BACKEND=rpicam으로 실행하면 주석이 없으므로 서버가 보내는 파트 헤더
+(X-Frame-Seq, X-Capture-Time = 서버 수신 시각)로 계산한다 (캡처 프로세스 안의 지연은 빠짐).
+
+시나리오마다 측정하는 값:
+  - 시청자 (빠름/느림 그룹별): 수신 fps, 지연 p50/p99, 건너뛴 프레임 (재생 소스 순번 간격)
+  - 제어 API (초당 --control-rate회, 상태/파일 목록/스트림 스냅샷/고해상도 스냅샷 순환): 응답 시간 p50/p99, 오류
+  - 서버: CPU (uvicorn 프로세스 / 캡처·인코더 자식 프로세스, 코어 하나 대비 %), RSS 최대값
+
+--json으로 결과를 저장하고, --compare로 이전 결과와 주요 지표를 비교할 수 있다.
+
+사용법:
+    python benchmarks/bench_load.py [--clients 1 4 16] [--slow 1] [--slow-ms 150] [--control-rate 2]
+                                    [--slow-rcvbuf 0] [--duration 10] [--mode queue|latest] [--json result.json]
+                                    [--compare baseline.json]
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+APP_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(APP_DIR))
+
+import psutil  # noqa: E402
+
+from replay import read_stamp  # noqa: E402
+
+# (이름, 메서드, 경로) - 순서대로 반복
+CONTROL_REQUESTS = [
+    ("status", "GET", "/api/camera/status"),
+    ("files", "GET", "/api/files?limit=50"),
+    ("snapshot_stream", "POST", "/api/snapshot/0?resolution=vga"),
+    ("status", "GET", "/api/camera/status"),
+    ("files", "GET", "/api/files?limit=50"),
+    ("snapshot_still", "POST", "/api/snapshot/1?resolution=hd"),
+]
+
+# --compare에서 비교할 지표 (경로, 높을수록 좋은지, 무시할 절대 변화량)
+COMPARE_KEYS = [
+    (("viewers", "fast", "fps"), True, 0.5),
+    (("viewers", "fast", "latency_ms", "p99"), False, 5.0),
+    (("viewers", "slow", "fps"), True, 0.5),
+    (("viewers", "slow", "latency_ms", "p99"), False, 5.0),
+    (("control", "latency_ms", "p99"), False, 5.0),
+    (("server", "cpu_percent"), False, 2.0),
+    (("server", "rss_mb_peak"), False, 10.0),
+]
+
+
+def percentile(values: list, q: float):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * q))], 1)
+
+
+def latency_summary(values: list) -> dict:
+    return {"p50": percentile(values, 0.5), "p99": percentile(values, 0.99)}
+
+
+class BodyReader:
+    """응답 본문 읽기 (Transfer-Encoding: chunked면 청크 크기 줄을 걷어 냄)"""
+
+    def __init__(self, reader: asyncio.StreamReader, chunked: bool):
+        self.reader = reader
+        self.chunked = chunked
+        self.buffer = bytearray()
+
+    async def _fill(self):
+        if not self.chunked:
+            data = await self.reader.read(65536)
+        else:
+            size = int((await self.reader.readuntil(b"\r\n")).split(b";")[0], 16)
+            data = await self.reader.readexactly(size + 2)
+            data = data[:-2]
+        if not data:
+            raise asyncio.IncompleteReadError(bytes(self.buffer), None)
+        self.buffer += data
+
+    async def readuntil(self, separator: bytes) -> bytes:
+        while True:
+            index = self.buffer.find(separator)
+            if index >= 0:
+                end = index + len(separator)
+                data = bytes(self.buffer[:end])
+                del self.buffer[:end]
+                return data
+            await self._fill()
+
+    async def readexactly(self, n: int) -> bytes:
+        while len(self.buffer) < n:
+            await self._fill()
+        data = bytes(self.buffer[:n])
+        del self.buffer[:n]
+        return data
+
+
+async def viewer(port: int, camera: int, delay_ms: float, started: float, deadline: float,
+                 mode: Optional[str] = None, rcvbuf_kb: int = 0) -> dict:
+    """MJPEG 시청자 하나 - 파트 헤더의 Content-Length로 프레임을 읽고 주석에서 지연 계산
+
+    delay_ms: 프레임마다 처리 시간 (느린 시청자 흉내, 그동안 읽지 않음)
+    mode: 전달 방식 (?mode=queue|latest, None이면 서버 기본값)
+    rcvbuf_kb: 수신 버퍼 크기 (0이면 OS 자동 조정 - localhost에서는 수 MB까지 커져 서버 쪽 큐잉을 가림)
+    """
+    result = {"frames": 0, "skipped": 0, "latency": [], "error": None}
+    try:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if rcvbuf_kb:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf_kb * 1024)
+        sock.setblocking(False)
+        await asyncio.get_running_loop().sock_connect(sock, ("127.0.0.1", port))
+        reader, writer = await asyncio.open_connection(sock=sock)
+    except OSError as e:
+        result["error"] = str(e)
+        return result
+    path = f"/video_feed/{camera}" + (f"?mode={mode}" if mode else "")
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+    await writer.drain()
+    last_seq = None
+    try:
+        response = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 10)
+        body = BodyReader(reader, b"transfer-encoding: chunked" in response.lower())
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            headers = await asyncio.wait_for(body.readuntil(b"\r\n\r\n"), remaining)
+            length = None
+            part = {}
+            for line in headers.split(b"\r\n"):
+                name, _, value = line.partition(b":")
+                part[name.strip().lower()] = value.strip()
+            if b"content-length" in part:
+                length = int(part[b"content-length"])
+            if length is None:
+                continue
+            data = await asyncio.wait_for(body.readexactly(length), remaining)
+            received = time.time()
+            if time.perf_counter() < started:
+                last_seq = None  # 준비 구간은 통계에서 제외
+            else:
+                result["frames"] += 1
+                # 재생 소스 주석 우선 (소스 기준 순번), 없으면 서버 파트 헤더 (rpicam은 캡처 시각 = 서버 수신 시각)
+                stamped = read_stamp(data)
+                if not stamped and b"x-capture-time" in part:
+                    stamped = int(part[b"x-frame-seq"]), float(part[b"x-capture-time"]) / 1000
+                if stamped:
+                    seq, captured = stamped
+                    result["latency"].append((received - captured) * 1000)
+                    # 순번이 줄면 재생 소스가 다시 시작된 것 (고해상도 스냅샷 후 캡처 재개)
+                    if last_seq is not None and seq > last_seq:
+                        result["skipped"] += seq - last_seq - 1
+                    last_seq = seq
+            if delay_ms:
+                await asyncio.sleep(delay_ms / 1000)
+    except (asyncio.TimeoutError, asyncio.IncompleteReadError):
+        pass
+    except (OSError, ValueError) as e:
+        result["error"] = str(e)
+    finally:
+        writer.close()
+    return result
+
+
+async def http_request(port: int, method: str, path: str) -> tuple:
+    """(응답 시간 ms, 상태 코드)"""
+    started = time.perf_counter()
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: 0\r\nConnection: close\r\n\r\n".encode())
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    status = int(response.split(b" ", 2)[1]) if response.startswith(b"HTTP/") else 0
+    return (time.perf_counter() - started) * 1000, status
+
+
+async def control_traffic(port: int, rate: float, started: float, deadline: float) -> dict:
+    """제어 API 요청을 일정 간격으로 보냄 (응답을 기다리지 않고 다음 요청 예약)"""
+    latencies = {}
+    errors = 0
+    pending = set()
+
+    async def one(name: str, method: str, path: str):
+        nonlocal errors
+        try:
+            elapsed, status = await http_request(port, method, path)
+        except OSError:
+            errors += 1
+            return
+        if status >= 400:
+            errors += 1
+        elif time.perf_counter() >= started:
+            latencies.setdefault(name, []).append(elapsed)
+
+    if rate > 0:
+        for name, method, path in itertools.cycle(CONTROL_REQUESTS):
+            if time.perf_counter() >= deadline:
+                break
+            task = asyncio.create_task(one(name, method, path))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+            await asyncio.sleep(1.0 / rate)
+    if pending:
+        await asyncio.wait(pending, timeout=10)
+    every = [value for values in latencies.values() for value in values]
+    return {
+        "requests": len(every),
+        "errors": errors,
+        "latency_ms": latency_summary(every),
+        "by_endpoint": {name: latency_summary(values) for name, values in sorted(latencies.items())}
+    }
+
+
+class ResourceSampler:
+    """서버 프로세스와 자식(재생 소스, ffmpeg) CPU 시간과 RSS 주기 측정"""
+
+    def __init__(self, pid: int, interval: float = 0.5):
+        self.process = psutil.Process(pid)
+        self.interval = interval
+        self.rss_peak = 0
+        self._children = {}  # pid: 마지막으로 본 CPU 시간 (종료된 자식 포함)
+
+    def cpu_times(self) -> tuple:
+        """(서버 CPU 초, 자식 CPU 초 누적)"""
+        times = self.process.cpu_times()
+        for child in self.process.children(recursive=True):
+            try:
+                child_times = child.cpu_times()
+                self._children[child.pid] = child_times.user + child_times.system
+            except psutil.Error:
+                continue
+        return times.user + times.system, sum(self._children.values())
+
+    async def run(self, stop: asyncio.Event):
+        while not stop.is_set():
+            rss = self.process.memory_info().rss
+            for child in self.process.children(recursive=True):
+                try:
+                    rss += child.memory_info().rss
+                except psutil.Error:
+                    continue
+            self.rss_peak = max(self.rss_peak, rss)
+            try:
+                await asyncio.wait_for(stop.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+def group_summary(results: list, duration: float) -> dict:
+    latency = [value for result in results for value in result["latency"]]
+    return {
+        "count": len(results),
+        "fps": round(statistics.mean(result["frames"] / duration for result in results), 2) if results else None,
+        "latency_ms": latency_summary(latency),
+        "skipped": sum(result["skipped"] for result in results),
+        "errors": sum(1 for result in results if result["error"])
+    }
+
+
+async def run_scenario(port: int, sampler: ResourceSampler, clients: int, slow: int, args) -> dict:
+    """빠른 시청자 clients명 + 느린 시청자 slow명 + 제어 API (카메라 0/1 번갈아 시청)"""
+    warmup = 1.0
+    started = time.perf_counter() + warmup
+    deadline = started + args.duration
+    stop = asyncio.Event()
+    sampler.rss_peak = 0
+    sampler_task = asyncio.create_task(sampler.run(stop))
+
+    fast = [viewer(port, i % 2, 0, started, deadline, args.mode) for i in range(clients)]
+    slow_viewers = [
+        viewer(port, i % 2, args.slow_ms, started, deadline, args.mode, args.slow_rcvbuf) for i in range(slow)
+    ]
+    control = control_traffic(port, args.control_rate, started, deadline)
+    gathered = asyncio.gather(asyncio.gather(*fast), asyncio.gather(*slow_viewers), control)
+
+    await asyncio.sleep(warmup)
+    cpu_before = sampler.cpu_times()
+    await asyncio.sleep(max(0.0, deadline - time.perf_counter()))
+    cpu_after = sampler.cpu_times()
+    fast_results, slow_results, control_result = await gathered
+    stop.set()
+    await sampler_task
+
+    return {
+        "name": f"clients={clients} slow={slow}",
+        "clients": clients,
+        "slow": slow,
+        "duration": args.duration,
+        "viewers": {
+            "fast": group_summary(fast_results, args.duration),
+            "slow": group_summary(slow_results, args.duration)
+        },
+        "control": control_result,
+        "server": {
+            "cpu_percent": round((cpu_after[0] - cpu_before[0]) / args.duration * 100, 1),
+            "capture_cpu_percent": round((cpu_after[1] - cpu_before[1]) / args.duration * 100, 1),
+            "rss_mb_peak": round(sampler.rss_peak / (1024 ** 2), 1)
+        }
+    }
+
+
+def format_ms(summary: dict) -> str:
+    p50, p99 = summary["p50"], summary["p99"]
+    return f"{p50 if p50 is not None else '-':>7} {p99 if p99 is not None else '-':>7}"
+
+
+def print_scenario(result: dict):
+    server = result["server"]
+    control = result["control"]
+    print(f"\n[{result['name']}] 서버 CPU {server['cpu_percent']}% + 캡처/인코더 {server['capture_cpu_percent']}%, "
+          f"RSS 최대 {server['rss_mb_peak']} MB")
+    print(f"  {'그룹':<6} {'인원':>4} {'수신 fps':>9} {'p50(ms)':>7} {'p99(ms)':>7} {'건너뜀':>7} {'오류':>4}")
+    for group in ("fast", "slow"):
+        summary = result["viewers"][group]
+        if not summary["count"]:
+            continue
+        label = "빠름" if group == "fast" else "느림"
+        print(f"  {label:<6} {summary['count']:>4} {summary['fps']:>9} {format_ms(summary['latency_ms'])} "
+              f"{summary['skipped']:>7} {summary['errors']:>4}")
+    print(f"  제어 API {control['requests']}건 (오류 {control['errors']}): p50/p99 {format_ms(control['latency_ms'])} ms")
+    for name, summary in control["by_endpoint"].items():
+        print(f"    {name:<16} {format_ms(summary)}")
+
+
+def lookup(data: dict, path: tuple):
+    for key in path:
+        if not isinstance(data, dict) or key not in data:
+            return None
+        data = data[key]
+    return data
+
+
+def compare(results: list, baseline_path: Path):
+    """같은 이름의 시나리오끼리 주요 지표 비교 (잡음 범위를 넘어 10% 넘게 나빠지면 표시)"""
+    baseline = {item["name"]: item for item in json.loads(baseline_path.read_text())["scenarios"]}
+    print(f"\n비교 기준: {baseline_path}")
+    for result in results:
+        old = baseline.get(result["name"])
+        if old is None:
+            continue
+        print(f"  [{result['name']}]")
+        for path, higher_is_better, noise in COMPARE_KEYS:
+            before, after = lookup(old, path), lookup(result, path)
+            if before is None or after is None:
+                continue
+            change = (after - before) / before * 100 if before else 0.0
+            worse = abs(after - before) > noise and (change < -10 if higher_is_better else change > 10)
+            print(f"    {'.'.join(path):<32} {before:>9} → {after:>9} ({change:+.1f}%){'  ⚠️' if worse else ''}")
+
+
+def start_server(port: int) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.setdefault("FABCAM_CAMERA_BACKEND", "replay")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=APP_DIR, env=env, stdout=subprocess.DEVNULL
+    )
+    return process
+
+
+async def wait_ready(port: int, timeout: float = 30.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            elapsed, status = await http_request(port, "GET", "/api/camera/status")
+            if status == 200:
+                return
+        except OSError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("서버가 시작되지 않았습니다")
+
+
+async def run(args, server_pid: int) -> list:
+    await wait_ready(args.port)
+    sampler = ResourceSampler(server_pid)
+    results = []
+    for clients in args.clients:
+        result = await run_scenario(args.port, sampler, clients, args.slow, args)
+        print_scenario(result)
+        results.append(result)
+        await asyncio.sleep(1.0)  # 연결 정리 대기
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8011)
+    ap.add_argument("--clients", type=int, nargs="+", default=[1, 4, 16], help="시나리오별 빠른 시청자 수")
+    ap.add_argument("--slow", type=int, default=1, help="시나리오마다 추가하는 느린 시청자 수")
+    ap.add_argument("--slow-ms", type=float, default=150, help="느린 시청자의 프레임당 처리 시간")
+    ap.add_argument("--slow-rcvbuf", type=int, default=0, help="느린 시청자의 수신 버퍼 KB (0이면 OS 기본)")
+    ap.add_argument("--control-rate", type=float, default=2, help="초당 제어 API 요청 수 (0이면 없음)")
+    ap.add_argument("--duration", type=float, default=10)
+    ap.add_argument("--mode", choices=("queue", "latest"), help="시청자 전달 방식 (기본: 서버 설정)")
+    ap.add_argument("--json", type=Path, help="결과 저장 경로")
+    ap.add_argument("--compare", type=Path, help="이전 --json 결과와 비교")
+    args = ap.parse_args()
+
+    server = start_server(args.port)
+    try:
+        results = asyncio.run(run(args, server.pid))
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "host": platform.node(),
+            "machine": platform.machine(),
+            "cpus": psutil.cpu_count(),
+            "python": platform.python_version(),
+            "backend": os.environ.get("FABCAM_CAMERA_BACKEND", "replay"),
+            "config": {key: value for key, value in vars(args).items() if key not in ("json", "compare")}
+        },
+        "scenarios": results
+    }
+    if args.json:
+        args.json.write_text(json.dumps(report, ensure_ascii=False, indent=2))
+        print(f"\n💾 결과 저장: {args.json}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+MJPEG 프레임 파서 마이크로 벤치마크 - 기존 방식 vs 재사용 버퍼 파서
+
+사용법:
+    python benchmarks/bench_mjpeg_parser.py dump1.mjpeg [dump2.mjpeg ...]
+    python benchmarks/bench_mjpeg_parser.py --synthetic 900
+
+MJPEG 덤프는 rpicam-vid --codec mjpeg --output dump.mjpeg 로 녹화할 수 있다.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mjpeg import MJPEGFrameParser, SOI, EOI  # noqa: E402
+
+
+def legacy_parse(fd: int) -> dict:
+    """기존 _frame_reader 알고리즘 재현 (복사 바이트 계산 포함)"""
+    buffer = b""
+    frames = 0
+    copied = 0
+    while True:
+        chunk = os.read(fd, 4096)
+        if not chunk:
+            break
+        buffer += chunk
+        copied += len(buffer)
+        while True:
+            start_idx = buffer.find(SOI)
+            if start_idx == -1:
+                break
+            end_idx = buffer.find(EOI, start_idx + 2)
+            if end_idx == -1:
+                break
+            frame_data = buffer[start_idx:end_idx + 2]
+            buffer = buffer[end_idx + 2:]
+            mjpeg_frame = (b'--frame\r\n'
+                           b'Content-Type: image/jpeg\r\n'
+                           b'Content-Length: ' + str(len(frame_data)).encode() + b'\r\n\r\n' +
+                           frame_data + b'\r\n')
+            copied += len(frame_data) + len(buffer) + len(mjpeg_frame)
+            frames += 1
+    return {"frames": frames, "bytes_copied": copied}
+
+
+def parser_parse(fd: int) -> dict:
+    """MJPEGFrameParser로 파싱 (파트 헤더는 프레임당 한 번 생성)"""
+    parser = MJPEGFrameParser()
+    while parser.read_from(fd):
+        for frame in parser.frames_available():
+            frame.part_header
+    return {"frames": parser.frames, "bytes_copied": parser.bytes_copied}
+
+
+def make_synthetic_dump(path: Path, frame_count: int, frame_size: int = 40 * 1024):
+    """마커 없는 임의 페이로드로 JPEG 형태의 프레임 덤프 생성"""
+    rng = random.Random(0)
+    with open(path, "wb") as f:
+        for _ in range(frame_count):
+            size = int(frame_size * rng.uniform(0.7, 1.3))
+            payload = rng.randbytes(size).replace(b"\xff", b"\xfe")
+            f.write(SOI + payload + EOI)
+
+
+def run(name: str, func, path: Path, repeat: int) -> dict:
+    best = None
+    for _ in range(repeat):
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            started = time.perf_counter()
+            result = func(fd)
+            elapsed = time.perf_counter() - started
+        finally:
+            os.close(fd)
+        if best is None or elapsed < best[0]:
+            best = (elapsed, result)
+
+    elapsed, result = best
+    frames = max(result["frames"], 1)
+    return {
+        "parser": name,
+        "frames": result["frames"],
+        "fps": round(result["frames"] / elapsed, 1),
+        "bytes_copied_per_frame": round(result["bytes_copied"] / frames),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("dumps", nargs="*", type=Path, help="녹화된 MJPEG 덤프 파일")
+    ap.add_argument("--synthetic", type=int, default=0, help="합성 프레임 수 (덤프가 없을 때)")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    dumps = list(args.dumps)
+    tmp_dir = None
+    if not dumps:
+        tmp_dir = tempfile.TemporaryDirectory()
+        path = Path(tmp_dir.name) / "synthetic.mjpeg"
+        make_synthetic_dump(path, args.synthetic or 900)
+        dumps.append(path)
+
+    for path in dumps:
+        size_mb = path.stat().st_size / (1024 ** 2)
+        print(f"📼 {path.name} ({size_mb:.1f} MB)")
+        for name, func in (("legacy", legacy_parse), ("MJPEGFrameParser", parser_parse)):
+            r = run(name, func, path, args.repeat)
+            print(f"  {r['parser']:<18} {r['frames']:>6} frames  {r['fps']:>10} frames/s  "
+                  f"{r['bytes_copied_per_frame']:>10} bytes copied/frame")
+
+    if tmp_dir:
+        tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
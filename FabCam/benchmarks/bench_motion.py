@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+움직임 감지 비용 - 녹화된 MJPEG을 30 fps로 재생하며 분석 CPU와 감지된 이벤트 확인
+
+입력 MJPEG(rpicam-vid --codec mjpeg 출력)을 MJPEGFrameParser로 프레임 단위로 나누고,
+프레임 시각을 1/30초 간격으로 매겨 두 방식을 비교한다.
+  - 전체 디코딩: 모든 프레임을 컬러로 전체 디코딩 후 흑백 변환, 이전 프레임과 차분
+  - 감지기: MotionMonitor.accept로 목표 fps만 남기고 축소 흑백 디코딩 + 배경 차분
+프레임당/샘플당 분석 시간과 30 fps 입력 기준 코어 하나 대비 CPU %, 감지된 이벤트 구간을 출력한다.
+
+--input이 없으면 합성 클립을 만든다 (조용함 10초 → 움직임 6초 → 조용함 10초 → 조명 변화 → 조용함 6초).
+라즈베리파이 4의 코어는 일반 x86 코어보다 4~6배 느리므로, 그 배율을 곱해 10% 예산과 비교하면 된다.
+
+사용법:
+    python benchmarks/bench_motion.py [--input clip.mjpeg] [--fps 2 5] [--threshold 25] [--min-area 0.5]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import cv2  # noqa: E402
+import numpy as np  # noqa: E402
+
+from mjpeg import MJPEGFrame, MJPEGFrameParser  # noqa: E402
+from motion import MotionDetector, MotionMonitor  # noqa: E402
+
+SOURCE_FPS = 30
+
+
+def synthetic_clip(width: int = 640, height: int = 480) -> bytes:
+    """센서 잡음이 있는 정지 장면에 움직이는 물체와 조명 변화를 넣은 MJPEG"""
+    rng = np.random.default_rng(0)
+    base = np.full((height, width, 3), 70, np.uint8)
+    cv2.rectangle(base, (40, 300), (220, 460), (120, 90, 60), -1)  # 정지한 배경 물체
+    cv2.rectangle(base, (420, 60), (600, 200), (50, 110, 150), -1)
+    chunks = []
+    timeline = [("quiet", 10), ("motion", 6), ("quiet", 10), ("lights", 1), ("quiet", 6)]
+    brightness = 0
+    for kind, seconds in timeline:
+        for i in range(seconds * SOURCE_FPS):
+            image = base.copy()
+            if kind == "lights":
+                brightness = 90  # 한 번에 밝아지고 그대로 유지
+            if brightness:
+                image = cv2.add(image, (brightness, brightness, brightness, 0))
+            if kind == "motion":
+                x = 20 + i * 12 % (width - 140)
+                cv2.rectangle(image, (x, 180), (x + 100, 380), (200, 200, 200), -1)
+            image = cv2.add(image, rng.integers(0, 8, image.shape, np.uint8))
+            ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 85])
+            chunks.append(encoded.tobytes())
+    return b"".join(chunks)
+
+
+def load_frames(data: bytes) -> list:
+    """리더 스레드처럼 청크 단위로 나눠 넣고 프레임 시각을 30 fps 간격으로 매김"""
+    parser = MJPEGFrameParser()
+    frames = []
+    for offset in range(0, len(data), parser.chunk_size):
+        parser.feed(data[offset:offset + parser.chunk_size])
+        for frame in parser.frames_available():
+            frames.append(MJPEGFrame(frame.data, len(frames) / SOURCE_FPS))
+    return frames
+
+
+def bench_full_decode(frames: list, threshold: float) -> float:
+    """모든 프레임 전체 디코딩 + 프레임 간 차분 (CPU 초)"""
+    previous = None
+    started = time.process_time()
+    for frame in frames:
+        image = cv2.imdecode(np.frombuffer(frame.data, np.uint8), cv2.IMREAD_COLOR)
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY).astype(np.float32)
+        if previous is not None:
+            np.count_nonzero(np.abs(gray - previous) > threshold)
+        previous = gray
+    return time.process_time() - started
+
+
+def bench_monitor(frames: list, fps: float, threshold: float, min_area: float) -> tuple:
+    """감지기 경로 (CPU 초, 샘플 수, 이벤트 목록, 조명 리셋 수)"""
+    events = []
+    detector = MotionDetector(threshold=threshold, min_area=min_area)
+    monitor = MotionMonitor(0, detector, fps=fps, post_roll=3.0,
+                            on_end=lambda event: events.append(event))
+    started = time.process_time()
+    for frame in frames:
+        if monitor.accept(frame.timestamp):
+            monitor.process(frame)
+    if monitor.event is not None:
+        monitor._finish(frames[-1].timestamp)
+    cpu = time.process_time() - started
+    # started는 클립 기준 초, 종료 시각은 벽시계로 기록되므로 길이로 되돌림
+    spans = [(event.started, event.started + event.ended_at - event.started_at) for event in events]
+    return cpu, monitor.samples, spans, detector.lighting_resets
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--input", type=Path, help="rpicam-vid --codec mjpeg로 녹화한 파일")
+    ap.add_argument("--fps", type=float, nargs="+", default=[2, 5])
+    ap.add_argument("--threshold", type=float, default=25.0)
+    ap.add_argument("--min-area", type=float, default=0.5, help="움직임으로 볼 최소 면적 (%%)")
+    args = ap.parse_args()
+
+    data = args.input.read_bytes() if args.input else synthetic_clip()
+    frames = load_frames(data)
+    duration = len(frames) / SOURCE_FPS
+    height, width = cv2.imdecode(np.frombuffer(frames[0].data, np.uint8), cv2.IMREAD_GRAYSCALE).shape
+    print(f"입력: {'합성 클립' if not args.input else args.input} - {len(frames)}프레임 "
+          f"({duration:.1f}초, {width}×{height}, 평균 {len(data) / len(frames) / 1024:.1f} KB)")
+
+    print(f"\n{'방식':<14} {'분석 수':>7} {'분석당(ms)':>10} {'CPU(%)':>7}  이벤트")
+    cpu = bench_full_decode(frames, args.threshold)
+    print(f"{'전체 디코딩':<14} {len(frames):>7} {cpu / len(frames) * 1000:>10.2f} "
+          f"{cpu / duration * 100:>7.2f}  -")
+    for fps in args.fps:
+        cpu, samples, spans, resets = bench_monitor(frames, fps, args.threshold, args.min_area / 100)
+        found = ", ".join(f"{start:.1f}~{end:.1f}초" for start, end in spans) or "없음"
+        print(f"{f'감지기 {fps:g} fps':<14} {samples:>7} {cpu / max(samples, 1) * 1000:>10.2f} "
+              f"{cpu / duration * 100:>7.2f}  {found} (조명 리셋 {resets})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+구간 재생 첫 바이트 시간 - 세그먼트 수에 따른 find_segments + stream_segments 첫 청크 지연
+
+임시 static 디렉토리에 30초 세그먼트 N개(카메라 1, 각 64KB)를 만들고 카탈로그를 동기화한 뒤,
+전체 기간의 처음/가운데/끝에서 15분 구간을 요청해 첫 청크까지의 시간과 전체 전송 시간을 잰다.
+
+사용법:
+    python benchmarks/bench_playback.py [--sizes 1000 10000 50000]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from catalog import FileCatalog  # noqa: E402
+from playback import find_segments, stream_segments  # noqa: E402
+
+BASE_TIME = 1_767_225_600
+SEGMENT = 30
+PAYLOAD = b"\x00\x00\x00\x01\x67" + bytes(64 * 1024 - 5)
+
+
+def populate(static_dir: Path, count: int):
+    rec_dir = static_dir / "rec" / "camera1"
+    rec_dir.mkdir(parents=True)
+    for i in range(count):
+        start = BASE_TIME + i * SEGMENT
+        path = rec_dir / f"rec_1_{datetime.fromtimestamp(start).strftime('%Y%m%d_%H%M%S')}.mp4"
+        path.write_bytes(PAYLOAD)
+        os.utime(path, (start + SEGMENT, start + SEGMENT))
+
+
+async def measure(catalog: FileCatalog, static_dir: Path, since: float, until: float):
+    started = time.perf_counter()
+    first = None
+    total = 0
+    async for chunk in stream_segments(static_dir, find_segments(catalog, 1, since, until)):
+        if first is None:
+            first = time.perf_counter() - started
+        total += len(chunk)
+    return first * 1000, (time.perf_counter() - started) * 1000, total
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    args = ap.parse_args()
+
+    print(f"{'세그먼트 수':>10} {'구간 위치':>8} {'첫 청크(ms)':>12} {'전체(ms)':>9} {'전송(KB)':>9}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            static_dir = Path(tmp) / "static"
+            populate(static_dir, size)
+            catalog = FileCatalog(Path(tmp) / "catalog.db", static_dir)
+            catalog.reconcile()
+
+            span = size * SEGMENT
+            for label, offset in (("처음", 0), ("가운데", span // 2), ("끝", span - 900)):
+                since = BASE_TIME + offset
+                first_ms, total_ms, total = asyncio.run(measure(catalog, static_dir, since, since + 900))
+                print(f"{size:>10} {label:>8} {first_ms:>12.2f} {total_ms:>9.1f} {total // 1024:>9}")
+            catalog.close()
+
+
+if __name__ == "__main__":
+    main()
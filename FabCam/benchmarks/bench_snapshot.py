@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+스냅샷 경로 비교 - 최신 스트림 프레임 저장 vs rpicam-still 촬영
+
+실제 카메라(또는 같은 이름의 대역 명령)가 필요하다. 스트림을 띄운 상태에서
+같은 640×480 스냅샷을 두 경로로 반복 촬영해 지연 시간을 비교한다.
+
+사용법:
+    python benchmarks/bench_snapshot.py [--camera 0] [--count 10]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from camera import camera_manager  # noqa: E402
+
+
+def measure(camera: int, count: int, prefer_stream: bool) -> dict:
+    latencies = []
+    sources = set()
+    for _ in range(count):
+        started = time.perf_counter()
+        snapshot = camera_manager.capture_snapshot(camera, "vga", prefer_stream=prefer_stream)
+        latencies.append((time.perf_counter() - started) * 1000)
+        if snapshot is None:
+            raise SystemExit("스냅샷 실패")
+        sources.add(snapshot["source"])
+        (camera_manager.snapshot_dir / snapshot["filename"]).unlink(missing_ok=True)
+        time.sleep(1.0)  # 파일명이 초 단위이므로 간격을 둠
+    return {
+        "source": "/".join(sorted(sources)),
+        "mean": statistics.mean(latencies),
+        "p50": statistics.median(latencies),
+        "max": max(latencies),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--camera", type=int, default=0)
+    ap.add_argument("--count", type=int, default=10)
+    args = ap.parse_args()
+
+    stream = camera_manager.get_shared_stream(args.camera)
+    if stream is None or not stream.start_stream():
+        raise SystemExit(f"카메라 {args.camera} 사용 불가")
+
+    try:
+        # 첫 프레임 대기
+        deadline = time.monotonic() + 5
+        while stream.get_latest_frame() is None and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+        results = [
+            measure(args.camera, args.count, prefer_stream=True),
+            measure(args.camera, args.count, prefer_stream=False),
+        ]
+    finally:
+        camera_manager.cleanup()
+
+    print(f"\n{'경로':<14} {'평균(ms)':>10} {'p50(ms)':>10} {'최대(ms)':>10}")
+    for r in results:
+        print(f"{r['source']:<14} {r['mean']:>10.1f} {r['p50']:>10.1f} {r['max']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
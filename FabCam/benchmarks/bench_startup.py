@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+시작 시간 벤치마크 - import, 첫 요청 응답, 첫 프레임까지 걸리는 시간
+
+  - import: 새 인터프리터에서 `import main`에 걸린 시간 (카메라 감지/디렉토리 생성 등 부작용이 없어야 함)
+  - 첫 요청: uvicorn 프로세스 시작 → GET /api/camera/status 첫 200 응답
+  - 첫 프레임: uvicorn 프로세스 시작 → /video_feed/0의 첫 JPEG 수신 완료
+    (첫 요청 직후 연결하므로 카메라 감지/초기화를 기다리는 시간이 포함됨)
+
+서버는 기본값으로 재생 백엔드(FABCAM_CAMERA_BACKEND=replay)를 쓰므로 카메라 없이 실행된다.
+--runs번 반복해 중앙값/최소/최대를 출력하고, --json으로 결과를 저장할 수 있다.
+
+사용법:
+    python benchmarks/bench_startup.py [--runs 5] [--port 8011] [--json result.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from bench_load import APP_DIR, BodyReader, http_request, start_server
+
+IMPORT_SNIPPET = "import time; started = time.perf_counter(); import main; print(time.perf_counter() - started)"
+
+
+def measure_import() -> float:
+    """새 인터프리터에서 import main (ms)"""
+    env = dict(os.environ)
+    env.setdefault("FABCAM_CAMERA_BACKEND", "replay")
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET], cwd=APP_DIR, env=env,
+        capture_output=True, text=True, check=True
+    ).stdout
+    return float(output.strip().splitlines()[-1]) * 1000
+
+
+async def first_request(port: int, started: float, timeout: float) -> float:
+    """첫 200 응답까지 (ms, 프로세스 시작 기준)"""
+    while time.perf_counter() - started < timeout:
+        try:
+            elapsed, status = await http_request(port, "GET", "/api/camera/status")
+            if status == 200:
+                return (time.perf_counter() - started) * 1000
+        except OSError:
+            pass
+        await asyncio.sleep(0.01)
+    raise RuntimeError("서버가 시작되지 않았습니다")
+
+
+async def first_frame(port: int, camera: int, started: float, timeout: float) -> float:
+    """첫 JPEG 파트 수신 완료까지 (ms, 프로세스 시작 기준)"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET /video_feed/{camera} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+    await writer.drain()
+    try:
+        response = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout)
+        status_line = response.split(b"\r\n", 1)[0].decode()
+        if " 200 " not in status_line:
+            raise RuntimeError(f"스트림 응답 오류: {status_line}")
+        body = BodyReader(reader, b"transfer-encoding: chunked" in response.lower())
+        while True:
+            headers = await asyncio.wait_for(body.readuntil(b"\r\n\r\n"), timeout)
+            for line in headers.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    await asyncio.wait_for(body.readexactly(int(line.split(b":", 1)[1])), timeout)
+                    return (time.perf_counter() - started) * 1000
+    finally:
+        writer.close()
+
+
+def run_once(args) -> dict:
+    started = time.perf_counter()
+    server = start_server(args.port)
+    try:
+        async def measure():
+            request_ms = await first_request(args.port, started, args.timeout)
+            frame_ms = await first_frame(args.port, args.camera, started, args.timeout)
+            return request_ms, frame_ms
+        request_ms, frame_ms = asyncio.run(measure())
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            server.kill()
+    return {"first_request_ms": round(request_ms, 1), "first_frame_ms": round(frame_ms, 1)}
+
+
+def summary(values: list) -> dict:
+    return {
+        "median": round(statistics.median(values), 1),
+        "min": round(min(values), 1),
+        "max": round(max(values), 1)
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8011)
+    ap.add_argument("--camera", type=int, default=0, help="첫 프레임을 잴 카메라")
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--timeout", type=float, default=30.0)
+    ap.add_argument("--json", type=Path, help="결과 저장 경로")
+    args = ap.parse_args()
+
+    runs = []
+    for index in range(args.runs):
+        result = {"import_ms": round(measure_import(), 1)}
+        result.update(run_once(args))
+        runs.append(result)
+        print(f"  #{index + 1}: import {result['import_ms']:.0f}ms, 첫 요청 {result['first_request_ms']:.0f}ms, "
+              f"첫 프레임 {result['first_frame_ms']:.0f}ms")
+        time.sleep(0.5)  # 포트 정리 대기
+
+    results = {key: summary([run[key] for run in runs]) for key in ("import_ms", "first_request_ms", "first_frame_ms")}
+    print(f"\n{'지표':<18} {'중앙값':>8} {'최소':>8} {'최대':>8}")
+    for key, values in results.items():
+        print(f"{key:<18} {values['median']:>8} {values['min']:>8} {values['max']:>8}")
+
+    if args.json:
+        report = {
+            "meta": {
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "host": platform.node(),
+                "machine": platform.machine(),
+                "python": platform.python_version(),
+                "backend": os.environ.get("FABCAM_CAMERA_BACKEND", "replay"),
+                "config": {key: value for key, value in vars(args).items() if key != "json"}
+            },
+            "summary": results,
+            "runs": runs
+        }
+        args.json.write_text(json.dumps(report, ensure_ascii=False, indent=2))
+        print(f"\n💾 결과 저장: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+WebSocket 다중 카메라 전송 - 느린 클라이언트에서 지연이 쌓이는지, 프레임을 건너뛰는지 확인
+
+서버(main.app)를 같은 프로세스의 별도 스레드에서 띄우고, /ws/video?cameras=0,1 연결 하나로
+duration초 동안 프레임을 받는다. 프레임마다 decode_ms만큼 처리 시간(브라우저 디코딩 흉내)을 두고,
+window > 0이면 처리 후 {"ack": 카메라}를 보낸다. 카메라별 수신 fps, 서버가 건너뛴 프레임
+(시퀀스 간격), 캡처 → 처리 시작 지연(p50/p99)을 출력한다.
+
+사용법:
+    python benchmarks/bench_ws_transport.py [--decode-ms 0 50 150] [--window 0 2] [--duration 5]
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import uvicorn  # noqa: E402
+import websockets  # noqa: E402
+
+from main import app  # noqa: E402
+from mjpeg import WS_HEADER  # noqa: E402
+
+
+async def viewer(port: int, window: int, decode_ms: float, duration: float) -> dict:
+    """카메라별 (수신 프레임 수, 건너뛴 프레임 수, 지연 목록)"""
+    url = f"ws://127.0.0.1:{port}/ws/video?cameras=0,1&window={window}"
+    stats = {}
+    # 수신 큐를 1로 두어 클라이언트 라이브러리가 메시지를 미리 쌓아 두지 않게 함
+    async with websockets.connect(url, max_size=None, max_queue=1) as ws:
+        started = time.perf_counter()
+        deadline = started + duration
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                message = await asyncio.wait_for(ws.recv(), remaining)
+            except asyncio.TimeoutError:
+                break
+            if isinstance(message, str):
+                continue
+            camera, _, seq, captured_ms = WS_HEADER.unpack_from(message)
+            entry = stats.setdefault(camera, {"frames": 0, "skipped": 0, "last_seq": None, "latency": []})
+            if entry["last_seq"] is not None:
+                entry["skipped"] += max(0, seq - entry["last_seq"] - 1)
+            entry["last_seq"] = seq
+            entry["frames"] += 1
+            # 연결 직후 1초는 지연 통계에서 제외
+            if time.perf_counter() - started >= 1.0:
+                entry["latency"].append(time.time() * 1000 - captured_ms)
+            if decode_ms:
+                await asyncio.sleep(decode_ms / 1000)
+            if window:
+                await ws.send(json.dumps({"ack": camera}))
+    return stats
+
+
+def percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+async def run(port: int, windows: list, decode_list: list, duration: float):
+    await asyncio.sleep(2.0)  # 스트림 안정화 대기
+    print(f"\n{'window':>6} {'처리(ms)':>8} {'카메라':>6} {'수신 fps':>9} {'건너뜀':>7} {'지연 p50(ms)':>12} {'지연 p99(ms)':>12}")
+    for decode_ms in decode_list:
+        for window in windows:
+            stats = await viewer(port, window, decode_ms, duration)
+            for camera in sorted(stats):
+                entry = stats[camera]
+                latency = entry["latency"]
+                print(f"{window:>6} {decode_ms:>8.0f} {camera:>6} {entry['frames'] / duration:>9.2f} "
+                      f"{entry['skipped']:>7} {statistics.median(latency) if latency else 0:>12.1f} "
+                      f"{percentile(latency, 0.99):>12.1f}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8011)
+    ap.add_argument("--window", type=int, nargs="+", default=[0, 2])
+    ap.add_argument("--decode-ms", type=float, nargs="+", default=[0, 50, 150])
+    ap.add_argument("--duration", type=float, default=5)
+    args = ap.parse_args()
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    try:
+        asyncio.run(run(args.port, args.window, args.decode_ms, args.duration))
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,52 +1,431 @@
 #!/usr/bin/env python3
 """
-rpicam-vid 기반 30 FPS 듀얼 카메라 매니저 - 스트림 공유 아키텍처
+30 FPS 듀얼 카메라 매니저 - 스트림 공유 아키텍처 (캡처 명령은 backends.py의 rpicam/replay 백엔드)
 """
 
+import asyncio
+import functools
 import subprocess
 import threading
 import time
 import os
-import signal
 import queue
+import signal
+import selectors
 import uuid
+from collections import deque
+from contextlib import asynccontextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, Generator, Dict, Set, List
+from typing import Optional, AsyncIterator, Callable, Dict, Set, List, Tuple, TypeVar
 import tempfile
 import psutil
 
+from backends import CameraBackend, RpicamBackend, backend_from_env
+from catalog import FileCatalog
+from export import ExportManager
+from h264 import AccessUnit, H264AccessUnitParser, H264FileWriter, PreRollBuffer
+from metrics import ClientMetrics, StreamMetrics, render_prometheus
+from mjpeg import WS_HEADER, MJPEGFrame, MJPEGFrameParser
+from motion import MotionDetector, MotionEvent, MotionEventLog, MotionMonitor
+from retention import RetentionManager
+from thumbnails import ThumbnailService
+
+T = TypeVar("T")
+
+# 시청자 프레임 전달 방식 (SharedStreamManager.add_client 참고)
+DELIVERY_MODES = ("queue", "latest")
+
+
+class H264Encoder:
+    """공유 MJPEG 프레임을 H.264로 인코딩하는 장기 실행 ffmpeg 프로세스
+    
+    녹화 소비자(블랙박스, 수동 녹화)는 카메라 프로세스를 따로 띄우지 않고
+    이 인코더가 내보내는 액세스 유닛을 받아 파일에 기록한다.
+    """
+    
+    # 우선순위 순서 (라즈베리 파이 4 하드웨어 인코더 → 소프트웨어 인코더)
+    ENCODER_CANDIDATES = ["h264_v4l2m2m", "libx264"]
+    _available_encoders: Optional[List[str]] = None
+    
+    def __init__(self, camera_num: int, on_access_unit: Callable[[AccessUnit], None],
+                 framerate: int = 30, bitrate: str = "2M", gop: int = 30):
+        self.camera_num = camera_num
+        self.on_access_unit = on_access_unit
+        self.framerate = framerate
+        self.bitrate = bitrate
+        self.gop = gop  # 키프레임 간격 (프레임)
+        self.process: Optional[subprocess.Popen] = None
+        self.is_running = False
+        self._input_queue: queue.Queue = queue.Queue(maxsize=10)
+        self._timestamps: deque = deque()  # 입력 프레임 캡처 시각 (출력 순서와 동일)
+        self._writer_thread: Optional[threading.Thread] = None
+        self._reader_thread: Optional[threading.Thread] = None
+        
+        # 통계
+        self.frames_in = 0
+        self.frames_dropped = 0
+        self.access_units_out = 0
+    
+    @classmethod
+    def select_codec(cls) -> Optional[str]:
+        """사용 가능한 H.264 인코더 선택 (FABCAM_H264_ENCODER 환경 변수로 지정 가능)"""
+        forced = os.environ.get("FABCAM_H264_ENCODER")
+        if forced:
+            return forced
+        
+        if cls._available_encoders is None:
+            try:
+                result = subprocess.run(
+                    ["ffmpeg", "-hide_banner", "-encoders"],
+                    capture_output=True,
+                    text=True,
+                    timeout=5
+                )
+                cls._available_encoders = [
+                    codec for codec in cls.ENCODER_CANDIDATES
+                    if f" {codec} " in result.stdout
+                    # 하드웨어 인코더는 장치가 있어야 사용 가능 (Pi 5에는 없음)
+                    and (codec != "h264_v4l2m2m" or os.path.exists("/dev/video11"))
+                ]
+            except Exception as e:
+                print(f"❌ ffmpeg 인코더 확인 오류: {e}")
+                cls._available_encoders = []
+        
+        return cls._available_encoders[0] if cls._available_encoders else None
+    
+    def _build_command(self, codec: str) -> List[str]:
+        cmd = [
+            "ffmpeg", "-hide_banner", "-loglevel", "error", "-nostats",
+            "-probesize", "32", "-analyzeduration", "0",
+            "-f", "mjpeg", "-framerate", str(self.framerate), "-i", "pipe:0",
+            "-an", "-c:v", codec,
+            "-b:v", self.bitrate,
+            "-g", str(self.gop),
+            "-pix_fmt", "yuv420p"
+        ]
+        if codec == "libx264":
+            cmd += ["-preset", "ultrafast", "-tune", "zerolatency"]
+        # 모든 키프레임 앞에 SPS/PPS를 넣어 어느 키프레임에서 잘라도 재생 가능하게 함
+        cmd += [
+            "-bsf:v", "dump_extra=freq=keyframe",
+            "-flush_packets", "1",
+            "-f", "h264", "pipe:1"
+        ]
+        return cmd
+    
+    def start(self) -> bool:
+        """인코더 프로세스 시작"""
+        if self.is_running:
+            return True
+        
+        codec = self.select_codec()
+        if not codec:
+            print(f"❌ H.264 인코더를 찾을 수 없습니다 - ffmpeg 설치 필요 (카메라 {self.camera_num})")
+            return False
+        
+        try:
+            cmd = self._build_command(codec)
+            print(f"🎞️ H.264 인코더 시작 (카메라 {self.camera_num}, {codec}): {' '.join(cmd)}")
+            self.process = subprocess.Popen(
+                cmd,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE
+            )
+        except Exception as e:
+            print(f"❌ H.264 인코더 시작 오류 (카메라 {self.camera_num}): {e}")
+            return False
+        
+        self._timestamps.clear()
+        self._input_queue = queue.Queue(maxsize=10)
+        self.is_running = True
+        self._writer_thread = threading.Thread(target=self._writer, daemon=True)
+        self._reader_thread = threading.Thread(target=self._reader, daemon=True)
+        self._writer_thread.start()
+        self._reader_thread.start()
+        return True
+    
+    def stop(self):
+        """인코더 중지 (입력을 닫아 남은 프레임까지 배출)"""
+        if not self.process:
+            return
+        self.is_running = False
+        
+        # 입력 스레드 종료 신호 (큐가 가득 차 있으면 비우고 전달)
+        while True:
+            try:
+                self._input_queue.put_nowait(None)
+                break
+            except queue.Full:
+                try:
+                    self._input_queue.get_nowait()
+                except queue.Empty:
+                    pass
+        
+        current = threading.current_thread()
+        if self._writer_thread and self._writer_thread is not current:
+            self._writer_thread.join(timeout=2)
+        
+        if self.process.poll() is None:
+            try:
+                self.process.wait(timeout=3)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        
+        if self._reader_thread and self._reader_thread is not current:
+            self._reader_thread.join(timeout=2)
+        self.process = None
+    
+    def submit(self, frame: MJPEGFrame):
+        """MJPEG 프레임 입력 (인코더가 밀리면 버림, 호출 스레드는 막지 않음)"""
+        if not self.is_running:
+            return
+        try:
+            self._input_queue.put_nowait(frame)
+            self.frames_in += 1
+        except queue.Full:
+            self.frames_dropped += 1
+    
+    def _next_timestamp(self) -> float:
+        """출력 액세스 유닛에 대응하는 입력 프레임 시각"""
+        try:
+            return self._timestamps.popleft()
+        except IndexError:
+            return time.monotonic()
+    
+    def _writer(self):
+        """입력 큐 → ffmpeg stdin"""
+        stdin = self.process.stdin
+        while True:
+            frame = self._input_queue.get()
+            if frame is None:
+                break
+            self._timestamps.append(frame.timestamp)
+            try:
+                stdin.write(frame.data)
+                stdin.flush()
+            except (BrokenPipeError, OSError, ValueError):
+                break
+        try:
+            stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+    
+    def _reader(self):
+        """ffmpeg stdout → 액세스 유닛 → 소비자"""
+        parser = H264AccessUnitParser(clock=self._next_timestamp)
+        fd = self.process.stdout.fileno()
+        while True:
+            try:
+                chunk = os.read(fd, 65536)
+            except OSError:
+                break
+            if not chunk:
+                break
+            for au in parser.feed(chunk):
+                self.access_units_out += 1
+                self.on_access_unit(au)
+        
+        for au in parser.flush():
+            self.access_units_out += 1
+            self.on_access_unit(au)
+        
+        if self.is_running:
+            print(f"⚠️ H.264 인코더가 예기치 않게 종료됨 (카메라 {self.camera_num})")
+            self.is_running = False
+
+
+class FramePacer:
+    """시청자별 프레임 솎아내기 - 목표 fps에 맞춰 고르게 프레임 선택
+
+    다음 전송 예정 시각(due)을 interval씩 늘려 가며 캡처 시각이 due에 도달한 프레임만
+    통과시킨다. 캡처 간격의 흔들림으로 한 프레임씩 밀리지 않도록 원본 프레임 간격의
+    절반만큼 일찍 온 프레임도 받는다 (30 → 5 fps면 정확히 6프레임마다 하나).
+    """
+    
+    __slots__ = ("fps", "interval", "tolerance", "_due")
+    
+    def __init__(self, fps: float, source_fps: float = 30.0):
+        self.fps = fps
+        self.interval = 1.0 / fps
+        self.tolerance = 0.5 / source_fps
+        self._due: Optional[float] = None
+    
+    def accept(self, timestamp: float) -> bool:
+        if self._due is None or timestamp >= self._due + self.interval:
+            # 첫 프레임이거나 캡처가 끊겼다 재개됨 - 현재 프레임 기준으로 다시 시작
+            self._due = timestamp + self.interval
+            return True
+        if timestamp + self.tolerance >= self._due:
+            self._due += self.interval
+            return True
+        return False
+
+
+class LatestFrameSlot:
+    """카메라별 최신 프레임 하나 (conflated 전달) - 새 프레임이 오면 교체하고 기다리던 시청자를 모두 깨움 (이벤트 루프 전용)"""
+    
+    def __init__(self):
+        self.frame: Optional[MJPEGFrame] = None
+        self.changed = asyncio.Event()
+    
+    def publish(self, frame: MJPEGFrame):
+        self.frame = frame
+        self.wake()
+    
+    def wake(self):
+        """기다리는 시청자를 깨움 (이벤트를 새로 만들어 다음 대기는 다음 프레임까지)"""
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+
+class LatestFrameClient:
+    """conflated 시청자 - 큐 없이 LatestFrameSlot에서 준비될 때마다 가장 새 프레임만 가져감
+    
+    asyncio.Queue와 같은 방식(get/get_nowait/empty/put_nowait(None))으로 쓰므로 전송 경로는 그대로이고,
+    그 사이 지나간 프레임은 시퀀스 간격으로 누락(목표 fps가 있으면 솎아냄)에 집계한다.
+    """
+    
+    def __init__(self, slot: LatestFrameSlot, metrics: StreamMetrics, client: ClientMetrics,
+                 last_seq: int, pacer: Optional[FramePacer] = None):
+        self.slot = slot
+        self.metrics = metrics
+        self.client = client
+        self.last_seq = last_seq
+        self.pacer = pacer
+        self.closed = False
+        self._started = False  # 첫 프레임 앞의 간격은 누락이 아님
+    
+    def _newer(self) -> Optional[MJPEGFrame]:
+        frame = self.slot.frame
+        return frame if frame is not None and frame.seq > self.last_seq else None
+    
+    def _take(self, frame: MJPEGFrame) -> bool:
+        """프레임을 가져감 (목표 fps에 맞지 않으면 False)"""
+        gap = frame.seq - self.last_seq - 1 if self._started else 0
+        self.last_seq = frame.seq
+        if self.pacer is not None:
+            accepted = self.pacer.accept(frame.timestamp)
+            self.client.skipped += gap + (0 if accepted else 1)
+            self._started = self._started or accepted
+            return accepted
+        self._started = True
+        if gap > 0:
+            self.metrics.frames_conflated(self.client, gap)
+        return True
+    
+    def empty(self) -> bool:
+        return not self.closed and self._newer() is None
+    
+    def qsize(self) -> int:
+        return 0 if self.empty() else 1
+    
+    def get_nowait(self) -> Optional[MJPEGFrame]:
+        if self.closed:
+            return None
+        frame = self._newer()
+        if frame is None or not self._take(frame):
+            raise asyncio.QueueEmpty
+        return frame
+    
+    async def get(self) -> Optional[MJPEGFrame]:
+        while not self.closed:
+            changed = self.slot.changed
+            frame = self._newer()
+            if frame is not None and self._take(frame):
+                return frame
+            await changed.wait()
+        return None
+    
+    def put_nowait(self, item: None):
+        """None만 허용 - 스트림 종료 알림"""
+        self.closed = True
+        self.slot.wake()
+
+
 class SharedStreamManager:
-    """단일 프로세스에서 다중 클라이언트를 위한 스트림 공유 매니저"""
+    """카메라별 캡처 브로커 - 단일 캡처 프로세스로 스트리밍/녹화/스냅샷 동시 제공
+    
+    백엔드의 캡처 프로세스(rpicam-vid 또는 재생 소스, MJPEG)가 카메라를 혼자 점유하고,
+    프레임은 실시간 시청자(asyncio 큐), 스냅샷용 latest_frame, H.264 인코더를 거친 녹화 소비자(sink), JPEG 프레임 관찰자
+    (observer, 움직임 감지)로 나뉘어 나간다. 시청자/녹화 소비자/관찰자가 하나라도 있으면 파이프라인이 유지되므로
+    시청을 시작하거나 끝내도 녹화는 끊기지 않는다.
+    마지막 사용자가 떠나도 idle_grace초 동안은 캡처를 유지해, 새로고침/탭 전환으로 다시 연결한 시청자는
+    캡처 재시작 없이 최신 프레임을 바로 받는다.
+    """
     
-    def __init__(self, camera_num: int, camera_manager=None):
+    def __init__(self, camera_num: int, camera_manager=None, backend: Optional[CameraBackend] = None,
+                 idle_grace: float = 0.0):
         self.camera_num = camera_num
         self.camera_manager = camera_manager
+        self.backend = backend or RpicamBackend()
+        self.idle_grace = idle_grace  # 사용자가 모두 떠난 뒤 캡처를 유지할 시간 (0이면 즉시 중지)
+        self._idle_timer: Optional[threading.Timer] = None
+        self._idle_deadline = 0.0  # 유휴 중지 시각 (monotonic, 다시 쓰일 때마다 타이머 대신 이 값만 미룸)
         self.process: Optional[subprocess.Popen] = None
-        self.clients: Dict[str, queue.Queue] = {}  # client_id: frame_queue
+        self.clients: Dict[str, asyncio.Queue] = {}  # client_id: frame_queue 또는 LatestFrameClient (이벤트 루프 전용)
+        self._pacers: Dict[str, FramePacer] = {}  # 목표 fps를 지정한 시청자만 (queue 전달)
+        self._conflated: Set[str] = set()  # latest 전달 시청자 (큐 대신 공유 최신 프레임 슬롯)
+        self._slot: Optional[LatestFrameSlot] = None
+        self._pollers = 0  # 다음 프레임을 기다리는 latest.jpg 요청 수 (이벤트 루프 전용)
+        self._etag_prefix = f"{camera_num}-{uuid.uuid4().hex[:8]}"  # 프로세스마다 다름 (재시작 후 seq 재사용 구분)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None  # 클라이언트 배포용 이벤트 루프
+        self.sinks: Dict[str, Callable[[AccessUnit], None]] = {}  # 녹화 소비자: H.264 액세스 유닛 콜백
+        self.observers: Dict[str, Callable[[MJPEGFrame], None]] = {}  # 프레임 관찰자: JPEG 프레임 콜백 (움직임 감지)
+        self.encoder: Optional[H264Encoder] = None
+        self.preroll: Optional[PreRollBuffer] = None  # 수동 녹화용 최근 N초 H.264
+        self._sink_lock = threading.Lock()  # 액세스 유닛 배포와 소비자 등록(프리롤 재생) 직렬화
         self.is_running = False
         self.frame_reader_thread: Optional[threading.Thread] = None
+        self.width = 640
+        self.height = 480
+        self.framerate = 30
         self.latest_frame: Optional[bytes] = None
+        self.latest_frame_time = 0.0  # time.monotonic() 기준 캡처 시각
+        self._latest: Optional[MJPEGFrame] = None  # 새로 연결한 시청자에게 바로 보낼 최신 프레임
         self.frame_lock = threading.Lock()
-        self.continuous_was_recording = False  # 연속 녹화 상태 저장
-        
+        self.stderr_tail: deque = deque(maxlen=20)  # 최근 캡처 프로세스 stderr
+        self.metrics = StreamMetrics(camera_num)  # 프레임/전송 지표
+        self.reader_wakeups = 0  # 리더 스레드 깨어난 횟수 (통계)
+        self._wakeup_r: Optional[int] = None
+        self._wakeup_w: Optional[int] = None
+        self._state_lock = threading.RLock()  # 시작/중지/소비자 등록 직렬화
+        self._capture_active = False  # 캡처 프로세스 + 리더 스레드 동작 중
+        self._suspended = False  # run_exclusive/suspend_capture로 카메라를 넘겨준 상태
+        self._frame_ready = threading.Event()  # 캡처 시작 후 첫 프레임 도착
+        self._encoder_restart_at = 0.0
+    
     def start_stream(self) -> bool:
-        """스트림 시작 (연속 녹화 일시 중단)"""
-        if self.is_running:
+        """파이프라인 시작 (이미 실행 중이면 그대로 사용)"""
+        with self._state_lock:
+            self._cancel_idle_stop()
+            if self.is_running:
+                return True
+            
+            self.is_running = True
+            if not self._start_capture():
+                self.is_running = False
+                return False
             return True
+    
+    def stop_stream(self):
+        """파이프라인 전체 중지 (시청자, 녹화 소비자, 인코더 포함)"""
+        with self._state_lock:
+            self._cancel_idle_stop()
+            self.is_running = False
+            self.sinks.clear()
+            self.observers.clear()
+            self.preroll = None
+            self._stop_encoder()
+            self._stop_capture()
+            self._close_clients()
         
-        # 스트림 시작 전 연속 녹화 중단
-        if self.camera_manager and self.camera_num in self.camera_manager.continuous_recorders:
-            recorder = self.camera_manager.continuous_recorders[self.camera_num]
-            if recorder.is_recording:
-                print(f"⏸️ 스트림을 위해 연속 녹화 일시 중단 (카메라 {self.camera_num})")
-                recorder.stop_continuous_recording()
-                self.continuous_was_recording = True
-                time.sleep(0.5)  # 프로세스 종료 대기
-            
+        print(f"공유 스트림 중지 (카메라 {self.camera_num})")
+    
+    def _start_capture(self) -> bool:
+        """캡처 프로세스와 FIFO 리더 스레드 시작"""
         try:
             # FIFO 사용하여 stdout 문제 회피
-            import tempfile
             self.fifo_path = f"/tmp/rpicam_fifo_{self.camera_num}"
             
             # 기존 FIFO 제거
@@ -58,17 +437,7 @@ class SharedStreamManager:
             # FIFO 생성
             os.mkfifo(self.fifo_path)
             
-            cmd = [
-                "rpicam-vid",
-                "--camera", str(self.camera_num),
-                "--width", "640",
-                "--height", "480",
-                "--framerate", "30",
-                "--codec", "mjpeg",
-                "--output", self.fifo_path,
-                "--timeout", "0",
-                "--nopreview"
-            ]
+            cmd = self.backend.video_command(self.camera_num, self.width, self.height, self.framerate, self.fifo_path)
             
             print(f" 공유 스트림 시작 (카메라 {self.camera_num}): {' '.join(cmd)}")
             
@@ -78,22 +447,36 @@ class SharedStreamManager:
                 bufsize=0
             )
             
-            # FIFO에서 읽기 위한 파일 열기 (non-blocking)
+            # FIFO에서 읽기 위한 파일 열기 (non-blocking, selectors로 대기)
             self.fifo_fd = os.open(self.fifo_path, os.O_RDONLY | os.O_NONBLOCK)
             
-            self.is_running = True
+            # _stop_capture()가 리더 스레드를 즉시 깨우기 위한 파이프
+            self._wakeup_r, self._wakeup_w = os.pipe()
+            os.set_blocking(self._wakeup_r, False)
+            self.stderr_tail.clear()
+            
+            self._capture_active = True
+            self._frame_ready.clear()
             self.frame_reader_thread = threading.Thread(target=self._frame_reader, daemon=True)
             self.frame_reader_thread.start()
             
             return True
-            
+        
         except Exception as e:
             print(f"스트림 시작 오류 (카메라 {self.camera_num}): {e}")
             return False
     
-    def stop_stream(self):
-        """스트림 중지"""
-        self.is_running = False
+    def _stop_capture(self):
+        """캡처 프로세스와 리더 스레드 정리 (시청자/녹화 소비자는 유지)"""
+        self._capture_active = False
+        self._frame_ready.clear()
+        
+        # 리더 스레드 깨우기
+        if self._wakeup_w is not None:
+            try:
+                os.write(self._wakeup_w, b"x")
+            except OSError:
+                pass
         
         if self.process and self.process.poll() is None:
             try:
@@ -102,315 +485,830 @@ class SharedStreamManager:
             except:
                 self.process.kill()
         
+        # 리더 스레드가 fd를 놓을 때까지 대기 (리더 스레드 자신이 호출한 경우 제외)
+        reader = self.frame_reader_thread
+        if reader and reader.is_alive() and reader is not threading.current_thread():
+            reader.join(timeout=1.0)
+        
         # FIFO 정리
         if hasattr(self, 'fifo_fd'):
             try:
                 os.close(self.fifo_fd)
             except:
                 pass
+            del self.fifo_fd
+        
+        for fd in (self._wakeup_r, self._wakeup_w):
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        self._wakeup_r = self._wakeup_w = None
         
         if hasattr(self, 'fifo_path'):
             try:
                 os.unlink(self.fifo_path)
             except:
                 pass
+    
+    def _restart_capture(self):
+        """카메라 프로세스가 스스로 종료된 경우 재시작 (녹화 소비자가 있을 때)"""
+        with self._state_lock:
+            if not self.is_running or self._capture_active or self._suspended:
+                return
+            print(f"🔄 카메라 프로세스 재시작 (카메라 {self.camera_num})")
+            self._stop_capture()
+            self._start_capture()
+    
+    def run_exclusive(self, func: Callable[[], T]) -> T:
+        """카메라를 잠시 넘겨받아 func 실행 (rpicam-still 등) 후 캡처 재개
         
-        self.clients.clear()
-        
-        # 스트림 중지 후 연속 녹화 재시작
-        if self.continuous_was_recording and self.camera_manager and self.camera_num in self.camera_manager.continuous_recorders:
-            print(f"▶️ 스트림 종료, 연속 녹화 재시작 (카메라 {self.camera_num})")
-            time.sleep(0.5)  # 스트림 프로세스 종료 대기
-            self.camera_manager.continuous_recorders[self.camera_num].start_continuous_recording()
-            self.continuous_was_recording = False
-        
-        print(f"공유 스트림 중지 (카메라 {self.camera_num})")
+        시청자와 녹화 소비자는 연결을 유지하고, 그동안 프레임만 잠시 멈춘다.
+        """
+        with self._state_lock:
+            resume = self.suspend_capture()
+            try:
+                return func()
+            finally:
+                self.resume_capture(resume)
+    
+    def suspend_capture(self) -> bool:
+        """카메라를 다른 프로세스에 넘겨주기 위해 캡처 중지 (반환값: 재개 필요 여부)"""
+        with self._state_lock:
+            resume = self._capture_active
+            self._suspended = True
+            if resume:
+                self._stop_capture()
+            return resume
     
-    def add_client(self) -> str:
-        """클라이언트 추가 및 ID 반환"""
+    def resume_capture(self, resume: bool):
+        """suspend_capture() 이후 캡처 재개"""
+        with self._state_lock:
+            self._suspended = False
+            if resume and self.is_running and not self._capture_active:
+                self._start_capture()
+    
+    def wait_until_ready(self, timeout: float = 5.0) -> bool:
+        """캡처가 시작되어 첫 프레임이 도착할 때까지 대기"""
+        return self._frame_ready.wait(timeout)
+    
+    def add_sink(self, name: str, callback: Callable[[AccessUnit], None], with_preroll: bool = False,
+                 preroll_seconds: Optional[float] = None) -> bool:
+        """녹화 소비자 등록 (파이프라인과 H.264 인코더 자동 시작)
+        
+        with_preroll: 프리롤 버퍼의 최근 프레임을 먼저 전달한 뒤 실시간 프레임을 이어서 전달
+        preroll_seconds: 프리롤 중 최근 N초만 (그 시각을 포함하는 키프레임부터)
+        """
+        with self._state_lock:
+            if not self.start_stream():
+                return False
+            
+            if self.encoder is None or not self.encoder.is_running:
+                self.encoder = H264Encoder(self.camera_num, self._on_access_unit)
+                if not self.encoder.start():
+                    self.encoder = None
+                    if not self._keeps_capture() and not self.clients:
+                        self.stop_stream()
+                    return False
+            
+            # 프리롤 재생과 등록 사이에 도착한 프레임이 빠지거나 중복되지 않도록 배포를 잠시 막음
+            with self._sink_lock:
+                if with_preroll and self.preroll is not None:
+                    since = time.monotonic() - preroll_seconds if preroll_seconds is not None else None
+                    for au in self.preroll.snapshot(since):
+                        callback(au)
+                self.sinks[name] = callback
+            print(f"🎥 녹화 소비자 추가 (카메라 {self.camera_num}): {name} (총 {len(self.sinks)}개)")
+            return True
+    
+    def enable_preroll(self, seconds: float, max_bytes: int) -> bool:
+        """최근 N초 H.264 프리롤 버퍼 활성화 (버퍼 자체가 녹화 소비자로 파이프라인을 유지, 이미 켜져 있으면 보관 시간만 늘림)"""
+        with self._state_lock:
+            if self.preroll is not None and "preroll" in self.sinks:
+                self.preroll.max_seconds = max(self.preroll.max_seconds, seconds)
+                return True
+            self.preroll = PreRollBuffer(seconds, max_bytes)
+            if not self.add_sink("preroll", self.preroll.push):
+                self.preroll = None
+                return False
+            print(f"⏪ 프리롤 버퍼 활성화 (카메라 {self.camera_num}): {seconds}초, 최대 {max_bytes // (1024 * 1024)}MB")
+            return True
+    
+    def remove_sink(self, name: str):
+        """녹화 소비자 제거 (남은 소비자가 없으면 인코더, 시청자도 없으면 파이프라인 중지)"""
+        with self._state_lock:
+            if self.sinks.pop(name, None) is None:
+                return
+            print(f"🎥 녹화 소비자 제거 (카메라 {self.camera_num}): {name} (남은 {len(self.sinks)}개)")
+            
+            if not self.sinks:
+                self._stop_encoder()
+                self._release_if_idle()
+    
+    def add_observer(self, name: str, callback: Callable[[MJPEGFrame], None]) -> bool:
+        """프레임 관찰자 등록 (파이프라인 자동 시작, 리더 스레드에서 프레임마다 호출되므로 즉시 반환해야 함)"""
+        with self._state_lock:
+            if not self.start_stream():
+                return False
+            self.observers[name] = callback
+            print(f"👁️ 프레임 관찰자 추가 (카메라 {self.camera_num}): {name}")
+            return True
+    
+    def remove_observer(self, name: str):
+        """프레임 관찰자 제거 (시청자와 녹화 소비자도 없으면 파이프라인 중지)"""
+        with self._state_lock:
+            if self.observers.pop(name, None) is None:
+                return
+            print(f"👁️ 프레임 관찰자 제거 (카메라 {self.camera_num}): {name}")
+            self._release_if_idle()
+    
+    def _keeps_capture(self) -> bool:
+        """시청자가 없어도 캡처를 유지해야 하는지 (녹화 소비자 또는 프레임 관찰자)"""
+        return bool(self.sinks or self.observers)
+    
+    def _release_if_idle(self):
+        """시청자, 녹화 소비자, 관찰자가 모두 없으면 중지 (idle_grace가 있으면 그 시간 뒤에, 그 사이 다시 쓰면 취소)"""
+        if self.clients or self._pollers or self._keeps_capture() or not self.is_running:
+            return
+        if self.idle_grace <= 0:
+            self.stop_stream()
+            return
+        # latest.jpg 폴링마다 스레드를 새로 만들지 않도록 타이머는 하나만 두고 마감 시각만 미룸
+        self._idle_deadline = time.monotonic() + self.idle_grace
+        if self._idle_timer is None:
+            self._arm_idle_timer(self.idle_grace)
+            print(f"⏳ 사용자 없음 - {self.idle_grace:g}초 동안 캡처 유지 (카메라 {self.camera_num})")
+    
+    def _arm_idle_timer(self, delay: float):
+        self._idle_timer = threading.Timer(delay, self._idle_timeout)
+        self._idle_timer.daemon = True
+        self._idle_timer.start()
+    
+    def _idle_timeout(self):
+        """유휴 타이머 만료 (그 사이 마감 시각이 미뤄졌으면 남은 시간만큼 다시 대기)"""
+        with self._state_lock:
+            if self._idle_timer is not threading.current_thread():
+                return  # 취소됨
+            remaining = self._idle_deadline - time.monotonic()
+            if remaining > 0:
+                self._arm_idle_timer(remaining)
+                return
+            self._idle_timer = None
+            self._stop_if_idle()
+    
+    def _cancel_idle_stop(self):
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+            self._idle_timer = None
+    
+    def _stop_encoder(self):
+        if self.encoder is not None:
+            self.encoder.stop()
+            self.encoder = None
+    
+    def _feed_encoder(self, frame: MJPEGFrame):
+        """녹화 소비자가 있으면 프레임을 인코더로 전달 (인코더가 죽었으면 재시작)"""
+        encoder = self.encoder
+        if encoder is None:
+            return
+        if encoder.is_running:
+            encoder.submit(frame)
+        elif self.sinks and time.monotonic() - self._encoder_restart_at > 5.0:
+            # ffmpeg 종료 대기는 수 초 걸릴 수 있으므로 별도 스레드에서 (그동안 인코더 입력 프레임은 버림)
+            self._encoder_restart_at = time.monotonic()
+            threading.Thread(target=self._restart_encoder, args=(encoder,), daemon=True).start()
+    
+    def _restart_encoder(self, encoder: H264Encoder):
+        """죽은 인코더 재시작 (재시작 스레드, 그 사이 소비자가 모두 빠졌거나 인코더가 교체됐으면 정리만)"""
+        with self._state_lock:
+            if encoder.is_running:  # 앞선 재시작 스레드가 이미 재시작함
+                return
+            encoder.stop()
+            if self.encoder is not encoder or not self.sinks:
+                return
+            print(f"🔄 H.264 인코더 재시작 (카메라 {self.camera_num})")
+            if not encoder.start():
+                print(f"❌ H.264 인코더 재시작 실패 (카메라 {self.camera_num}) - 5초 뒤 다시 시도")
+    
+    def _notify_observers(self, frame: MJPEGFrame):
+        for name, callback in list(self.observers.items()):
+            try:
+                callback(frame)
+            except Exception as e:
+                print(f"프레임 관찰자 오류 (카메라 {self.camera_num}, {name}): {e}")
+    
+    def _on_access_unit(self, au: AccessUnit):
+        """인코더 출력을 모든 녹화 소비자에게 전달 (인코더 스레드)"""
+        with self._sink_lock:
+            for name, callback in list(self.sinks.items()):
+                try:
+                    callback(au)
+                except Exception as e:
+                    print(f"녹화 소비자 오류 (카메라 {self.camera_num}, {name}): {e}")
+    
+    def get_latest_frame(self, max_age: float = 1.0) -> Optional[bytes]:
+        """최근 max_age초 이내의 최신 JPEG 프레임 (캡처 중이 아니거나 오래됐으면 None)"""
+        if not self._capture_active:
+            return None
+        with self.frame_lock:
+            if self.latest_frame is None or time.monotonic() - self.latest_frame_time > max_age:
+                return None
+            return self.latest_frame
+    
+    def queue_depths(self) -> Dict[str, int]:
+        """시청자별 대기 중인 프레임 수"""
+        return {client_id: client_queue.qsize() for client_id, client_queue in list(self.clients.items())}
+    
+    def _in_loop_thread(self) -> bool:
+        """현재 스레드가 클라이언트 배포 이벤트 루프인지 확인"""
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+    
+    def add_client(self, fps: Optional[float] = None, buffer: int = 5, transport: str = "mjpeg",
+                   delivery: str = "queue") -> str:
+        """클라이언트 추가 및 ID 반환 (이벤트 루프에서 호출)
+        
+        fps: 목표 프레임률 (없으면 전체), buffer: 대기 프레임 수 (1이면 최신 프레임만 유지)
+        delivery: "queue" (시청자별 큐, buffer개까지 순서대로) 또는 "latest" (공유 최신 프레임 슬롯, 준비될 때 가장 새 프레임)
+        """
+        self._loop = asyncio.get_running_loop()
+        self._cancel_idle_stop()
         client_id = str(uuid.uuid4())
-        self.clients[client_id] = queue.Queue(maxsize=5)  # 최대 5프레임 버퍼
-        print(f"👤 클라이언트 추가 (카메라 {self.camera_num}): {client_id[:8]}... (총 {len(self.clients)}명)")
+        
+        # 캡처 중인 파이프라인이면 최신 프레임을 바로 전달 (다음 캡처 프레임을 기다리지 않음)
+        latest = self._latest if self._capture_active else None
+        warm = latest is not None and time.monotonic() - latest.timestamp <= 1.0
+        client = self.metrics.add_client(client_id, transport, warm, delivery)
+        pacer = FramePacer(fps, self.framerate) if fps is not None and fps < self.framerate else None
+        if pacer is not None:
+            client.target_fps = fps
+        
+        if delivery == "latest":
+            slot = self._latest_slot()
+            if warm and (slot.frame is None or slot.frame.seq < latest.seq):
+                slot.publish(latest)
+            # warm이면 슬롯의 최신 프레임부터, 아니면 다음 프레임부터
+            last_seq = latest.seq - 1 if warm else (slot.frame.seq if slot.frame is not None else 0)
+            self.clients[client_id] = LatestFrameClient(slot, self.metrics, client, last_seq, pacer)
+            self._conflated.add(client_id)
+        else:
+            self.clients[client_id] = asyncio.Queue(maxsize=buffer)
+            if warm:
+                self.clients[client_id].put_nowait(latest)
+            if pacer is not None:
+                self._pacers[client_id] = pacer
+        
+        rate = f", {fps} fps" if pacer is not None else ""
+        via = ", WebSocket" if transport == "ws" else ""
+        mode = ", latest" if delivery == "latest" else ""
+        start = "warm" if warm else "cold"
+        print(f"👤 클라이언트 추가 (카메라 {self.camera_num}{rate}{via}{mode}, {start}): {client_id[:8]}... (총 {len(self.clients)}명)")
         return client_id
     
+    def _latest_slot(self) -> LatestFrameSlot:
+        if self._slot is None:
+            self._slot = LatestFrameSlot()
+        return self._slot
+    
+    async def wait_frame(self, after: Optional[int] = None, timeout: float = 10.0) -> Optional[MJPEGFrame]:
+        """최신 프레임 (이벤트 루프에서 호출, latest.jpg)
+        
+        after: 이 순번보다 새 프레임이 올 때까지 기다림 (None이면 1초 이내 최신 프레임, 없으면 다음 프레임)
+        timeout 안에 없으면 None. 기다리는 동안은 캡처를 멈추지 않고, 끝나면 시청자가 떠날 때처럼 idle_grace 동안 유지한다.
+        """
+        loop = asyncio.get_running_loop()
+        self._loop = loop
+        if after is not None and after > self.metrics.frames_in:
+            after = None  # 서버 재시작 전의 순번
+        deadline = loop.time() + timeout
+        self._pollers += 1
+        try:
+            while True:
+                frame = self._latest if self._capture_active else None
+                if frame is not None and (frame.seq > after if after is not None
+                                          else time.monotonic() - frame.timestamp <= 1.0):
+                    return frame
+                remaining = deadline - loop.time()
+                if remaining <= 0 or not self.is_running:
+                    return None
+                # 새 프레임마다 슬롯이 한 번 깨우므로 기다리는 요청 수와 무관
+                try:
+                    await asyncio.wait_for(self._latest_slot().changed.wait(), remaining)
+                except asyncio.TimeoutError:
+                    return None
+        finally:
+            self._pollers -= 1
+            self._release_from_loop()
+    
+    def frame_etag(self, frame: MJPEGFrame) -> str:
+        return f'"{self._etag_prefix}-{frame.seq}"'
+    
     def remove_client(self, client_id: str):
         """클라이언트 제거"""
         if client_id in self.clients:
             del self.clients[client_id]
+            self._pacers.pop(client_id, None)
+            self._conflated.discard(client_id)
+            self.metrics.remove_client(client_id)
             print(f"👤 클라이언트 제거 (카메라 {self.camera_num}): {client_id[:8]}... (남은 {len(self.clients)}명)")
             
-            # 클라이언트가 없으면 스트림 중지
-            if not self.clients and self.is_running:
+            self._release_from_loop()
+    
+    def _release_from_loop(self):
+        """시청자와 녹화 소비자가 모두 없으면 중지 (유예 시간이 있으면 타이머, 없으면 프로세스 종료 대기는 이벤트 루프 밖에서)"""
+        if not self.clients and not self._pollers and not self._keeps_capture() and self.is_running:
+            if self.idle_grace > 0:
+                self._release_if_idle()
+            elif self._in_loop_thread():
+                self._loop.run_in_executor(None, self._stop_if_idle)
+            else:
+                self._stop_if_idle()
+    
+    def _stop_if_idle(self):
+        with self._state_lock:
+            if not self.clients and not self._pollers and not self._keeps_capture() and self.is_running:
+                if self.idle_grace > 0:
+                    print(f"💤 유휴 시간 초과 - 캡처 중지 (카메라 {self.camera_num})")
                 self.stop_stream()
     
+    def disconnect_clients(self):
+        """모든 시청자 연결 해제 (녹화 소비자가 있으면 캡처는 계속)"""
+        with self._state_lock:
+            if self._keeps_capture():
+                self._close_clients()
+                print(f"📺 시청자 연결 해제, 녹화는 계속 (카메라 {self.camera_num})")
+            else:
+                self.stop_stream()
+    
+    def _close_clients(self):
+        """모든 클라이언트 스트림 종료 알림 (None 전달)"""
+        if self._loop is None or self._loop.is_closed():
+            self.clients.clear()
+            return
+        if not self._in_loop_thread():
+            self._loop.call_soon_threadsafe(self._close_clients)
+            return
+        
+        for client_id, client_queue in self.clients.items():
+            while client_id not in self._conflated and not client_queue.empty():
+                client_queue.get_nowait()
+            client_queue.put_nowait(None)
+        self.clients.clear()
+        self._conflated.clear()
+        if self._slot is not None:
+            self._slot.wake()  # latest.jpg 대기 요청
+        self._slot = None  # 마지막 프레임 참조 해제
+    
     def _frame_reader(self):
-        """프레임 읽기 및 클라이언트 배포"""
-        buffer = b""
-        frame_start = b"\xff\xd8"
-        frame_end = b"\xff\xd9"
+        """프레임 읽기 및 클라이언트 배포 (selectors 이벤트 대기, stderr 동시 수집)"""
+        parser = MJPEGFrameParser()
+        sel = selectors.DefaultSelector()
+        sel.register(self.fifo_fd, selectors.EVENT_READ, "fifo")
+        sel.register(self._wakeup_r, selectors.EVENT_READ, "wakeup")
         
-        # stderr 출력 체크
+        # rpicam-vid는 프레임마다 stderr에 로그를 남기므로 계속 비워야 파이프가 막히지 않음
         if self.process and self.process.stderr:
-            try:
-                import select
-                import os
-                # stderr를 non-blocking으로 설정
-                fd = self.process.stderr.fileno()
-                fl = os.fcntl(fd, os.fcntl.F_GETFL)
-                os.fcntl(fd, os.fcntl.F_SETFL, fl | os.O_NONBLOCK)
-            except:
-                pass
+            stderr_fd = self.process.stderr.fileno()
+            os.set_blocking(stderr_fd, False)
+            sel.register(stderr_fd, selectors.EVENT_READ, "stderr")
         
-        no_data_count = 0
-        while self.is_running:
-            if not self.process or self.process.poll() is not None:
-                print(f"프로세스 종료됨 (카메라 {self.camera_num})")
-                # stderr 출력 확인
-                if self.process and self.process.stderr:
-                    try:
-                        stderr_output = self.process.stderr.read()
-                        if stderr_output:
-                            print(f"rpicam-vid stderr (카메라 {self.camera_num}): {stderr_output.decode()}")
-                    except:
-                        pass
-                break
+        try:
+            while self._capture_active:
+                events = sel.select(timeout=1.0)
+                self.reader_wakeups += 1
                 
-            try:
-                # FIFO에서 데이터 읽기
-                chunk = os.read(self.fifo_fd, 4096)
-                if not chunk:
-                    no_data_count += 1
-                    if no_data_count % 1000 == 0:  # 10초마다 로그
-                        print(f"데이터 없음 카운트 (카메라 {self.camera_num}): {no_data_count}")
-                        # stderr 체크
-                        if self.process and self.process.stderr:
-                            try:
-                                stderr_data = self.process.stderr.read()
-                                if stderr_data:
-                                    print(f"rpicam-vid stderr: {stderr_data.decode()}")
-                            except:
-                                pass
-                    time.sleep(0.01)
+                if not events:
+                    # 타임아웃: 프로세스가 FIFO를 열기 전에 종료되었는지 확인
+                    if not self.process or self.process.poll() is not None:
+                        self._log_process_exit()
+                        break
                     continue
                 
-                no_data_count = 0  # 데이터를 받으면 카운트 리셋
-                
-            except BlockingIOError:
-                # FIFO에 데이터가 없으면 잠시 대기
-                time.sleep(0.01)
-                continue
-            except Exception as e:
-                print(f"FIFO 읽기 오류 (카메라 {self.camera_num}): {e}")
-                break
-                
-            buffer += chunk
-            
-            # 완전한 JPEG 프레임 찾기
-            while True:
-                start_idx = buffer.find(frame_start)
-                if start_idx == -1:
-                    break
-                
-                end_idx = buffer.find(frame_end, start_idx + 2)
-                if end_idx == -1:
-                    break
-                
-                # 완전한 프레임 추출
-                frame_data = buffer[start_idx:end_idx + 2]
-                buffer = buffer[end_idx + 2:]
-                
-                # MJPEG boundary format
-                mjpeg_frame = (b'--frame\r\n'
-                             b'Content-Type: image/jpeg\r\n'
-                             b'Content-Length: ' + str(len(frame_data)).encode() + b'\r\n\r\n' +
-                             frame_data + b'\r\n')
-                
-                # 최신 프레임 저장 (스냅샷용)
-                with self.frame_lock:
-                    self.latest_frame = frame_data
-                
-                # 모든 클라이언트에게 프레임 배포
-                self._distribute_frame(mjpeg_frame)
+                for key, _ in events:
+                    if key.data == "fifo":
+                        try:
+                            # FIFO에서 재사용 버퍼로 직접 읽기
+                            if not parser.read_from(key.fd):
+                                # writer(캡처 프로세스)가 FIFO를 닫음
+                                self._log_process_exit()
+                                return
+                        except BlockingIOError:
+                            continue
+                        except Exception as e:
+                            print(f"FIFO 읽기 오류 (카메라 {self.camera_num}): {e}")
+                            return
+                        
+                        # 완전한 JPEG 프레임 배포 (multipart 헤더는 프레임당 한 번, 별도 전송)
+                        loop = self._loop
+                        for frame in parser.frames_available():
+                            # 소스가 기록한 캡처 시각 (epoch → monotonic, 없으면 수신 시각 유지)
+                            captured = self.backend.capture_time(frame.data)
+                            if captured is not None:
+                                frame.captured = frame.timestamp - (time.time() - captured)
+                            
+                            # 최신 프레임 저장 (스냅샷용)
+                            with self.frame_lock:
+                                self.latest_frame = frame.data
+                                self.latest_frame_time = frame.timestamp
+                            # 순번을 먼저 매긴 뒤 공개 (이벤트 루프가 잠금 없이 _latest를 읽고 헤더를 캐시하므로)
+                            self.metrics.frame_captured(len(frame.data), frame.timestamp, frame.captured)
+                            frame.seq = self.metrics.frames_in
+                            self._latest = frame
+                            if not self._frame_ready.is_set():
+                                self._frame_ready.set()
+                            
+                            # 녹화 소비자용 H.264 인코더
+                            self._feed_encoder(frame)
+                            
+                            # 프레임 관찰자 (움직임 감지 - 솎아내기만 하고 분석은 관찰자 스레드에서)
+                            if self.observers:
+                                self._notify_observers(frame)
+                            
+                            # 이벤트 루프에서 모든 클라이언트에게 프레임 배포
+                            if loop is not None and (self.clients or self._pollers):
+                                try:
+                                    loop.call_soon_threadsafe(self._distribute_frame, frame)
+                                except RuntimeError:
+                                    # 이벤트 루프 종료됨
+                                    loop = self._loop = None
+                    
+                    elif key.data == "stderr":
+                        if not self._drain_stderr(key.fd):
+                            sel.unregister(key.fd)
+                    
+                    elif key.data == "wakeup":
+                        # stop_stream() 호출로 깨어남
+                        try:
+                            os.read(key.fd, 64)
+                        except BlockingIOError:
+                            pass
+        finally:
+            sel.close()
+            # 프로세스가 스스로 종료된 경우: 녹화 중이면 재시작, 아니면 대기 중인 클라이언트를 깨움
+            if self._capture_active:
+                self._capture_active = False
+                if self._keeps_capture() and self.is_running:
+                    timer = threading.Timer(1.0, self._restart_capture)
+                    timer.daemon = True
+                    timer.start()
+                else:
+                    self._close_clients()
     
-    def _distribute_frame(self, frame: bytes):
-        """모든 클라이언트에게 프레임 배포"""
-        dead_clients = []
-        
+    def _drain_stderr(self, fd: int) -> bool:
+        """캡처 프로세스 stderr 비우기 (최근 줄만 보관, False = EOF)"""
+        try:
+            data = os.read(fd, 65536)
+        except BlockingIOError:
+            return True
+        except OSError:
+            return False
+        if not data:
+            return False
+        lines = data.decode(errors="replace").splitlines()
+        self.stderr_tail.extend(line for line in lines if line.strip())
+        return True
+    
+    def _log_process_exit(self):
+        """프로세스 종료 로그 (최근 stderr 포함, 의도적인 중지는 제외)"""
+        if not self._capture_active:
+            return
+        print(f"프로세스 종료됨 (카메라 {self.camera_num})")
+        if self.stderr_tail:
+            print(f"캡처 프로세스 stderr (카메라 {self.camera_num}): " + "\n".join(self.stderr_tail))
+    
+    def _distribute_frame(self, frame: MJPEGFrame):
+        """모든 클라이언트에게 프레임 배포 (이벤트 루프에서 실행)"""
+        client_metrics = self.metrics.clients
+        pacers = self._pacers
+        conflated = self._conflated
+        frame.dispatched = time.monotonic()
+        self.metrics.frame_dispatched(frame.dispatched - frame.timestamp)
+        if conflated or self._pollers:
+            # latest 전달 시청자와 latest.jpg 대기 요청은 슬롯 하나를 공유 (수와 무관하게 프레임 교체 한 번)
+            self._latest_slot().publish(frame)
         for client_id, client_queue in self.clients.items():
+            if client_id in conflated:
+                continue
+            # 목표 fps를 지정한 시청자는 큐에 넣기 전에 솎아냄 (전송/복사 비용 없음)
+            pacer = pacers.get(client_id)
+            if pacer is not None and not pacer.accept(frame.timestamp):
+                client = client_metrics.get(client_id)
+                if client is not None:
+                    client.skipped += 1
+                continue
+            # 큐가 가득 차면 오래된 프레임 제거
+            if client_queue.full():
+                client_queue.get_nowait()
+                client = client_metrics.get(client_id)
+                if client is not None:
+                    self.metrics.frame_dropped(client)
+            client_queue.put_nowait(frame)
+    
+    def newest_frame(self, client_id: str, frame: Optional[MJPEGFrame]) -> Optional[MJPEGFrame]:
+        """그 사이 큐에 더 새로운 프레임이 들어왔으면 그것으로 교체 (밀려난 프레임은 누락으로 집계)"""
+        client_queue = self.clients.get(client_id)
+        while frame is not None and client_queue is not None and not client_queue.empty():
             try:
-                # 큐가 가득 차면 오래된 프레임 제거
-                if client_queue.full():
-                    try:
-                        client_queue.get_nowait()
-                    except queue.Empty:
-                        pass
-                
-                client_queue.put(frame, block=False)
-                
-            except queue.Full:
-                # 클라이언트가 응답하지 않으면 제거 대상으로 표시
-                dead_clients.append(client_id)
-            except Exception as e:
-                print(f"프레임 배포 오류 (클라이언트 {client_id[:8]}...): {e}")
-                dead_clients.append(client_id)
-        
-        # 응답하지 않는 클라이언트 제거
-        for client_id in dead_clients:
-            self.remove_client(client_id)
+                newer = client_queue.get_nowait()
+            except asyncio.QueueEmpty:  # latest 전달에서 목표 fps에 맞지 않아 솎아낸 프레임
+                break
+            client = self.metrics.clients.get(client_id)
+            if newer is not None and client is not None:
+                self.metrics.frame_dropped(client)
+            frame = newer
+        return frame
     
-    def get_client_stream(self, client_id: str) -> Generator[bytes, None, None]:
-        """특정 클라이언트를 위한 스트림 제너레이터"""
-        if client_id not in self.clients:
+    async def get_client_stream(self, client_id: str) -> AsyncIterator[bytes]:
+        """특정 클라이언트를 위한 비동기 스트림 (파트 헤더와 프레임을 복사 없이 전송)"""
+        client_queue = self.clients.get(client_id)
+        client = self.metrics.clients.get(client_id)
+        if client_queue is None or client is None:
             return
-            
-        client_queue = self.clients[client_id]
         
         try:
-            while client_id in self.clients and self.is_running:
-                try:
-                    frame = client_queue.get(timeout=1.0)
-                    yield frame
-                except queue.Empty:
-                    continue
-                except Exception as e:
-                    print(f"클라이언트 스트림 오류 ({client_id[:8]}...): {e}")
+            while self.is_running:
+                frame = await client_queue.get()
+                if frame is None:
+                    # 스트림 종료
                     break
+                dequeued = time.monotonic()
+                self.metrics.frame_dequeued(client, frame.dispatched, dequeued)
+                header = frame.part_header
+                yield header
+                yield frame.data
+                # 전송 계층이 프레임을 받아간 시점까지의 지연
+                now = time.monotonic()
+                self.metrics.frame_sent(client, len(header) + len(frame.data), now - frame.captured, now - dequeued)
         finally:
             self.remove_client(client_id)
 
 
+class FrameMultiplexer:
+    """여러 카메라의 프레임을 하나로 합친 스트림 (WebSocket 전송용)
+    
+    카메라마다 1프레임짜리 시청자 큐를 두고, 꺼낼 때 그 사이 도착한 더 새로운 프레임으로
+    바꿔 보낸다. 전송이 밀리면 지연이 쌓이는 대신 중간 프레임을 건너뛴다 (최신 프레임 우선).
+    구독 카메라는 연결을 유지한 채 바꿀 수 있다.
+    
+    window: 카메라별로 확인(ack) 없이 보낼 수 있는 프레임 수 (0이면 확인 없음).
+    소켓 버퍼는 수 MB까지 커지므로 TCP 흐름 제어만으로는 수 초의 지연이 쌓일 수 있다.
+    delivery: "latest"면 1프레임 큐 대신 카메라의 공유 최신 프레임 슬롯에서 꺼냄
+    """
+    
+    def __init__(self, camera_manager, fps: Optional[float] = None, window: int = 0, delivery: str = "queue"):
+        self.camera_manager = camera_manager
+        self.fps = fps
+        self.window = window
+        self.delivery = delivery
+        self.subscriptions: Dict[int, Tuple[SharedStreamManager, str]] = {}  # 카메라: (스트림, 클라이언트 ID)
+        self._in_flight: Dict[int, int] = {}  # 카메라: 확인받지 못한 프레임 수
+        self._waiters: Dict[int, asyncio.Future] = {}
+        self._changed = asyncio.Event()
+    
+    async def subscribe(self, camera_num: int) -> bool:
+        """카메라 구독 추가 (필요하면 스트림 시작)"""
+        if camera_num in self.subscriptions:
+            return True
+        shared_stream = await self.camera_manager.ensure_shared_stream(camera_num)
+        if shared_stream is None:
+            return False
+        client_id = shared_stream.add_client(self.fps, buffer=1, transport="ws", delivery=self.delivery)
+        self.subscriptions[camera_num] = (shared_stream, client_id)
+        self._in_flight[camera_num] = 0
+        self._changed.set()
+        return True
+    
+    def ack(self, camera_num: int):
+        """클라이언트가 프레임 하나를 처리함 (다음 최신 프레임 전송 허용)"""
+        if self._in_flight.get(camera_num, 0) > 0:
+            self._in_flight[camera_num] -= 1
+            self._changed.set()
+    
+    def unsubscribe(self, camera_num: int):
+        """카메라 구독 해제"""
+        entry = self.subscriptions.pop(camera_num, None)
+        if entry is None:
+            return
+        waiter = self._waiters.pop(camera_num, None)
+        if waiter is not None:
+            waiter.cancel()
+        self._in_flight.pop(camera_num, None)
+        shared_stream, client_id = entry
+        shared_stream.remove_client(client_id)
+        self._changed.set()
+    
+    def close(self):
+        for camera_num in list(self.subscriptions):
+            self.unsubscribe(camera_num)
+    
+    async def frames(self) -> AsyncIterator[Tuple[int, Optional[MJPEGFrame]]]:
+        """(카메라, 프레임) 스트림 - 카메라 스트림이 끝나면 (카메라, None)을 내보내고 구독 해제
+        
+        다음 프레임을 요청할 때 앞 프레임이 전송된 것으로 보고 지표에 기록한다.
+        """
+        while True:
+            for camera_num, (shared_stream, client_id) in list(self.subscriptions.items()):
+                if camera_num in self._waiters:
+                    continue
+                if self.window and self._in_flight[camera_num] >= self.window:
+                    continue  # 확인 대기 - 그동안 도착한 프레임은 큐에서 최신 것으로 교체됨
+                client_queue = shared_stream.clients.get(client_id)
+                if client_queue is None:
+                    # 캡처 재시작 등으로 시청자 목록이 비워짐
+                    self.unsubscribe(camera_num)
+                    yield camera_num, None
+                    continue
+                self._waiters[camera_num] = asyncio.ensure_future(client_queue.get())
+            
+            self._changed.clear()
+            changed = asyncio.ensure_future(self._changed.wait())
+            try:
+                await asyncio.wait([changed, *self._waiters.values()], return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                changed.cancel()
+            
+            for camera_num in [num for num, waiter in self._waiters.items() if waiter.done()]:
+                waiter = self._waiters.pop(camera_num)
+                if waiter.cancelled() or camera_num not in self.subscriptions:
+                    continue
+                shared_stream, client_id = self.subscriptions[camera_num]
+                # 다른 카메라 프레임을 보내는 동안 밀린 프레임은 최신 것으로 교체
+                frame = shared_stream.newest_frame(client_id, waiter.result())
+                if frame is None:
+                    self.unsubscribe(camera_num)
+                    yield camera_num, None
+                    continue
+                if camera_num in self._in_flight:
+                    self._in_flight[camera_num] += 1
+                dequeued = time.monotonic()
+                client = shared_stream.metrics.clients.get(client_id)
+                if client is not None:
+                    shared_stream.metrics.frame_dequeued(client, frame.dispatched, dequeued)
+                yield camera_num, frame
+                client = shared_stream.metrics.clients.get(client_id)
+                if client is not None:
+                    now = time.monotonic()
+                    shared_stream.metrics.frame_sent(client, WS_HEADER.size + len(frame.data),
+                                                     now - frame.captured, now - dequeued)
+
+
 class ContinuousRecorder:
-    """블랙박스 형태 연속 녹화 시스템 (640×480)"""
+    """블랙박스 형태 연속 녹화 시스템 (640×480, 공유 캡처 브로커의 H.264 소비자)"""
+    
+    SINK_NAME = "continuous"
+    DEFAULT_SEGMENT_DURATION = 30  # 초 (FABCAM_SEGMENT_SECONDS 환경 변수로 변경 가능)
     
-    def __init__(self, camera_num: int, output_dir: Path):
+    def __init__(self, camera_num: int, output_dir: Path, stream: SharedStreamManager,
+                 segment_duration: Optional[float] = None, catalog: Optional[FileCatalog] = None,
+                 thumbnails: Optional[ThumbnailService] = None,
+                 on_segment: Optional[Callable[[], None]] = None):
         self.camera_num = camera_num
         self.output_dir = output_dir
-        self.process: Optional[subprocess.Popen] = None
+        self.stream = stream
+        self.catalog = catalog
+        self.thumbnails = thumbnails
+        self.on_segment = on_segment  # 세그먼트 파일이 완성될 때마다 (보존 정책 즉시 실행)
         self.is_recording = False
         self.start_time: Optional[datetime] = None
         self.current_file_index = 0
+        self._writer: Optional[H264FileWriter] = None
+        self._segment_started_at: Optional[float] = None
+        self._last_segment_end: Optional[float] = None
+        self._lock = threading.Lock()
+        
+        # 세그먼트 길이 (키프레임 경계에서 분할하므로 실제 길이는 GOP 단위로 맞춰짐)
+        if segment_duration is None:
+            segment_duration = float(os.environ.get("FABCAM_SEGMENT_SECONDS", self.DEFAULT_SEGMENT_DURATION))
+        self.segment_duration = segment_duration
         
-        # 30초 세그먼트 (개발용)
-        self.segment_duration = 30
+        # 완료된 세그먼트 메타데이터 (최근 48개)
+        self.segments: deque = deque(maxlen=48)
         
         # 출력 디렉토리 생성
         self.output_dir.mkdir(parents=True, exist_ok=True)
-        
-    def start_continuous_recording(self) -> bool:
-        """연속 녹화 시작"""
+    
+    def start_continuous_recording(self, segment_duration: Optional[float] = None) -> bool:
+        """연속 녹화 시작 (캡처 브로커에 녹화 소비자로 등록)"""
         if self.is_recording:
             return True
-            
-        try:
-            # 기존 파일 인덱스 확인
-            self._update_file_index()
-            
-            # 출력 파일 설정 (단일 파일, 타임스탬프 기반)
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_file = self.output_dir / f"rec_{self.camera_num}_{timestamp}.mp4"
-            
-            cmd = [
-                "rpicam-vid",
-                "--camera", str(self.camera_num),
-                "--width", "640",
-                "--height", "480", 
-                "--framerate", "30",
-                "--codec", "h264",
-                "--output", str(output_file),
-                "--timeout", str(self.segment_duration * 1000),  # 30초 녹화 후 종료
-                "--nopreview"
-            ]
-            
-            print(f"🎬 연속 녹화 시작 (카메라 {self.camera_num}, 640×480): {' '.join(cmd)}")
-            
-            self.process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                bufsize=0
-            )
-            
-            self.is_recording = True
-            self.start_time = datetime.now()
-            
-            # 자동 재시작 모니터링 시작
-            self._start_monitoring()
-            
-            print(f"✅ 카메라 {self.camera_num} 연속 녹화 시작됨 ({self.segment_duration}초 세그먼트)")
-            return True
-            
-        except Exception as e:
-            print(f"❌ 연속 녹화 시작 오류 (카메라 {self.camera_num}): {e}")
+        
+        if segment_duration is not None:
+            if segment_duration <= 0:
+                print(f"❌ 잘못된 세그먼트 길이: {segment_duration}")
+                return False
+            self.segment_duration = segment_duration
+        
+        # 기존 파일 인덱스 확인
+        self._update_file_index()
+        
+        self.is_recording = True
+        self.start_time = datetime.now()
+        self._last_segment_end = None
+        
+        if not self.stream.add_sink(self.SINK_NAME, self._on_access_unit):
+            self.is_recording = False
+            self.start_time = None
+            print(f"❌ 연속 녹화 시작 오류 (카메라 {self.camera_num})")
             return False
+        
+        print(f"✅ 카메라 {self.camera_num} 연속 녹화 시작됨 ({self.segment_duration}초 세그먼트)")
+        return True
     
     def stop_continuous_recording(self):
         """연속 녹화 중지"""
         if not self.is_recording:
             return
-            
-        self.is_recording = False
         
-        if self.process and self.process.poll() is None:
-            try:
-                self.process.terminate()
-                self.process.wait(timeout=5)
-            except:
-                self.process.kill()
+        with self._lock:
+            self.is_recording = False
+            self._close_segment()
+        
+        # 인코더 스레드 종료를 기다릴 수 있으므로 잠금 밖에서 해제
+        self.stream.remove_sink(self.SINK_NAME)
         
         duration = None
         if self.start_time:
             duration = datetime.now() - self.start_time
-            
+        
         print(f"🛑 카메라 {self.camera_num} 연속 녹화 중지됨 (총 시간: {duration})")
     
-    def _start_monitoring(self):
-        """연속 녹화 모니터링 시작"""
-        def monitor_process():
-            while self.is_recording:
-                if self.process and self.process.poll() is not None:
-                    # 프로세스가 종료됨 (30초 세그먼트 완료)
-                    if self.is_recording:  # 여전히 녹화 중이어야 함
-                        print(f"🔄 연속 녹화 세그먼트 완료, 재시작 (카메라 {self.camera_num})")
-                        self._restart_recording()
-                time.sleep(1)
-        
-        monitoring_thread = threading.Thread(target=monitor_process, daemon=True)
-        monitoring_thread.start()
-    
-    def _restart_recording(self):
-        """연속 녹화 재시작 (새 세그먼트)"""
-        if not self.is_recording:
-            return
-        
-        try:
-            # 새 파일명 생성
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_file = self.output_dir / f"rec_{self.camera_num}_{timestamp}.mp4"
-            
-            cmd = [
-                "rpicam-vid",
-                "--camera", str(self.camera_num),
-                "--width", "640",
-                "--height", "480", 
-                "--framerate", "30",
-                "--codec", "h264",
-                "--output", str(output_file),
-                "--timeout", str(self.segment_duration * 1000),
-                "--nopreview"
-            ]
-            
-            self.process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                bufsize=0
-            )
+    def _on_access_unit(self, au: AccessUnit):
+        """인코더 출력 기록 (세그먼트 시간이 지나면 다음 키프레임에서 새 파일)"""
+        with self._lock:
+            if not self.is_recording:
+                return
             
-            print(f"📹 연속 녹화 새 세그먼트 시작 (카메라 {self.camera_num})")
+            if au.keyframe and (
+                self._writer is None
+                or au.timestamp - self._segment_started_at >= self.segment_duration
+            ):
+                self._open_segment(au.timestamp)
             
-        except Exception as e:
-            print(f"❌ 연속 녹화 재시작 오류 (카메라 {self.camera_num}): {e}")
-            self.is_recording = False
+            if self._writer is not None:
+                self._writer.write(au)
+    
+    def _open_segment(self, timestamp: float):
+        """새 세그먼트 파일 시작 (이전 세그먼트는 닫음)"""
+        if self._writer is not None:
+            print(f"🔄 연속 녹화 세그먼트 완료 (카메라 {self.camera_num}): {self._writer.path.name}")
+        self._close_segment()
+        
+        # 파일명은 첫 프레임의 캡처 시각 기준 (같은 초에 세그먼트가 또 시작되면 -2, -3 ... 을 붙여 덮어쓰지 않음)
+        stem = f"rec_{self.camera_num}_{self._wall_time(timestamp).strftime('%Y%m%d_%H%M%S')}"
+        filename = f"{stem}.mp4"
+        counter = 1
+        while (self.output_dir / filename).exists():
+            counter += 1
+            filename = f"{stem}-{counter}.mp4"
+        self._writer = H264FileWriter(self.output_dir / filename)
+        self._segment_started_at = timestamp
+        self.current_file_index += 1
+        
+        # 포스터: 세그먼트 시작 시점의 스트림 프레임
+        if self.thumbnails:
+            poster = self.stream.get_latest_frame()
+            if poster:
+                self.thumbnails.submit_path(self._writer.path, poster)
+        print(f"📹 연속 녹화 새 세그먼트 시작 (카메라 {self.camera_num}): {filename}")
+    
+    def _close_segment(self):
+        """현재 세그먼트 파일을 닫고 메타데이터 기록"""
+        writer = self._writer
+        if writer is None:
+            return
+        writer.close()
+        self._writer = None
+        if not writer.started:
+            return
+        
+        # 이전 세그먼트 마지막 프레임과 이 세그먼트 첫 프레임 사이 간격 (정상이면 한 프레임 간격)
+        gap = None
+        if self._last_segment_end is not None:
+            gap = round(writer.first_timestamp - self._last_segment_end, 4)
+        self._last_segment_end = writer.last_timestamp
+        
+        self.segments.append({
+            "filename": writer.path.name,
+            "start_time": self._wall_time(writer.first_timestamp).isoformat(),
+            "end_time": self._wall_time(writer.last_timestamp).isoformat(),
+            "duration": round(writer.last_timestamp - writer.first_timestamp, 3),
+            "frames": writer.frames,
+            "size": writer.bytes_written,
+            "gap_before": gap
+        })
+        
+        if self.catalog:
+            self.catalog.add_file(writer.path)
+        if self.on_segment:
+            self.on_segment()
+
+    @staticmethod
+    def _wall_time(timestamp: float) -> datetime:
+        """time.monotonic() 기준 캡처 시각 → 벽시계 시각"""
+        return datetime.fromtimestamp(time.time() - (time.monotonic() - timestamp))
     
     def _update_file_index(self):
         """기존 파일 개수 확인하여 인덱스 설정"""
@@ -436,7 +1334,9 @@ class ContinuousRecorder:
             "camera_id": self.camera_num,
             "start_time": self.start_time.isoformat() if self.start_time else None,
             "duration": None,
-            "current_segment": self.current_file_index
+            "current_segment": self.current_file_index,
+            "segment_duration": self.segment_duration,
+            "last_segment": self.segments[-1] if self.segments else None
         }
         
         if self.is_recording and self.start_time:
@@ -444,108 +1344,107 @@ class ContinuousRecorder:
             status["duration"] = int(duration.total_seconds())
             
         return status
-    
-    def cleanup_old_files(self, max_files: int = 48):
-        """오래된 파일 정리 (기본: 48개 = 24시간)"""
-        try:
-            files = sorted(
-                self.output_dir.glob(f"rec_{self.camera_num}_*.mp4"),
-                key=lambda f: f.stat().st_mtime
-            )
-            
-            if len(files) > max_files:
-                files_to_delete = files[:-max_files]
-                for file in files_to_delete:
-                    file.unlink()
-                    print(f"🗑️ 오래된 녹화 파일 삭제: {file.name}")
-                    
-        except Exception as e:
-            print(f"파일 정리 오류 (카메라 {self.camera_num}): {e}")
 
 
 class ManualRecorder:
-    """사용자 제어 기본 녹화 시스템 (640×480)"""
+    """사용자 제어 기본 녹화 시스템 (640×480, 공유 캡처 브로커의 H.264 소비자, 프리롤 포함)"""
+    
+    SINK_NAME = "manual"
     
-    def __init__(self, output_dir: Path):
+    def __init__(self, output_dir: Path, stream_provider: Callable[[int], Optional[SharedStreamManager]],
+                 catalog: Optional[FileCatalog] = None, thumbnails: Optional[ThumbnailService] = None):
         self.output_dir = output_dir
-        self.recording_processes: Dict[int, subprocess.Popen] = {}
+        self.stream_provider = stream_provider  # camera_id → 캡처 브로커
+        self.catalog = catalog
+        self.thumbnails = thumbnails
+        self.recording_writers: Dict[int, H264FileWriter] = {}
         self.recording_start_time: Optional[datetime] = None
+        self._started_at: Optional[float] = None  # time.monotonic() 기준 시작 시각
         self.recording_files: Dict[int, str] = {}  # camera_id: filename
+        self._lock = threading.Lock()
         
         # 출력 디렉토리 생성
         self.output_dir.mkdir(parents=True, exist_ok=True)
     
     def start_manual_recording(self, camera_ids: List[int]) -> bool:
         """수동 녹화 시작 (640×480)"""
-        if self.recording_processes:
+        if self.recording_writers:
             print("⚠️ 이미 수동 녹화가 진행 중입니다")
             return False
-            
+        
         try:
             self.recording_start_time = datetime.now()
+            self._started_at = time.monotonic()
             timestamp = self.recording_start_time.strftime("%Y%m%d_%H%M%S")
             started_cameras = []
             
             for camera_id in camera_ids:
                 print(f"📋 수동 녹화 시도: 카메라 {camera_id}")
+                stream = self.stream_provider(camera_id)
+                if stream is None:
+                    print(f"❌ 카메라 {camera_id} 사용 불가")
+                    continue
+                
                 filename = f"manual_{timestamp}_cam{camera_id}.mp4"
                 filepath = self.output_dir / filename
                 
-                cmd = [
-                    "rpicam-vid",
-                    "--camera", str(camera_id),
-                    "--width", "640",
-                    "--height", "480",
-                    "--framerate", "30",
-                    "--codec", "h264",
-                    "--output", str(filepath),
-                    "--timeout", "0",  # 무한 실행 (수동 중지까지)
-                    "--nopreview"
-                ]
-                
                 print(f"🎬 수동 녹화 시작 (카메라 {camera_id}, 640×480): {filename}")
                 print(f"💾 저장 경로: {filepath}")
                 
-                process = subprocess.Popen(
-                    cmd,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    bufsize=0
-                )
+                with self._lock:
+                    self.recording_writers[camera_id] = H264FileWriter(filepath)
                 
-                # 프로세스가 정상 시작되었는지 확인
-                time.sleep(0.8)  # 조금 더 긴 대기
-                if process.poll() is not None:
-                    # 프로세스가 이미 종료됨
-                    stderr_output = process.stderr.read().decode('utf-8', errors='ignore')
-                    stdout_output = process.stdout.read().decode('utf-8', errors='ignore')
-                    print(f"❌ 카메라 {camera_id} 녹화 프로세스 실패")
-                    print(f"  stderr: {stderr_output}")
-                    print(f"  stdout: {stdout_output}")
-                    print(f"  return code: {process.returncode}")
+                # 프리롤(최근 N초)을 바로 기록하고 실시간 프레임을 이어서 기록
+                callback = functools.partial(self._on_access_unit, camera_id)
+                if not stream.add_sink(self.SINK_NAME, callback, with_preroll=True):
+                    print(f"❌ 카메라 {camera_id} 녹화 소비자 등록 실패")
+                    with self._lock:
+                        del self.recording_writers[camera_id]
                     continue
                 
-                self.recording_processes[camera_id] = process
                 self.recording_files[camera_id] = filename
                 started_cameras.append(camera_id)
+                
+                # 포스터: 녹화 시작 시점의 스트림 프레임
+                poster = stream.get_latest_frame()
+                if self.thumbnails and poster:
+                    self.thumbnails.submit_path(filepath, poster)
+                preroll = self._preroll_seconds(camera_id)
+                if preroll:
+                    print(f"⏪ 프리롤 {preroll}초 기록됨 (카메라 {camera_id})")
             
             if started_cameras:
                 print(f"✅ 수동 녹화 시작됨: 카메라 {started_cameras} (640×480)")
                 return True
             else:
                 print("❌ 수동 녹화를 시작할 수 있는 카메라가 없습니다")
+                self.recording_start_time = None
                 return False
-                
+        
         except Exception as e:
             print(f"❌ 수동 녹화 시작 오류: {e}")
             self.stop_manual_recording()  # 실패시 정리
             return False
     
+    def _on_access_unit(self, camera_id: int, au: AccessUnit):
+        """인코더 출력 기록 (첫 키프레임부터)"""
+        with self._lock:
+            writer = self.recording_writers.get(camera_id)
+            if writer is not None:
+                writer.write(au)
+    
+    def _preroll_seconds(self, camera_id: int) -> float:
+        """녹화 시작 시점 이전에 기록된 구간 길이 (초)"""
+        writer = self.recording_writers.get(camera_id)
+        if writer is None or not writer.started or self._started_at is None:
+            return 0.0
+        return round(max(0.0, self._started_at - writer.first_timestamp), 2)
+    
     def stop_manual_recording(self) -> Dict[int, str]:
         """수동 녹화 중지 및 파일 반환"""
-        if not self.recording_processes:
+        if not self.recording_writers:
             return {}
-            
+        
         saved_files = {}
         duration = None
         
@@ -553,72 +1452,245 @@ class ManualRecorder:
             duration = datetime.now() - self.recording_start_time
         
         try:
-            for camera_id, process in list(self.recording_processes.items()):
+            for camera_id in list(self.recording_writers.keys()):
                 try:
-                    if process.poll() is None:
-                        process.terminate()
-                        process.wait(timeout=5)
+                    stream = self.stream_provider(camera_id)
+                    if stream is not None:
+                        stream.remove_sink(self.SINK_NAME)
+                    
+                    with self._lock:
+                        writer = self.recording_writers.pop(camera_id)
+                        writer.close()
                     
                     filename = self.recording_files.get(camera_id)
                     if filename:
                         filepath = self.output_dir / filename
                         if filepath.exists() and filepath.stat().st_size > 0:
                             saved_files[camera_id] = filename
+                            if self.catalog:
+                                self.catalog.add_file(filepath)
                             print(f"💾 수동 녹화 저장됨 (카메라 {camera_id}): {filename}")
                         else:
                             print(f"⚠️ 수동 녹화 파일이 생성되지 않음 (카메라 {camera_id})")
-                    
+                
                 except Exception as e:
                     print(f"수동 녹화 중지 오류 (카메라 {camera_id}): {e}")
             
             print(f"🛑 수동 녹화 완료 (총 시간: {duration}, 저장된 파일: {len(saved_files)}개)")
-            
+        
         finally:
             # 정리
-            self.recording_processes.clear()
+            with self._lock:
+                for writer in self.recording_writers.values():
+                    writer.close()
+                self.recording_writers.clear()
             self.recording_files.clear()
             self.recording_start_time = None
-            
+            self._started_at = None
+        
         return saved_files
     
     def get_recording_status(self) -> dict:
         """수동 녹화 상태 반환"""
         status = {
-            "is_recording": bool(self.recording_processes),
-            "camera_count": len(self.recording_processes),
-            "cameras": list(self.recording_processes.keys()),
+            "is_recording": bool(self.recording_writers),
+            "camera_count": len(self.recording_writers),
+            "cameras": list(self.recording_writers.keys()),
             "start_time": self.recording_start_time.isoformat() if self.recording_start_time else None,
             "duration": None,
-            "files": dict(self.recording_files)
+            "files": dict(self.recording_files),
+            "preroll_seconds": {camera_id: self._preroll_seconds(camera_id) for camera_id in self.recording_writers}
         }
         
-        if self.recording_start_time and self.recording_processes:
+        if self.recording_start_time and self.recording_writers:
             duration = datetime.now() - self.recording_start_time
             status["duration"] = int(duration.total_seconds())
-            
+        
         return status
     
     def is_recording(self) -> bool:
         """녹화 중인지 확인"""
-        return bool(self.recording_processes)
+        return bool(self.recording_writers)
+
+
+class EventRecorder:
+    """움직임 이벤트 녹화 (640×480, 공유 캡처 브로커의 H.264 소비자)
+    
+    이벤트가 시작되면 프리롤 버퍼에서 pre_roll초 전(키프레임 경계)부터 기록하고,
+    움직임이 멈춘 뒤 후행 시간이 지나 MotionMonitor가 이벤트를 끝내면 파일을 닫는다.
+    """
+    
+    SINK_NAME = "event"
+    
+    def __init__(self, camera_num: int, output_dir: Path, stream: SharedStreamManager, pre_roll: float = 5.0,
+                 catalog: Optional[FileCatalog] = None, thumbnails: Optional[ThumbnailService] = None):
+        self.camera_num = camera_num
+        self.output_dir = output_dir
+        self.stream = stream
+        self.pre_roll = pre_roll
+        self.catalog = catalog
+        self.thumbnails = thumbnails
+        self._writer: Optional[H264FileWriter] = None
+        self._started_at: Optional[float] = None  # time.monotonic() 기준 녹화 시작 시각
+        self._lock = threading.Lock()
+        
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+    
+    @property
+    def writer_path(self) -> Optional[Path]:
+        writer = self._writer
+        return writer.path if writer is not None else None
+    
+    def start(self, event: MotionEvent, poster: Optional[bytes] = None) -> Optional[Path]:
+        """이벤트 녹화 시작 (파일 경로 반환, 실패 시 None)"""
+        if self._writer is not None:
+            return self._writer.path
+        
+        timestamp = datetime.fromtimestamp(event.started_at).strftime("%Y%m%d_%H%M%S")
+        filepath = self.output_dir / f"event_{timestamp}_cam{self.camera_num}.mp4"
+        with self._lock:
+            self._writer = H264FileWriter(filepath)
+        self._started_at = time.monotonic()
+        
+        # 프리롤(최근 pre_roll초)을 바로 기록하고 실시간 프레임을 이어서 기록
+        if not self.stream.add_sink(self.SINK_NAME, self._on_access_unit, with_preroll=True,
+                                    preroll_seconds=self.pre_roll):
+            print(f"❌ 이벤트 녹화 소비자 등록 실패 (카메라 {self.camera_num})")
+            with self._lock:
+                self._writer = None
+            return None
+        
+        if self.thumbnails and poster:
+            self.thumbnails.submit_path(filepath, poster)
+        print(f"🎬 이벤트 녹화 시작 (카메라 {self.camera_num}): {filepath.name}")
+        return filepath
+    
+    def _on_access_unit(self, au: AccessUnit):
+        """인코더 출력 기록 (첫 키프레임부터)"""
+        with self._lock:
+            if self._writer is not None:
+                self._writer.write(au)
+    
+    def stop(self) -> Optional[Path]:
+        """이벤트 녹화 종료 (저장된 파일 경로, 기록된 프레임이 없으면 None)"""
+        if self._writer is None:
+            return None
+        
+        self.stream.remove_sink(self.SINK_NAME)
+        with self._lock:
+            writer, self._writer = self._writer, None
+            writer.close()
+        
+        if not writer.started:
+            print(f"⚠️ 이벤트 녹화 파일이 생성되지 않음 (카메라 {self.camera_num})")
+            return None
+        
+        if self.catalog:
+            self.catalog.add_file(writer.path)
+        preroll = max(0.0, self._started_at - writer.first_timestamp) if self._started_at else 0.0
+        duration = writer.last_timestamp - writer.first_timestamp
+        print(f"💾 이벤트 녹화 저장됨 (카메라 {self.camera_num}): {writer.path.name} "
+              f"({duration:.1f}초, 프리롤 {preroll:.1f}초)")
+        return writer.path
 
 
 class ResourceMonitor:
-    """시스템 리소스 모니터링 및 제어"""
+    """시스템 리소스 모니터링 및 제어 (백그라운드 샘플러 + 이력 링 버퍼)
     
-    def __init__(self):
+    샘플러 스레드가 interval초마다 CPU, 메모리, 디스크, 카메라 관련 프로세스
+    (rpicam-vid, 재생 소스 등) 사용량을 측정해 최신 값과 고정 크기 이력에 저장한다.
+    상태 조회는 저장된 값을 그대로 돌려주므로 요청 경로에서 측정하지 않는다.
+    """
+    
+    # 프로세스별 사용량을 추적할 프로세스 이름 (파이썬 프로세스는 스크립트 파일 이름)
+    TRACKED_PROCESSES = ("rpicam-vid", "rpicam-still", "ffmpeg")
+    
+    def __init__(self, interval: float = 2.0, history_size: int = 1800, tracked_processes: Optional[Tuple[str, ...]] = None):
+        self.tracked_processes = tracked_processes or self.TRACKED_PROCESSES
         self.cpu_threshold = 90  # CPU 사용률 임계값 (%)
         self.memory_threshold = 85  # 메모리 사용률 임계값 (%)
         self.monitoring = False
-        
-    def get_system_status(self) -> dict:
-        """현재 시스템 리소스 상태 반환"""
+        self.interval = interval
+        self.history: deque = deque(maxlen=history_size)  # 기본 2초 × 1800 = 1시간
+        self._latest: Optional[dict] = None
+        self._history_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._sampler_thread: Optional[threading.Thread] = None
+        self._processes: Dict[int, psutil.Process] = {}  # pid: Process (cpu_percent 기준값 유지)
+        
+        # 이후 호출은 직전 호출 이후의 평균을 즉시 반환 (interval 대기로 이벤트 루프를 막지 않음)
+        psutil.cpu_percent(interval=None)
+    
+    def start_sampling(self):
+        """백그라운드 샘플러 시작"""
+        if self.monitoring:
+            return
+        self.monitoring = True
+        self._stop_event.clear()
+        self._sample()
+        self._sampler_thread = threading.Thread(target=self._sampler, daemon=True)
+        self._sampler_thread.start()
+        print(f"📊 리소스 샘플러 시작 ({self.interval}초 간격, 최근 {self.history.maxlen}개 보관)")
+    
+    def stop_sampling(self):
+        """백그라운드 샘플러 중지"""
+        if not self.monitoring:
+            return
+        self.monitoring = False
+        self._stop_event.set()
+        if self._sampler_thread:
+            self._sampler_thread.join(timeout=self.interval + 1)
+            self._sampler_thread = None
+    
+    def _sampler(self):
+        while not self._stop_event.wait(self.interval):
+            self._sample()
+    
+    def _sample(self):
+        """리소스 측정 후 최신 값과 이력 갱신"""
         try:
-            cpu_percent = psutil.cpu_percent(interval=1)
+            cpu_percent = psutil.cpu_percent(interval=None)
             memory = psutil.virtual_memory()
             disk = psutil.disk_usage('/')
             
-            return {
+            total_processes = 0
+            python_processes = 0
+            tracked = []
+            seen = set()
+            for proc in psutil.process_iter(['name', 'cmdline']):
+                total_processes += 1
+                name = (proc.info['name'] or '').lower()
+                if 'python' in name:
+                    python_processes += 1
+                    cmdline = proc.info['cmdline'] or []
+                    name = Path(cmdline[1]).name if len(cmdline) > 1 else name
+                if name not in self.tracked_processes:
+                    continue
+                
+                # 같은 Process 객체를 재사용해야 cpu_percent()가 직전 샘플 이후 평균을 돌려줌
+                cached = self._processes.setdefault(proc.pid, proc)
+                seen.add(proc.pid)
+                try:
+                    cmdline = proc.info['cmdline'] or []
+                    camera = int(cmdline[cmdline.index("--camera") + 1]) if "--camera" in cmdline else None
+                    tracked.append({
+                        "pid": proc.pid,
+                        "name": name,
+                        "camera": camera,
+                        "cpu_percent": cached.cpu_percent(interval=None),
+                        "memory_mb": round(cached.memory_info().rss / (1024**2), 1)
+                    })
+                except (psutil.Error, ValueError, IndexError):
+                    continue
+            
+            # 종료된 프로세스 정리
+            for pid in list(self._processes):
+                if pid not in seen:
+                    del self._processes[pid]
+            
+            now = time.time()
+            self._latest = {
+                "timestamp": datetime.fromtimestamp(now).isoformat(),
                 "cpu": {
                     "percent": cpu_percent,
                     "cores": psutil.cpu_count(),
@@ -636,23 +1708,66 @@ class ResourceMonitor:
                     "total_gb": round(disk.total / (1024**3), 2)
                 },
                 "processes": {
-                    "total": len(psutil.pids()),
-                    "python": len([p for p in psutil.process_iter(['name']) if 'python' in p.info['name'].lower()])
+                    "total": total_processes,
+                    "python": python_processes,
+                    "camera": tracked
                 }
             }
+            
+            with self._history_lock:
+                self.history.append((
+                    now,
+                    cpu_percent,
+                    memory.percent,
+                    disk.percent,
+                    sum(p["cpu_percent"] for p in tracked)
+                ))
+        
         except Exception as e:
             print(f"리소스 모니터링 오류: {e}")
-            return {"error": str(e)}
+    
+    def get_system_status(self) -> dict:
+        """현재 시스템 리소스 상태 반환 (샘플러의 최근 측정값)"""
+        if self._latest is None:
+            self._sample()
+        return self._latest if self._latest is not None else {"error": "리소스 측정 실패"}
+    
+    def get_history(self, seconds: Optional[float] = None, points: int = 120) -> dict:
+        """리소스 이력 반환 (최대 points개 구간으로 평균 다운샘플링)"""
+        with self._history_lock:
+            samples = list(self.history)
+        
+        if seconds is not None and samples:
+            cutoff = samples[-1][0] - seconds
+            samples = [sample for sample in samples if sample[0] >= cutoff]
+        
+        series = []
+        if samples and points > 0:
+            bucket = -(-len(samples) // points)  # 올림 나눗셈
+            for i in range(0, len(samples), bucket):
+                chunk = samples[i:i + bucket]
+                n = len(chunk)
+                series.append({
+                    "timestamp": datetime.fromtimestamp(chunk[-1][0]).isoformat(),
+                    "cpu": round(sum(c[1] for c in chunk) / n, 1),
+                    "memory": round(sum(c[2] for c in chunk) / n, 1),
+                    "disk": round(sum(c[3] for c in chunk) / n, 1),
+                    "camera_cpu": round(sum(c[4] for c in chunk) / n, 1)
+                })
+        
+        return {
+            "interval": self.interval,
+            "samples": len(samples),
+            "points": len(series),
+            "series": series
+        }
     
     def is_system_overloaded(self) -> bool:
         """시스템 과부하 상태 확인"""
-        try:
-            cpu_percent = psutil.cpu_percent(interval=0.5)
-            memory_percent = psutil.virtual_memory().percent
-            
-            return cpu_percent > self.cpu_threshold or memory_percent > self.memory_threshold
-        except:
-            return False
+        status = self.get_system_status()
+        cpu_percent = status.get("cpu", {}).get("percent", 0)
+        memory_percent = status.get("memory", {}).get("percent", 0)
+        return cpu_percent > self.cpu_threshold or memory_percent > self.memory_threshold
     
     def get_recording_recommendation(self) -> dict:
         """리소스 상태 기반 녹화 권장사항"""
@@ -688,6 +1803,9 @@ class CameraManager:
         self.camera1_available = False
         self.is_recording = False
         
+        # 카메라 백엔드 (rpicam 또는 replay - FABCAM_CAMERA_BACKEND)
+        self.backend = backend_from_env()
+        
         # 공유 스트림 매니저
         self.shared_streams: Dict[int, SharedStreamManager] = {}
         
@@ -697,45 +1815,130 @@ class CameraManager:
         # 수동 녹화 매니저 (고품질)
         self.manual_recorder: Optional[ManualRecorder] = None
         
-        # 리소스 모니터링
-        self.resource_monitor = ResourceMonitor()
+        # 리소스 모니터링 (샘플러는 서버 시작 시 실행)
+        self.resource_monitor = ResourceMonitor(
+            interval=float(os.environ.get("FABCAM_MONITOR_INTERVAL", "2")),
+            tracked_processes=tuple(dict.fromkeys(self.backend.process_names + ("ffmpeg",)))
+        )
+        
+        # 비동기 API 작업 잠금 (카메라별, 수동 녹화)
+        self._operation_locks: Dict[int, asyncio.Lock] = {}
+        self._manual_lock = asyncio.Lock()
+        
+        # 수동 녹화 프리롤 (0이면 비활성화 - 시청자/녹화가 없을 때 카메라를 끔)
+        self.preroll_seconds = float(os.environ.get("FABCAM_PREROLL_SECONDS", "10"))
+        self.preroll_max_bytes = int(float(os.environ.get("FABCAM_PREROLL_MAX_MB", "8")) * 1024 * 1024)
+        
+        # 마지막 사용자가 떠난 뒤 캡처를 유지할 시간 (새로고침/탭 전환 시 캡처 재시작 방지, 0이면 즉시 중지)
+        self.idle_grace = float(os.environ.get("FABCAM_IDLE_GRACE_SECONDS", "10"))
+        
+        # 시청자 프레임 전달 방식 기본값 (queue: 시청자별 큐, latest: 공유 최신 프레임 슬롯 - 요청의 mode로 바꿀 수 있음)
+        self.delivery_mode = os.environ.get("FABCAM_DELIVERY_MODE", "queue").strip().lower()
+        if self.delivery_mode not in DELIVERY_MODES:
+            print(f"⚠️ 알 수 없는 전달 방식 '{self.delivery_mode}' - queue 사용")
+            self.delivery_mode = "queue"
         
-        # 저장 디렉토리
+        # 저장 디렉토리 (생성은 open_storage()에서)
         self.base_dir = Path(__file__).parent
         self.snapshot_dir = self.base_dir / "static" / "images"
         self.video_dir = self.base_dir / "static" / "videos"
         self.rec_dir = self.base_dir / "static" / "rec"
+        self.catalog_path = Path(os.environ.get("FABCAM_CATALOG_DB", str(self.base_dir / "data" / "catalog.db")))
+        self.events_path = Path(os.environ.get("FABCAM_EVENTS_DB", str(self.catalog_path.parent / "events.db")))
+        
+        # 파일 카탈로그, 내보내기, 이벤트 기록, 보존 정책 (디스크를 건드리므로 서버 시작 시 open_storage()가 생성)
+        self.catalog: Optional[FileCatalog] = None
+        self.exports: Optional[ExportManager] = None
+        self.events: Optional[MotionEventLog] = None
+        self.retention: Optional[RetentionManager] = None
+        
+        # 썸네일 작업자 풀 (캐시는 카탈로그와 같은 data 폴더, 스레드는 첫 작업 때 생성)
+        self.thumbnails = ThumbnailService(self.base_dir / "static", self.catalog_path.parent / "thumbs")
+        
+        # 카메라 감지 결과 캐시 (FABCAM_DETECT_TTL초 동안 재사용, 감지는 서버 시작 후 백그라운드로)
+        self.detect_ttl = float(os.environ.get("FABCAM_DETECT_TTL", "30"))
+        self._detected_at: Optional[float] = None
+        self._detect_lock: Optional[asyncio.Lock] = None
+        
+        # 움직임 감지 이벤트 녹화 (FABCAM_MOTION_CAMERAS의 카메라는 서버 시작 시 켬)
+        self.motion_cameras = [
+            int(item) for item in os.environ.get("FABCAM_MOTION_CAMERAS", "").split(",") if item.strip().isdigit()
+        ]
+        self.motion_fps = float(os.environ.get("FABCAM_MOTION_FPS", "5"))
+        self.motion_threshold = float(os.environ.get("FABCAM_MOTION_THRESHOLD", "25"))
+        self.motion_min_area = float(os.environ.get("FABCAM_MOTION_MIN_AREA", "0.5")) / 100  # 화면 대비 %
+        self.event_preroll = float(os.environ.get("FABCAM_EVENT_PREROLL_SECONDS", "5"))
+        self.event_postroll = float(os.environ.get("FABCAM_EVENT_POSTROLL_SECONDS", "10"))
+        self.event_recording = os.environ.get("FABCAM_EVENT_RECORDING", "1") != "0"  # 0이면 이벤트 기록만
+        self.motion_monitors: Dict[int, MotionMonitor] = {}
+        self.event_recorders: Dict[int, EventRecorder] = {}
+    
+    def open_storage(self):
+        """저장 디렉토리, 파일 카탈로그, 이벤트 기록, 내보내기/보존 정책 준비 (서버 시작 시 한 번, 카메라와 무관)"""
+        if self.catalog is not None:
+            return
+        print(f"🚀 블랙박스 카메라 매니저 초기화 (스트림 + 연속녹화 + 수동녹화, {self.backend.name} 백엔드)")
         
         # 디렉토리 생성
         self.snapshot_dir.mkdir(parents=True, exist_ok=True)
         self.video_dir.mkdir(parents=True, exist_ok=True)
         self.rec_dir.mkdir(parents=True, exist_ok=True)
         
-        print("🚀 블랙박스 카메라 매니저 초기화 (스트림 + 연속녹화 + 수동녹화)")
-        self._detect_cameras()
+        # 녹화/스냅샷 파일 카탈로그 (공개 static 밖에 저장, 디스크 동기화는 서버 시작 후 백그라운드로)
+        self.catalog = FileCatalog(self.catalog_path, self.base_dir / "static")
+        
+        # 구간 클립 내보내기 (수동 녹화 폴더에 저장)
+        self.exports = ExportManager(
+            self.catalog, self.base_dir / "static", self.video_dir,
+            workers=int(os.environ.get("FABCAM_EXPORT_WORKERS", "1"))
+        )
+        
+        self.events = MotionEventLog(self.events_path)
+        
+        # 디스크 보존 정책 (카탈로그 동기화 후 실행)
+        self.retention = RetentionManager.from_env(
+            self.catalog, self.base_dir / "static", protected_paths=self._active_recording_paths,
+            on_evict=self.thumbnails.remove
+        )
         
-        # 카메라 감지 후 녹화 매니저 초기화
-        self._init_continuous_recorders()
         self._init_manual_recorder()
     
+    async def discover_cameras(self, max_age: Optional[float] = None) -> bool:
+        """카메라 감지 (max_age초(기본 FABCAM_DETECT_TTL) 안의 결과는 재사용, 동시에 부르면 한 번만 감지)"""
+        if self._detect_lock is None:
+            self._detect_lock = asyncio.Lock()
+        async with self._detect_lock:
+            max_age = self.detect_ttl if max_age is None else max_age
+            if self._detected_at is None or time.monotonic() - self._detected_at >= max_age:
+                await asyncio.to_thread(self._detect_cameras)
+        return self.camera0_available or self.camera1_available
+    
+    async def start_cameras(self) -> Dict[int, bool]:
+        """카메라 감지 후 사용 가능한 카메라를 동시에 초기화 (서버 시작 시 백그라운드 작업)"""
+        started = time.perf_counter()
+        await self.discover_cameras()
+        camera0_ok, camera1_ok = await asyncio.gather(self.init_camera_async(0), self.init_camera_async(1))
+        
+        if camera0_ok or camera1_ok:
+            print(f"Camera initialized: Camera0={camera0_ok}, Camera1={camera1_ok} "
+                  f"({(time.perf_counter() - started) * 1000:.0f}ms)")
+            print("🚀 30 FPS 스트리밍 준비됨")
+        else:
+            print("Warning: No cameras initialized")
+        
+        # 움직임 감지 자동 시작 (FABCAM_MOTION_CAMERAS)
+        for camera_id in self.motion_cameras:
+            if self.is_camera_available(camera_id):
+                await self.start_motion_detection_async(camera_id)
+        return {0: camera0_ok, 1: camera1_ok}
+    
     def _detect_cameras(self):
-        """사용 가능한 카메라 감지"""
+        """사용 가능한 카메라 감지 (새로 감지된 카메라의 연속 녹화 매니저 준비)"""
+        self._detected_at = time.monotonic()
         try:
-            result = subprocess.run(
-                ["rpicam-hello", "--list-cameras"],
-                capture_output=True,
-                text=True,
-                timeout=3
-            )
+            camera_count = self.backend.detect_cameras()
             
-            if result.returncode == 0 and "Available cameras" in result.stdout:
-                # 카메라 개수 파악
-                lines = result.stdout.split('\n')
-                camera_count = 0
-                for line in lines:
-                    if line.strip().startswith(('0 :', '1 :')):
-                        camera_count += 1
-                
+            if camera_count is not None:
                 self.camera0_available = camera_count >= 1
                 self.camera1_available = camera_count >= 2
                 
@@ -749,17 +1952,31 @@ class CameraManager:
                 
         except Exception as e:
             print(f"❌ 카메라 감지 오류: {e}")
+        
+        # 카메라 감지 후 녹화 매니저 초기화
+        self._init_continuous_recorders()
+    
+    def _segment_completed(self):
+        """연속 녹화 세그먼트 완성 시 다음 주기를 기다리지 않고 보존 정책 실행"""
+        if self.retention:
+            self.retention.check_now()
     
     def _init_continuous_recorders(self):
-        """연속 녹화 매니저 초기화 및 자동 시작"""
+        """연속 녹화 매니저 초기화 (이미 만든 카메라는 유지)"""
         try:
-            if self.camera0_available:
+            if self.camera0_available and 0 not in self.continuous_recorders:
                 rec_dir_0 = self.rec_dir / "camera0"
-                self.continuous_recorders[0] = ContinuousRecorder(0, rec_dir_0)
+                self.continuous_recorders[0] = ContinuousRecorder(
+                    0, rec_dir_0, self.get_shared_stream(0), catalog=self.catalog, thumbnails=self.thumbnails,
+                    on_segment=self._segment_completed
+                )
                 
-            if self.camera1_available:
+            if self.camera1_available and 1 not in self.continuous_recorders:
                 rec_dir_1 = self.rec_dir / "camera1"
-                self.continuous_recorders[1] = ContinuousRecorder(1, rec_dir_1)
+                self.continuous_recorders[1] = ContinuousRecorder(
+                    1, rec_dir_1, self.get_shared_stream(1), catalog=self.catalog, thumbnails=self.thumbnails,
+                    on_segment=self._segment_completed
+                )
             
             print(f"📹 연속 녹화 매니저 초기화 완료 ({len(self.continuous_recorders)}개 카메라)")
             print("📺 스트림 우선 모드: 연속 녹화는 수동으로 시작하세요")
@@ -786,13 +2003,15 @@ class CameraManager:
     def _init_manual_recorder(self):
         """수동 녹화 매니저 초기화"""
         try:
-            self.manual_recorder = ManualRecorder(self.video_dir)
+            self.manual_recorder = ManualRecorder(
+                self.video_dir, self.get_shared_stream, catalog=self.catalog, thumbnails=self.thumbnails
+            )
             print("📹 수동 녹화 매니저 초기화 완료 (640×480)")
         except Exception as e:
             print(f"❌ 수동 녹화 매니저 초기화 오류: {e}")
     
     def start_manual_recording(self, camera_ids: List[int] = None) -> bool:
-        """수동 녹화 시작 (640×480, 연속 녹화 일시 중단)"""
+        """수동 녹화 시작 (640×480, 연속 녹화/스트림과 동시 진행)"""
         if camera_ids is None:
             # 기본값: 사용 가능한 모든 카메라
             camera_ids = []
@@ -805,54 +2024,37 @@ class CameraManager:
             print("❌ 수동 녹화 매니저가 초기화되지 않았습니다")
             return False
         
-        # 수동 녹화를 위해 연속 녹화 일시 중단
+        # 같은 캡처 브로커를 공유하므로 연속 녹화를 멈출 필요 없음
         print(f"📋 수동 녹화 요청 카메라: {camera_ids}")
-        paused_continuous = []
-        for camera_id in camera_ids:
-            print(f"  - 카메라 {camera_id} 연속 녹화 상태 확인...")
-            if camera_id in self.continuous_recorders:
-                recorder = self.continuous_recorders[camera_id]
-                print(f"    연속 녹화 중: {recorder.is_recording}")
-                if recorder.is_recording:
-                    print(f"⏸️ 연속 녹화 일시 중단 (카메라 {camera_id})")
-                    recorder.stop_continuous_recording()
-                    paused_continuous.append(camera_id)
-                    # 중단 후 잠시 대기
-                    time.sleep(1.0)
-                    print(f"    연속 녹화 중단 완료 (카메라 {camera_id})")
-            else:
-                print(f"    연속 녹화 매니저 없음 (카메라 {camera_id})")
-        
-        # 수동 녹화 시작
-        success = self.manual_recorder.start_manual_recording(camera_ids)
-        
-        # 수동 녹화 시작 실패 시 연속 녹화 재시작
-        if not success:
-            for camera_id in paused_continuous:
-                if camera_id in self.continuous_recorders:
-                    print(f"▶️ 연속 녹화 재시작 (카메라 {camera_id})")
-                    self.continuous_recorders[camera_id].start_continuous_recording()
-        
-        return success
+        return self.manual_recorder.start_manual_recording(camera_ids)
     
     def stop_manual_recording(self) -> Dict[int, str]:
-        """수동 녹화 중지 및 연속 녹화 재시작"""
+        """수동 녹화 중지"""
         if not self.manual_recorder:
             return {}
         
-        # 수동 녹화에서 사용 중이던 카메라 목록 저장
-        recording_cameras = list(self.manual_recorder.recording_processes.keys())
-        
-        # 수동 녹화 중지
-        result = self.manual_recorder.stop_manual_recording()
-        
-        # 연속 녹화 재시작
-        for camera_id in recording_cameras:
-            if camera_id in self.continuous_recorders:
-                print(f"▶️ 연속 녹화 재시작 (카메라 {camera_id})")
-                self.continuous_recorders[camera_id].start_continuous_recording()
-        
-        return result
+        return self.manual_recorder.stop_manual_recording()
+    
+    def _active_recording_paths(self) -> Set[str]:
+        """쓰는 중인 녹화 파일 (static 기준 상대 경로, 보존 정책에서 제외)"""
+        static_dir = self.base_dir / "static"
+        paths = [
+            recorder._writer.path
+            for recorder in list(self.continuous_recorders.values())
+            if recorder._writer is not None
+        ]
+        if self.manual_recorder:
+            paths += [writer.path for writer in list(self.manual_recorder.recording_writers.values())]
+        paths += [
+            recorder.writer_path
+            for recorder in list(self.event_recorders.values())
+            if recorder.writer_path is not None
+        ]
+        return {path.relative_to(static_dir).as_posix() for path in paths}
+    
+    def get_storage_status(self) -> dict:
+        """보존 정책 상태 (사용량, 할당량, 확보한 용량, 가득 찰 때까지 남은 시간)"""
+        return self.retention.get_stats()
     
     def get_manual_recording_status(self) -> dict:
         """수동 녹화 상태 확인"""
@@ -864,25 +2066,37 @@ class CameraManager:
         """시스템 리소스 상태 확인"""
         return self.resource_monitor.get_system_status()
     
+    def get_metrics(self) -> dict:
+        """스트림 파이프라인 지표 (JSON)"""
+        return {
+            f"camera{camera_num}": stream.metrics.to_dict(stream.queue_depths())
+            for camera_num, stream in list(self.shared_streams.items())
+        }
+    
+    def get_metrics_text(self) -> str:
+        """스트림 파이프라인 지표 (Prometheus 텍스트 형식)"""
+        streams = dict(self.shared_streams)
+        return render_prometheus(
+            {camera_num: stream.metrics for camera_num, stream in streams.items()},
+            {camera_num: stream.queue_depths() for camera_num, stream in streams.items()}
+        )
+    
+    def get_system_history(self, minutes: Optional[float] = None, points: int = 120) -> dict:
+        """시스템 리소스 이력 (다운샘플링)"""
+        return self.resource_monitor.get_history(minutes * 60 if minutes else None, points)
+    
     def check_recording_feasibility(self) -> dict:
         """녹화 가능성 및 권장사항 확인"""
         return self.resource_monitor.get_recording_recommendation()
     
-    def start_continuous_recording(self, camera_id: int) -> bool:
+    def start_continuous_recording(self, camera_id: int, segment_duration: Optional[float] = None) -> bool:
         """개별 카메라 연속 녹화 시작"""
         if camera_id not in self.continuous_recorders:
             print(f"❌ 카메라 {camera_id} 연속 녹화 매니저가 없습니다")
             return False
         
-        # 스트림이 실행 중이면 중지
-        if camera_id in self.shared_streams:
-            stream = self.shared_streams[camera_id]
-            if stream.is_running:
-                print(f"⏸️ 연속 녹화를 위해 스트림 중지 (카메라 {camera_id})")
-                stream.stop_stream()
-                time.sleep(0.5)
-        
-        return self.continuous_recorders[camera_id].start_continuous_recording()
+        # 스트림과 같은 캡처 브로커를 사용하므로 시청 중에도 바로 시작
+        return self.continuous_recorders[camera_id].start_continuous_recording(segment_duration)
     
     def stop_continuous_recording(self, camera_id: int) -> bool:
         """개별 카메라 연속 녹화 중지"""
@@ -891,15 +2105,88 @@ class CameraManager:
             return False
         
         self.continuous_recorders[camera_id].stop_continuous_recording()
+        return True
+    
+    def start_motion_detection(self, camera_id: int) -> bool:
+        """움직임 감지 시작 (이벤트마다 녹화, 시청자가 없어도 캡처 유지)"""
+        stream = self.get_shared_stream(camera_id)
+        if stream is None:
+            print(f"❌ 카메라 {camera_id} 사용 불가")
+            return False
+        if camera_id in self.motion_monitors:
+            return True
+        
+        detector = MotionDetector(threshold=self.motion_threshold, min_area=self.motion_min_area)
+        if not detector.enabled:
+            print("❌ 움직임 감지에는 opencv-python이 필요합니다")
+            return False
         
-        # 연속 녹화 중지 후 스트림 재시작
-        if camera_id in self.shared_streams:
-            print(f"▶️ 연속 녹화 중지, 스트림 재시작 (카메라 {camera_id})")
-            time.sleep(0.5)
-            self.shared_streams[camera_id].start_stream()
+        if self.event_recording:
+            # 이벤트 프리롤은 스트림 프리롤 버퍼에서 가져오므로 함께 켬 (FABCAM_PREROLL_SECONDS=0이어도)
+            preroll_seconds = max(self.preroll_seconds, self.event_preroll)
+            if self.event_preroll > 0 and not stream.enable_preroll(preroll_seconds, self.preroll_max_bytes):
+                print(f"⚠️ 프리롤 없이 이벤트 녹화 (카메라 {camera_id})")
+            self.event_recorders[camera_id] = EventRecorder(
+                camera_id, self.video_dir, stream, self.event_preroll,
+                catalog=self.catalog, thumbnails=self.thumbnails
+            )
+        monitor = MotionMonitor(
+            camera_id, detector, fps=self.motion_fps, post_roll=self.event_postroll,
+            on_start=self._on_motion_start, on_end=self._on_motion_end
+        )
+        monitor.start()
+        if not stream.add_observer("motion", monitor.feed):
+            monitor.stop()
+            self.event_recorders.pop(camera_id, None)
+            return False
+        self.motion_monitors[camera_id] = monitor
+        return True
+    
+    def stop_motion_detection(self, camera_id: int) -> bool:
+        """움직임 감지 중지 (진행 중인 이벤트 녹화는 저장)"""
+        monitor = self.motion_monitors.pop(camera_id, None)
+        if monitor is None:
+            return False
         
+        stream = self.shared_streams.get(camera_id)
+        if stream is not None:
+            stream.remove_observer("motion")
+        monitor.stop()
+        self.event_recorders.pop(camera_id, None)
         return True
     
+    def _on_motion_start(self, event: MotionEvent, frame: MJPEGFrame):
+        """이벤트 시작: 녹화 시작 후 이벤트 기록 (감시 스레드)"""
+        recorder = self.event_recorders.get(event.camera)
+        if recorder is not None:
+            filepath = recorder.start(event, poster=frame.data)
+            if filepath is not None:
+                event.path = filepath.relative_to(self.base_dir / "static").as_posix()
+        event.id = self.events.begin(event)
+    
+    def _on_motion_end(self, event: MotionEvent):
+        """이벤트 종료: 녹화 파일 저장 후 이벤트 기록 갱신 (감시 스레드)"""
+        recorder = self.event_recorders.get(event.camera)
+        if recorder is not None and recorder.stop() is None:
+            event.path = None
+        self.events.finish(event)
+    
+    def get_motion_status(self) -> dict:
+        """카메라별 움직임 감지 상태와 설정"""
+        return {
+            "cameras": {
+                str(camera_id): monitor.get_stats() for camera_id, monitor in list(self.motion_monitors.items())
+            },
+            "config": {
+                "fps": self.motion_fps,
+                "threshold": self.motion_threshold,
+                "min_area_percent": self.motion_min_area * 100,
+                "preroll_seconds": self.event_preroll,
+                "postroll_seconds": self.event_postroll,
+                "recording": self.event_recording
+            }
+        }
+    
     def get_continuous_recording_status(self, camera_id: int) -> dict:
         """개별 카메라 연속 녹화 상태"""
         if camera_id not in self.continuous_recorders:
@@ -927,20 +2214,31 @@ class CameraManager:
             "system_status": self.resource_monitor.get_system_status()
         }
     
+    def is_camera_available(self, camera_num: int) -> bool:
+        """카메라 하드웨어 감지 여부 (리소스 측정 없이 즉시 반환)"""
+        return (camera_num == 0 and self.camera0_available) or (camera_num == 1 and self.camera1_available)
+    
     def init_camera(self, camera_num: int) -> bool:
-        """카메라 초기화 및 공유 스트림 준비"""
-        if camera_num == 0 and not self.camera0_available:
-            return False
-        elif camera_num == 1 and not self.camera1_available:
-            return False
-        elif camera_num not in [0, 1]:
+        """카메라 초기화 및 공유 스트림 준비 (프리롤 사용 시 캡처 시작)"""
+        stream = self.get_shared_stream(camera_num)
+        if stream is None:
             return False
+        
+        if self.preroll_seconds > 0 and not stream.enable_preroll(self.preroll_seconds, self.preroll_max_bytes):
+            print(f"⚠️ 프리롤 없이 계속 (카메라 {camera_num})")
+        return True
+    
+    def get_shared_stream(self, camera_num: int) -> Optional[SharedStreamManager]:
+        """카메라별 캡처 브로커 반환 (없으면 생성, 아직 스트림 시작하지 않음)"""
+        if not self.is_camera_available(camera_num):
+            return None
             
-        # 공유 스트림 매니저 생성 (아직 스트림 시작하지 않음)
         if camera_num not in self.shared_streams:
-            self.shared_streams[camera_num] = SharedStreamManager(camera_num, self)
+            self.shared_streams[camera_num] = SharedStreamManager(
+                camera_num, self, self.backend, idle_grace=self.idle_grace
+            )
             
-        return True
+        return self.shared_streams[camera_num]
     
     def capture_single_frame(self, camera_num: int) -> Optional[bytes]:
         """단일 프레임 캡처 (스냅샷용)"""
@@ -949,15 +2247,7 @@ class CameraManager:
         
         try:
             with tempfile.NamedTemporaryFile(suffix='.jpg') as tmp_file:
-                cmd = [
-                    "rpicam-still",
-                    "--camera", str(camera_num),
-                    "--width", "640",
-                    "--height", "480",
-                    "-o", tmp_file.name,
-                    "-t", "100",
-                    "--nopreview"
-                ]
+                cmd = self.backend.still_command(camera_num, 640, 480, tmp_file.name)
                 
                 result = subprocess.run(cmd, capture_output=True, timeout=5)
                 
@@ -970,51 +2260,35 @@ class CameraManager:
         
         return None
     
-    def _start_rpicam_vid_stream(self, camera_num: int) -> subprocess.Popen:
-        """rpicam-vid 스트림 프로세스 시작"""
-        cmd = [
-            "rpicam-vid",
-            "--camera", str(camera_num),
-            "--width", "640",
-            "--height", "480",
-            "--framerate", "30",
-            "--codec", "mjpeg",
-            "--output", "-",
-            "--timeout", "0",  # 무한 실행
-            "--nopreview"
-        ]
-        
-        print(f"🎬 rpicam-vid 시작: {' '.join(cmd)}")
-        
-        process = subprocess.Popen(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            bufsize=0
-        )
-        
-        return process
-    
-    def generate_mjpeg_stream(self, camera_num: int) -> Generator[bytes, None, None]:
-        """공유 MJPEG 스트림 생성기 (다중 클라이언트 지원)"""
-        if not self.init_camera(camera_num):
+    async def ensure_shared_stream(self, camera_num: int) -> Optional[SharedStreamManager]:
+        """카메라 초기화 후 실행 중인 공유 스트림 반환 (실패 시 None)"""
+        if not await self.init_camera_async(camera_num):
             print(f"❌ 카메라 {camera_num} 초기화 실패")
-            return
+            return None
             
         shared_stream = self.shared_streams[camera_num]
         
-        # 공유 스트림이 실행 중이 아니면 시작
+        # 공유 스트림이 실행 중이 아니면 시작 (프로세스 시작은 이벤트 루프 밖에서)
         if not shared_stream.is_running:
-            if not shared_stream.start_stream():
+            if not await asyncio.to_thread(shared_stream.start_stream):
                 print(f"❌ 공유 스트림 시작 실패 (카메라 {camera_num})")
-                return
+                return None
+        return shared_stream
+    
+    async def generate_mjpeg_stream(self, camera_num: int, fps: Optional[float] = None,
+                                    delivery: Optional[str] = None) -> AsyncIterator[bytes]:
+        """공유 MJPEG 스트림 생성기 (다중 클라이언트 지원, 스레드 점유 없음, fps: 시청자별 목표 프레임률, delivery: 전달 방식)"""
+        shared_stream = await self.ensure_shared_stream(camera_num)
+        if shared_stream is None:
+            return
         
         # 클라이언트 추가
-        client_id = shared_stream.add_client()
+        client_id = shared_stream.add_client(fps, delivery=delivery or self.delivery_mode)
         
         try:
             # 클라이언트별 스트림 제공
-            yield from shared_stream.get_client_stream(client_id)
+            async for chunk in shared_stream.get_client_stream(client_id):
+                yield chunk
         except Exception as e:
             print(f"클라이언트 스트림 오류 (카메라 {camera_num}, {client_id[:8]}...): {e}")
         finally:
@@ -1022,62 +2296,193 @@ class CameraManager:
             print(f"🛑 클라이언트 스트림 종료 (카메라 {camera_num})")
     
     def stop_stream(self, camera_num: int) -> bool:
-        """공유 스트림 중지 (모든 클라이언트 연결 해제)"""
+        """모든 시청자 연결 해제 (녹화 중이면 캡처는 계속)"""
         if camera_num in self.shared_streams:
-            self.shared_streams[camera_num].stop_stream()
+            self.shared_streams[camera_num].disconnect_clients()
             print(f"✅ 카메라 {camera_num}번 공유 스트림 중지 요청")
             return True
         return False
     
-    def capture_snapshot(self, camera_num: int, resolution: str = "hd") -> Optional[str]:
-        """스냅샷 캡처 (해상도 선택 가능)"""
+    # 비동기 제어 API - 프로세스 시작/종료 대기는 스레드에서, 같은 카메라의 작업은 순서대로
+    
+    def _camera_lock(self, camera_num: int) -> asyncio.Lock:
+        """카메라별 비동기 작업 잠금"""
+        return self._operation_locks.setdefault(camera_num, asyncio.Lock())
+    
+    @asynccontextmanager
+    async def _camera_operation(self, camera_num: int):
+        """카메라 작업 구간 (아직 감지 전이거나 없던 카메라면 먼저 감지 - 캐시가 있으면 재사용 - 후 잠금)"""
+        if not self.is_camera_available(camera_num):
+            await self.discover_cameras()
+        async with self._camera_lock(camera_num):
+            yield
+    
+    async def init_camera_async(self, camera_num: int, wait_ready: bool = False) -> bool:
+        """init_camera()의 비동기 버전 (wait_ready: 첫 프레임 도착까지 대기)"""
+        async with self._camera_operation(camera_num):
+            if not await asyncio.to_thread(self.init_camera, camera_num):
+                return False
+            stream = self.shared_streams.get(camera_num)
+            if wait_ready and stream is not None and stream.is_running:
+                if not await asyncio.to_thread(stream.wait_until_ready, 5.0):
+                    print(f"⚠️ 카메라 {camera_num} 첫 프레임 대기 시간 초과")
+            return True
+    
+    async def stop_stream_async(self, camera_num: int) -> bool:
+        """stop_stream()의 비동기 버전"""
+        async with self._camera_operation(camera_num):
+            return await asyncio.to_thread(self.stop_stream, camera_num)
+    
+    async def start_continuous_recording_async(self, camera_id: int, segment_duration: Optional[float] = None) -> bool:
+        """start_continuous_recording()의 비동기 버전"""
+        async with self._camera_operation(camera_id):
+            return await asyncio.to_thread(self.start_continuous_recording, camera_id, segment_duration)
+    
+    async def stop_continuous_recording_async(self, camera_id: int) -> bool:
+        """stop_continuous_recording()의 비동기 버전"""
+        async with self._camera_operation(camera_id):
+            return await asyncio.to_thread(self.stop_continuous_recording, camera_id)
+    
+    async def start_motion_detection_async(self, camera_id: int) -> bool:
+        """start_motion_detection()의 비동기 버전"""
+        async with self._camera_operation(camera_id):
+            return await asyncio.to_thread(self.start_motion_detection, camera_id)
+    
+    async def stop_motion_detection_async(self, camera_id: int) -> bool:
+        """stop_motion_detection()의 비동기 버전"""
+        async with self._camera_operation(camera_id):
+            return await asyncio.to_thread(self.stop_motion_detection, camera_id)
+    
+    async def start_manual_recording_async(self, camera_ids: List[int] = None) -> bool:
+        """start_manual_recording()의 비동기 버전"""
+        async with self._manual_lock:
+            return await asyncio.to_thread(self.start_manual_recording, camera_ids)
+    
+    async def stop_manual_recording_async(self) -> Dict[int, str]:
+        """stop_manual_recording()의 비동기 버전"""
+        async with self._manual_lock:
+            return await asyncio.to_thread(self.stop_manual_recording)
+    
+    # 스냅샷 해상도 설정
+    SNAPSHOT_PRESETS = {
+        "vga": {"width": 640, "height": 480, "folder": "640x480"},
+        "hd": {"width": 1280, "height": 720, "folder": "1280x720"},
+        "fhd": {"width": 1920, "height": 1080, "folder": "1920x1080"}
+    }
+    
+    def capture_snapshot(self, camera_num: int, resolution: str = "hd", prefer_stream: bool = True) -> Optional[dict]:
+        """스냅샷 캡처 (해상도 선택 가능)
+        
+        요청 해상도가 실행 중인 스트림과 같으면 최신 스트림 프레임을 그대로 저장하고,
+        더 높은 해상도만 백엔드의 스틸 명령(rpicam-still 등)으로 촬영한다.
+        반환: {"filename": 폴더 포함 경로, "source": "stream" | 백엔드 still_source ("rpicam-still" 등), "elapsed_ms": 소요 시간}
+        """
         if not self.init_camera(camera_num):
             return None
         
-        # 해상도 설정
-        resolution_presets = {
-            "vga": {"width": 640, "height": 480, "folder": "640x480"},
-            "hd": {"width": 1280, "height": 720, "folder": "1280x720"}, 
-            "fhd": {"width": 1920, "height": 1080, "folder": "1920x1080"}
-        }
-        
-        if resolution not in resolution_presets:
-            resolution = "hd"  # 기본값
-            
-        res_config = resolution_presets[resolution]
-        
         try:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            started = time.perf_counter()
+            res_config, filepath = self._snapshot_target(camera_num, resolution)
             
-            # 해상도별 폴더 생성
-            res_folder = self.snapshot_dir / res_config["folder"]
-            res_folder.mkdir(parents=True, exist_ok=True)
+            snapshot = self._snapshot_from_stream(camera_num, res_config, filepath, started) if prefer_stream else None
+            if snapshot:
+                return snapshot
             
-            filename = f"camera{camera_num}_{timestamp}_{resolution}.jpg"
-            filepath = res_folder / filename
+            # 스틸 명령으로 지정된 해상도 캡처 (스트림 실행 중이면 브로커가 카메라를 잠시 넘겨줌)
+            cmd = self._still_command(camera_num, res_config, filepath)
             
-            # 항상 rpicam-still을 사용하여 지정된 해상도로 캡처
-            cmd = [
-                "rpicam-still",
-                "--camera", str(camera_num),
-                "--width", str(res_config["width"]),
-                "--height", str(res_config["height"]),
-                "-o", str(filepath),
-                "-t", "100",
-                "--nopreview"
-            ]
+            def take_still():
+                return subprocess.run(cmd, capture_output=True, timeout=5)
             
-            result = subprocess.run(cmd, capture_output=True, timeout=5)
+            stream = self.shared_streams.get(camera_num)
+            result = stream.run_exclusive(take_still) if stream else take_still()
             
             if result.returncode == 0 and filepath.exists():
-                print(f"📸 스냅샷 저장 ({res_config['width']}×{res_config['height']}): {filename}")
-                return f"{res_config['folder']}/{filename}"  # 폴더 포함 경로 반환
+                return self._snapshot_result(res_config, filepath, self.backend.still_source, started)
                 
         except Exception as e:
             print(f"스냅샷 캡처 오류 (카메라 {camera_num}): {e}")
         
         return None
     
+    async def capture_snapshot_async(self, camera_num: int, resolution: str = "hd",
+                                     prefer_stream: bool = True) -> Optional[dict]:
+        """capture_snapshot()의 비동기 버전 (스틸 명령은 asyncio 서브프로세스로 실행)"""
+        async with self._camera_operation(camera_num):
+            if not await asyncio.to_thread(self.init_camera, camera_num):
+                return None
+            
+            try:
+                started = time.perf_counter()
+                res_config, filepath = self._snapshot_target(camera_num, resolution)
+                
+                snapshot = self._snapshot_from_stream(camera_num, res_config, filepath, started) if prefer_stream else None
+                if snapshot:
+                    return snapshot
+                
+                cmd = self._still_command(camera_num, res_config, filepath)
+                stream = self.shared_streams.get(camera_num)
+                # 캡처 중지/재개는 프로세스 종료를 기다리므로 스레드에서 실행
+                resume = await asyncio.to_thread(stream.suspend_capture) if stream else False
+                try:
+                    process = await asyncio.create_subprocess_exec(
+                        *cmd,
+                        stdout=asyncio.subprocess.DEVNULL,
+                        stderr=asyncio.subprocess.DEVNULL
+                    )
+                    try:
+                        returncode = await asyncio.wait_for(process.wait(), timeout=5)
+                    except asyncio.TimeoutError:
+                        process.kill()
+                        await process.wait()
+                        raise
+                finally:
+                    if stream:
+                        await asyncio.to_thread(stream.resume_capture, resume)
+                
+                if returncode == 0 and filepath.exists():
+                    return self._snapshot_result(res_config, filepath, self.backend.still_source, started)
+                    
+            except Exception as e:
+                print(f"스냅샷 캡처 오류 (카메라 {camera_num}): {e!r}")
+            
+            return None
+    
+    def _snapshot_target(self, camera_num: int, resolution: str):
+        """해상도 설정과 저장 경로 (해상도별 폴더 생성)"""
+        if resolution not in self.SNAPSHOT_PRESETS:
+            resolution = "hd"  # 기본값
+        res_config = self.SNAPSHOT_PRESETS[resolution]
+        
+        res_folder = self.snapshot_dir / res_config["folder"]
+        res_folder.mkdir(parents=True, exist_ok=True)
+        
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        return res_config, res_folder / f"camera{camera_num}_{timestamp}_{resolution}.jpg"
+    
+    def _snapshot_from_stream(self, camera_num: int, res_config: dict, filepath: Path, started: float) -> Optional[dict]:
+        """빠른 경로: 스트림 프레임이 이미 요청 해상도의 JPEG이면 카메라를 건드리지 않고 저장"""
+        stream = self.shared_streams.get(camera_num)
+        if stream is None or (res_config["width"], res_config["height"]) != (stream.width, stream.height):
+            return None
+        frame = stream.get_latest_frame()
+        if frame is None:
+            return None
+        filepath.write_bytes(frame)
+        return self._snapshot_result(res_config, filepath, "stream", started)
+    
+    def _still_command(self, camera_num: int, res_config: dict, filepath: Path) -> List[str]:
+        return self.backend.still_command(camera_num, res_config["width"], res_config["height"], str(filepath))
+    
+    def _snapshot_result(self, res_config: dict, filepath: Path, source: str, started: float) -> dict:
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+        label = "스트림 프레임" if source == "stream" else source
+        print(f"📸 스냅샷 저장 ({res_config['width']}×{res_config['height']}, {label}, {elapsed_ms}ms): {filepath.name}")
+        self.catalog.add_file(filepath)
+        self.thumbnails.submit_path(filepath)
+        # 폴더 포함 경로 반환
+        return {"filename": f"{res_config['folder']}/{filepath.name}", "source": source, "elapsed_ms": elapsed_ms}
+    
     def get_camera_status(self) -> dict:
         """카메라 상태 반환 (공유 스트림 기반)"""
         def get_stream_info(camera_num: int) -> dict:
@@ -1088,7 +2493,9 @@ class CameraManager:
                                (camera_num == 1 and self.camera1_available),
                     "streaming": stream.is_running,
                     "clients": len(stream.clients),
-                    "fps": 30 if stream.is_running else 0
+                    "recording_consumers": list(stream.sinks.keys()),
+                    "preroll": stream.preroll.get_stats() if stream.preroll else None,
+                    "fps": round(stream.metrics.fps.current(), 1) if stream.is_running else 0
                 }
             else:
                 return {
@@ -1127,9 +2534,9 @@ class CameraManager:
             print(f"🔄 카메라 {camera_id} 자동 재시작 시작...")
             
             # 기존 스트림 정리
+            # stop_stream()은 프로세스와 리더 스레드 종료까지 기다림
             if camera_id in self.shared_streams:
                 self.shared_streams[camera_id].stop_stream()
-                time.sleep(2)  # 정리 시간 대기
             
             # 카메라 재감지
             print(f"🔍 카메라 {camera_id} 하드웨어 재감지...")
@@ -1142,13 +2549,14 @@ class CameraManager:
                 print(f"❌ 카메라 {camera_id} 하드웨어 재감지 실패 - 물리적 연결 확인 필요")
                 return False
             
-            # 새로운 스트림 매니저 생성
-            print(f"🔧 카메라 {camera_id} 새 스트림 매니저 생성...")
-            self.shared_streams[camera_id] = SharedStreamManager(camera_id, self)
+            # 스트림 매니저는 녹화기가 참조하므로 재사용 (stop_stream으로 이미 초기화됨)
+            print(f"🔧 카메라 {camera_id} 스트림 매니저 재초기화...")
             
-            # 잠시 대기 후 자동 초기화 시도
-            time.sleep(1)
+            # 자동 초기화 후 첫 프레임으로 준비 확인
             success = self.init_camera(camera_id)
+            stream = self.shared_streams.get(camera_id)
+            if success and stream is not None and stream.is_running:
+                success = stream.wait_until_ready(5.0)
             
             if success:
                 print(f"✅ 카메라 {camera_id} 자동 재시작 성공")
@@ -1177,11 +2585,7 @@ class CameraManager:
         """리소스 정리 (모든 공유 스트림 및 연속 녹화 중지)"""
         print("🧹 블랙박스 카메라 매니저 정리 중...")
         
-        # 모든 공유 스트림 중지
-        for camera_num, shared_stream in list(self.shared_streams.items()):
-            shared_stream.stop_stream()
-        
-        # 모든 연속 녹화 중지
+        # 모든 연속 녹화 중지 (파일을 먼저 닫음)
         for camera_id, recorder in list(self.continuous_recorders.items()):
             recorder.stop_continuous_recording()
         
@@ -1189,8 +2593,26 @@ class CameraManager:
         if self.manual_recorder:
             self.manual_recorder.stop_manual_recording()
         
+        # 움직임 감지 중지 (진행 중인 이벤트 녹화 저장)
+        for camera_id in list(self.motion_monitors):
+            self.stop_motion_detection(camera_id)
+        
+        # 모든 공유 스트림 중지
+        for camera_num, shared_stream in list(self.shared_streams.items()):
+            shared_stream.stop_stream()
+        
         self.shared_streams.clear()
         self.continuous_recorders.clear()
+        self.resource_monitor.stop_sampling()
+        if self.retention:
+            self.retention.stop()
+        if self.exports:
+            self.exports.shutdown()
+        self.thumbnails.shutdown()
+        if self.events:
+            self.events.close()
+        if self.catalog:
+            self.catalog.close()
         print("✅ 모든 스트림, 연속 녹화 및 수동 녹화 정리 완료")
 
 # 전역 인스턴스
@@ -1199,6 +2621,8 @@ camera_manager = CameraManager()
 if __name__ == "__main__":
     """테스트 실행"""
     print("🧪 카메라 매니저 테스트 (30 FPS)")
+    camera_manager.open_storage()
+    camera_manager._detect_cameras()
     
     # 카메라 상태 확인
     status = camera_manager.get_camera_status()
@@ -1209,12 +2633,12 @@ if __name__ == "__main__":
         print("\n📸 카메라 0번 스냅샷 테스트")
         snap0 = camera_manager.capture_snapshot(0)
         if snap0:
-            print(f"   저장됨: {snap0}")
+            print(f"   저장됨: {snap0['filename']} ({snap0['source']})")
     
     if status["camera1"]["available"]:
         print("\n📸 카메라 1번 스냅샷 테스트")
         snap1 = camera_manager.capture_snapshot(1)
         if snap1:
-            print(f"   저장됨: {snap1}")
+            print(f"   저장됨: {snap1['filename']} ({snap1['source']})")
     
     print("\n🎉 테스트 완료")
\ No newline at end of file
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+녹화/스냅샷 파일 카탈로그 - SQLite 인덱스
+
+녹화기와 스냅샷 코드가 파일을 완성할 때마다 등록하고, 서버 시작 시 한 번만
+디스크와 맞춘다. 목록 조회는 (생성 시각, id) 키셋 커서로 페이지를 나누므로
+전체 파일 수와 관계없이 인덱스 탐색 + 페이지 크기만큼의 비용만 든다.
+"""
+
+import base64
+import os
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 카탈로그 파일 종류 → static 하위 디렉토리
+TYPE_DIRS = {
+    "video": "videos",   # 수동 녹화
+    "image": "images",   # 스냅샷 (해상도별 폴더)
+    "rec": "rec",        # 블랙박스 세그먼트 (카메라별 폴더)
+}
+
+FILE_EXTENSIONS = {
+    "video": (".mp4", ".h264"),
+    "image": (".jpg", ".jpeg", ".png"),
+    "rec": (".mp4", ".h264"),
+}
+
+# 파일명에서 카메라 번호 추출: camera0_..., manual_..._cam0, rec_0_...
+CAMERA_PATTERNS = (
+    re.compile(r"^camera(\d+)_"),
+    re.compile(r"_cam(\d+)\."),
+    re.compile(r"^rec_(\d+)_"),
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    file_type TEXT NOT NULL,
+    path TEXT NOT NULL UNIQUE,
+    camera INTEGER,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_files_created ON files (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_files_type_created ON files (file_type, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_files_camera_created ON files (camera, created_at DESC, id DESC);
+"""
+
+
+def encode_cursor(created_at: float, row_id: int) -> str:
+    """(시각, id) 키셋 페이지 커서 (이벤트 로그도 같은 형식 사용)"""
+    return base64.urlsafe_b64encode(f"{created_at!r}:{row_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    created_at, row_id = base64.urlsafe_b64decode(padded.encode()).decode().split(":")
+    return float(created_at), int(row_id)
+
+
+class FileCatalog:
+    """static 디렉토리 파일 인덱스 (스레드 안전)"""
+
+    def __init__(self, db_path: Path, static_dir: Path):
+        self.db_path = db_path
+        self.static_dir = static_dir
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")  # SD 카드 쓰기 줄이기
+        self._conn.executescript(SCHEMA)
+        self._counts: Dict[str, int] = {}
+        self._bytes: Dict[str, int] = {}
+        self._load_totals()
+
+    def _load_totals(self):
+        """종류별 파일 수/용량 (이후에는 등록/삭제 시 증감만)"""
+        with self._lock:
+            self._load_totals_locked()
+
+    def _load_totals_locked(self):
+        rows = self._conn.execute(
+            "SELECT file_type, COUNT(*), COALESCE(SUM(size), 0) FROM files GROUP BY file_type"
+        ).fetchall()
+        self._counts = {file_type: 0 for file_type in TYPE_DIRS}
+        self._bytes = {file_type: 0 for file_type in TYPE_DIRS}
+        for file_type, count, size in rows:
+            self._counts[file_type] = count
+            self._bytes[file_type] = size
+
+    def _classify(self, path: Path) -> Optional[Tuple[str, str, Optional[int]]]:
+        """절대 경로 → (종류, static 기준 상대 경로, 카메라 번호)"""
+        try:
+            rel = path.resolve().relative_to(self.static_dir.resolve())
+        except ValueError:
+            return None
+        return self._classify_rel(rel.as_posix())
+
+    @staticmethod
+    def _classify_rel(rel: str) -> Optional[Tuple[str, str, Optional[int]]]:
+        type_dir, _, rest = rel.partition("/")
+        file_type = next((t for t, d in TYPE_DIRS.items() if d == type_dir), None)
+        if file_type is None or not rest or not rel.lower().endswith(FILE_EXTENSIONS[file_type]):
+            return None
+
+        name = rel.rsplit("/", 1)[-1]
+        camera = None
+        for pattern in CAMERA_PATTERNS:
+            match = pattern.search(name)
+            if match:
+                camera = int(match.group(1))
+                break
+        return file_type, rel, camera
+
+    def _upsert(self, rows: List[Tuple[str, str, Optional[int], int, float]]):
+        """(종류, 경로, 카메라, 크기, 시각) 행을 한 트랜잭션으로 등록/갱신 (잠금 보유 상태에서 호출)"""
+        paths = [row[1] for row in rows]
+        old_sizes = {}
+        for i in range(0, len(paths), 500):
+            chunk = paths[i:i + 500]
+            old_sizes.update(self._conn.execute(
+                f"SELECT path, size FROM files WHERE path IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall())
+
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.executemany(
+                "INSERT INTO files (file_type, path, camera, size, created_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET size = excluded.size, created_at = excluded.created_at",
+                rows
+            )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+        for file_type, rel, _, size, _ in rows:
+            if rel in old_sizes:
+                self._bytes[file_type] += size - old_sizes[rel]
+            else:
+                self._counts[file_type] += 1
+                self._bytes[file_type] += size
+
+    def add_file(self, path: Path) -> bool:
+        """완성된 파일 등록 (이미 있으면 크기/시각 갱신)"""
+        info = self._classify(path)
+        if info is None:
+            return False
+        try:
+            stat = path.stat()
+        except OSError:
+            return False
+        file_type, rel, camera = info
+        with self._lock:
+            self._upsert([(file_type, rel, camera, stat.st_size, stat.st_mtime)])
+        return True
+
+    def remove_file(self, path: Path) -> bool:
+        """파일 등록 해제 (파일 삭제 후 호출)"""
+        info = self._classify(path)
+        if info is None:
+            return False
+        with self._lock:
+            return self._delete([info[1]]) > 0
+
+    def _delete(self, paths: List[str]) -> int:
+        """경로 목록 등록 해제 (잠금 보유 상태에서 호출)"""
+        removed = 0
+        self._conn.execute("BEGIN")
+        try:
+            for rel in paths:
+                row = self._conn.execute("SELECT file_type, size FROM files WHERE path = ?", (rel,)).fetchone()
+                if row is not None:
+                    self._conn.execute("DELETE FROM files WHERE path = ?", (rel,))
+                    self._counts[row[0]] -= 1
+                    self._bytes[row[0]] -= row[1]
+                    removed += 1
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            self._load_totals_locked()
+            raise
+        return removed
+
+    def _scan_disk(self) -> Iterable[Tuple[str, os.DirEntry]]:
+        """static 하위 카탈로그 대상 파일 (해상도/카메라 폴더 한 단계까지) → (상대 경로, 항목)"""
+        for type_dir in TYPE_DIRS.values():
+            root = self.static_dir / type_dir
+            if not root.is_dir():
+                continue
+            with os.scandir(root) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        yield f"{type_dir}/{entry.name}", entry
+                    elif entry.is_dir():
+                        with os.scandir(entry.path) as sub_entries:
+                            for sub in sub_entries:
+                                if sub.is_file():
+                                    yield f"{type_dir}/{entry.name}/{sub.name}", sub
+
+    def reconcile(self) -> dict:
+        """디스크와 카탈로그 맞추기 (서버 시작 시 한 번): 누락 파일 추가, 사라진 파일 제거"""
+        with self._lock:
+            known = {row[0]: (row[1], row[2]) for row in self._conn.execute("SELECT path, size, created_at FROM files")}
+
+        added = updated = 0
+        rows = []
+        on_disk = set()
+        for rel, entry in self._scan_disk():
+            info = self._classify_rel(rel)
+            if info is None:
+                continue
+            on_disk.add(rel)
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            previous = known.get(rel)
+            if previous == (stat.st_size, stat.st_mtime):
+                continue
+            if previous is None:
+                added += 1
+            else:
+                updated += 1
+            rows.append((info[0], rel, info[2], stat.st_size, stat.st_mtime))
+
+        with self._lock:
+            if rows:
+                self._upsert(rows)
+            removed = self._delete(sorted(set(known) - on_disk))
+
+        result = {"added": added, "updated": updated, "removed": removed, "total": sum(self._counts.values())}
+        print(f"🗂️ 파일 카탈로그 동기화: 추가 {added}, 갱신 {updated}, 제거 {removed} (총 {result['total']}개)")
+        return result
+
+    def query(self, file_types: Optional[List[str]] = None, camera: Optional[int] = None,
+              since: Optional[float] = None, until: Optional[float] = None,
+              cursor: Optional[str] = None, limit: int = 50) -> dict:
+        """최신순 페이지 조회 (cursor: 이전 페이지의 next_cursor)"""
+        where = []
+        params: list = []
+        if file_types:
+            where.append(f"file_type IN ({','.join('?' * len(file_types))})")
+            params += file_types
+        if camera is not None:
+            where.append("camera = ?")
+            params.append(camera)
+        if since is not None:
+            where.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("created_at < ?")
+            params.append(until)
+        if cursor:
+            created_at, row_id = decode_cursor(cursor)
+            where.append("(created_at, id) < (?, ?)")  # 행 값 비교 - 인덱스 범위 탐색
+            params += [created_at, row_id]
+
+        sql = "SELECT id, file_type, path, camera, size, created_at FROM files"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        params.append(limit + 1)  # 다음 페이지 존재 여부 확인용 한 개 더
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1][5], rows[-1][0])
+
+        return {
+            "items": [
+                {
+                    "file_type": file_type,
+                    "path": path,
+                    "camera": camera_num,
+                    "size": size,
+                    "created_at": created_at
+                }
+                for _, file_type, path, camera_num, size, created_at in rows
+            ],
+            "next_cursor": next_cursor
+        }
+
+    def oldest(self, file_types: List[str], limit: int = 64,
+               after: Optional[Tuple[float, int]] = None, camera: Optional[int] = None) -> List[dict]:
+        """오래된 순 조회 (보존 정책/재생용, after: 이전 결과 마지막 항목의 (created_at, id))"""
+        sql = (f"SELECT id, file_type, path, size, created_at FROM files "
+               f"WHERE file_type IN ({','.join('?' * len(file_types))})")
+        params: list = list(file_types)
+        if camera is not None:
+            sql += " AND camera = ?"
+            params.append(camera)
+        if after is not None:
+            sql += " AND (created_at, id) > (?, ?)"
+            params += list(after)
+        sql += " ORDER BY created_at ASC, id ASC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [
+            {"id": row_id, "file_type": file_type, "path": path, "size": size, "created_at": created_at}
+            for row_id, file_type, path, size, created_at in rows
+        ]
+
+    def remove_paths(self, paths: List[str]) -> int:
+        """static 기준 상대 경로 목록 등록 해제"""
+        with self._lock:
+            return self._delete(paths)
+
+    def get_summary(self) -> dict:
+        """종류별 파일 수와 총 용량 (메모리 카운터, O(1))"""
+        return {
+            file_type: {"count": self._counts.get(file_type, 0), "bytes": self._bytes.get(file_type, 0)}
+            for file_type in TYPE_DIRS
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+구간 클립 내보내기 - 녹화 파일을 키프레임 경계에서 잘라 하나의 H.264 파일로 결합 (재인코딩 없음)
+
+  - 구간과 겹치는 파일은 카탈로그에서 찾음 (playback.find_segments)
+  - 첫 파일은 시작 시각 이전의 마지막 키프레임부터, 마지막 파일은 끝 시각 직전 프레임까지
+    액세스 유닛 경계에서 자르고, 가운데 파일은 os.sendfile로 통째로 복사
+  - 파일에는 프레임별 시각이 없으므로 파일이 닫힌 시각(mtime)을 마지막 프레임으로 두고
+    인코더 프레임 간격(1/30초)으로 거슬러 계산
+
+작업은 제한된 작업자 풀(기본 1개, 낮은 nice 우선순위)에서 실행되어 실시간 인코더와
+요청 처리 스레드를 방해하지 않는다.
+"""
+
+import itertools
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from catalog import FileCatalog
+from h264 import H264AccessUnitParser
+from playback import find_segments
+
+FRAME_INTERVAL = 1 / 30
+COPY_CHUNK = 1024 * 1024
+
+SOURCES = {
+    "rec": ("rec", "rec_"),          # 블랙박스 세그먼트
+    "manual": ("video", "manual_"),  # 수동 녹화
+    "event": ("video", "event_"),    # 움직임 이벤트 녹화
+}
+
+
+class ExportJob:
+    """내보내기 작업 상태"""
+
+    def __init__(self, camera: int, start: datetime, end: datetime, source: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.camera = camera
+        self.start = start
+        self.end = end
+        self.source = source
+        self.status = "queued"  # queued → running → done | failed | cancelled
+        self.bytes_total = 0
+        self.bytes_done = 0
+        self.segments = 0
+        self.filename: Optional[str] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.cancelled = threading.Event()
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "camera": self.camera,
+            "start": self.start.isoformat(),
+            "end": self.end.isoformat(),
+            "source": self.source,
+            "status": self.status,
+            "progress": round(self.bytes_done / self.bytes_total, 3) if self.bytes_total else 0.0,
+            "bytes_done": self.bytes_done,
+            "bytes_total": self.bytes_total,
+            "segments": self.segments,
+            "filename": self.filename,
+            "url": f"/api/files/videos/{self.filename}" if self.status == "done" else None,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at
+        }
+
+
+def access_unit_spans(path: Path, end_time: float) -> List[Tuple[int, int, bool, float]]:
+    """파일의 액세스 유닛 (오프셋, 길이, 키프레임, 추정 시각) 목록"""
+    parser = H264AccessUnitParser(clock=lambda: 0.0)
+    units = []
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(COPY_CHUNK)
+            if not chunk:
+                break
+            units += [(len(au), au.keyframe) for au in parser.feed(chunk)]
+    units += [(len(au), au.keyframe) for au in parser.flush()]
+
+    spans = []
+    offset = 0
+    count = len(units)
+    for i, (length, keyframe) in enumerate(units):
+        spans.append((offset, length, keyframe, end_time - (count - 1 - i) * FRAME_INTERVAL))
+        offset += length
+    return spans
+
+
+def trim_range(spans: List[Tuple[int, int, bool, float]], since: Optional[float],
+               until: Optional[float]) -> Optional[Tuple[int, int]]:
+    """[since, until) 구간의 바이트 범위 (시작은 since 이전 마지막 키프레임, 없으면 첫 키프레임)"""
+    keyframes = [i for i, span in enumerate(spans) if span[2]]
+    if not keyframes:
+        return None
+
+    first = keyframes[0]
+    if since is not None:
+        for i in keyframes:
+            if spans[i][3] > since:
+                break
+            first = i
+
+    last = len(spans) - 1
+    if until is not None:
+        while last >= first and spans[last][3] >= until:
+            last -= 1
+        if last < first:
+            return None
+
+    start_offset = spans[first][0]
+    end_offset = spans[last][0] + spans[last][1]
+    return start_offset, end_offset
+
+
+class ExportManager:
+    """제한된 작업자 풀에서 내보내기 작업 실행"""
+
+    def __init__(self, catalog: FileCatalog, static_dir: Path, output_dir: Path,
+                 workers: int = 1, max_pending: int = 8, history: int = 50, nice: int = 10):
+        self.catalog = catalog
+        self.static_dir = static_dir
+        self.output_dir = output_dir
+        self.max_pending = max_pending
+        self.history = history
+        self.nice = nice
+        self.jobs: "OrderedDict[str, ExportJob]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="export",
+                                            initializer=self._lower_priority)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+    def _lower_priority(self):
+        """작업자 스레드 CPU 우선순위 낮추기 (Linux는 스레드 단위 nice 지원)"""
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), self.nice)
+        except (AttributeError, OSError):
+            pass
+
+    def submit(self, camera: int, start: datetime, end: datetime, source: str = "rec") -> Optional[ExportJob]:
+        """작업 등록 (대기 작업이 가득 차면 None)"""
+        with self._lock:
+            pending = sum(1 for job in self.jobs.values() if job.status in ("queued", "running"))
+            if pending >= self.max_pending:
+                return None
+            job = ExportJob(camera, start, end, source)
+            self.jobs[job.id] = job
+            # 오래된 완료 작업 기록 정리
+            while len(self.jobs) > self.history:
+                oldest_id = next(iter(self.jobs))
+                if self.jobs[oldest_id].status in ("queued", "running"):
+                    break
+                del self.jobs[oldest_id]
+        self._executor.submit(self._run, job)
+        print(f"✂️ 클립 내보내기 등록 (카메라 {camera}, {start.isoformat()} ~ {end.isoformat()}): {job.id}")
+        return job
+
+    def get(self, job_id: str) -> Optional[ExportJob]:
+        return self.jobs.get(job_id)
+
+    def list_jobs(self) -> List[dict]:
+        return [job.to_dict() for job in reversed(list(self.jobs.values()))]
+
+    def cancel(self, job_id: str) -> bool:
+        job = self.jobs.get(job_id)
+        if job is None or job.status not in ("queued", "running"):
+            return False
+        job.cancelled.set()
+        return True
+
+    def _run(self, job: ExportJob):
+        if job.cancelled.is_set():
+            job.status = "cancelled"
+            job.finished_at = time.time()
+            return
+
+        job.status = "running"
+        since, until = job.start.timestamp(), job.end.timestamp()
+        file_type, prefix = SOURCES[job.source]
+        # 세그먼트 파일 이름과 같은 로컬 시각 (UTC/epoch로 요청해도)
+        stem = f"clip_{job.start.astimezone().strftime('%Y%m%d_%H%M%S')}-{job.end.astimezone().strftime('%H%M%S')}"
+        # 같은 구간 작업이 동시에 돌아도 서로의 임시 파일을 건드리지 않도록 작업 id 포함
+        tmp_output = self.output_dir / f"{stem}_cam{job.camera}.{job.id}.part"
+
+        try:
+            segments = list(find_segments(self.catalog, job.camera, since, until, file_type, prefix))
+            if not segments:
+                raise ValueError("요청 구간에 녹화가 없습니다")
+            job.segments = len(segments)
+            job.bytes_total = sum(item["size"] for item in segments)
+
+            written = 0
+            out_fd = os.open(tmp_output, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            try:
+                for index, item in enumerate(segments):
+                    if job.cancelled.is_set():
+                        break
+                    path = self.static_dir / item["path"]
+                    first, last = index == 0, index == len(segments) - 1
+                    try:
+                        if first or last:
+                            spans = access_unit_spans(path, item["created_at"])
+                            byte_range = trim_range(spans, since if first else None, until if last else None)
+                        else:
+                            byte_range = (0, item["size"])
+                        if byte_range:
+                            written += self._copy(job, path, out_fd, *byte_range)
+                    except FileNotFoundError:
+                        print(f"⚠️ 내보내기 중 파일 없음 (보존 정책으로 삭제됨): {item['path']}")
+                    # 잘라낸 부분까지 포함해 진행률 보정
+                    job.bytes_done = sum(s["size"] for s in segments[:index + 1])
+            finally:
+                os.close(out_fd)
+
+            if job.cancelled.is_set():
+                tmp_output.unlink(missing_ok=True)
+                job.status = "cancelled"
+                print(f"🛑 클립 내보내기 취소: {job.id}")
+            elif written == 0:
+                tmp_output.unlink(missing_ok=True)
+                raise ValueError("요청 구간에 재생 가능한 프레임이 없습니다")
+            else:
+                output = self._publish(tmp_output, stem, job.camera)
+                job.filename = output.name
+                self.catalog.add_file(output)
+                job.status = "done"
+                print(f"✅ 클립 내보내기 완료: {job.filename} ({job.segments}개 파일, {written / (1024 ** 2):.1f}MB)")
+
+        except Exception as e:
+            tmp_output.unlink(missing_ok=True)
+            job.status = "failed"
+            job.error = str(e)
+            print(f"❌ 클립 내보내기 실패 ({job.id}): {e}")
+
+        job.finished_at = time.time()
+
+    def _publish(self, tmp_output: Path, stem: str, camera: int) -> Path:
+        """완성된 임시 파일을 겹치지 않는 이름으로 이동 (같은 구간을 다시 내보내면 -2, -3 ...)"""
+        for n in itertools.count(1):
+            suffix = "" if n == 1 else f"-{n}"
+            output = self.output_dir / f"{stem}{suffix}_cam{camera}.mp4"
+            try:
+                # 빈 파일로 이름 선점 (확인과 생성이 한 번에 - 다른 작업자와 경쟁해도 한쪽만 성공)
+                os.close(os.open(output, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644))
+            except FileExistsError:
+                continue
+            tmp_output.replace(output)
+            return output
+
+    def _copy(self, job: ExportJob, path: Path, out_fd: int, start: int, end: int) -> int:
+        """파일 범위를 출력 파일 끝에 복사 (커널 내 복사, 청크마다 취소 확인)"""
+        copied = 0
+        with open(path, "rb") as src:
+            offset = start
+            while offset < end and not job.cancelled.is_set():
+                sent = os.sendfile(out_fd, src.fileno(), offset, min(COPY_CHUNK, end - offset))
+                if sent == 0:
+                    break
+                offset += sent
+                copied += sent
+                job.bytes_done += sent
+        return copied
+
+    def shutdown(self):
+        for job in self.jobs.values():
+            job.cancelled.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
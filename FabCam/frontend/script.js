@@ -9,6 +9,10 @@ class CCTVSystem {
     this.recordingTimer = null
     this.videoFiles = []
     this.imageFiles = []
+    this.videoCursor = null
+    this.imageCursor = null
+    // 두 카메라를 WebSocket 하나로 수신 (지원하지 않으면 카메라별 MJPEG)
+    this.frameSocket = FrameSocket.supported() ? new FrameSocket() : null
 
     this.init()
   }
@@ -124,12 +128,26 @@ class CCTVSystem {
     console.log(`🚀 카메라 ${cameraId} 30 FPS 스트림 로드 성공`);
   }
 
+  // 캡처 → 화면 표시 지연 (WebSocket 수신 시에만, MJPEG <img>는 파트 헤더를 읽을 수 없음)
+  updateLatency(cameraId, stats) {
+    const badge = document.getElementById(`camera${cameraId}-latency`);
+    if (!badge) return;
+    if (!stats) {
+      badge.classList.add('hidden');
+      return;
+    }
+    badge.textContent = `지연 ${stats.p50}ms · p95 ${stats.p95}ms`;
+    badge.title = `캡처 → 화면 표시 (최근 ${stats.samples}프레임, 서버와 시계가 맞아야 정확)`;
+    badge.classList.remove('hidden');
+  }
+
   handleStreamError(cameraId) {
     const stream = document.getElementById(`camera${cameraId}-stream`);
     const overlay = document.getElementById(`camera${cameraId}-overlay`);
     const status = document.getElementById(`camera${cameraId}-status`);
 
     stream.style.display = 'none';
+    this.updateLatency(cameraId, null);
     overlay.classList.remove('hidden');
     
     status.innerHTML = '<div class="status-dot offline"></div>30 FPS 연결 실패';
@@ -164,8 +182,8 @@ class CCTVSystem {
         const data = await response.json();
         console.log(`🚀 카메라 ${cameraId} (백엔드 ${backendId}) 30 FPS 연결 성공:`, data);
         
-        // MJPEG 스트림 연결
-        this.initializeMJPEGStream(cameraId, backendId);
+        // 스트림 연결 (WebSocket 우선, 실패 시 MJPEG)
+        this.initializeStream(cameraId, backendId);
         
         this.showToast(`카메라 ${cameraId} 30 FPS 연결 성공`, 'success');
       } else {
@@ -178,6 +196,25 @@ class CCTVSystem {
     }
   }
 
+  initializeStream(cameraId, backendId) {
+    if (!this.frameSocket) {
+      this.initializeMJPEGStream(cameraId, backendId);
+      return;
+    }
+
+    const img = document.getElementById(`camera${cameraId}-stream`);
+    img.style.display = 'block';
+    this.frameSocket.subscribe(backendId, img, {
+      onFirstFrame: () => this.handleStreamLoad(cameraId),
+      onLatency: (stats) => this.updateLatency(cameraId, stats),
+      onUnavailable: () => this.handleStreamError(cameraId),
+      onFallback: () => {
+        console.warn(`카메라 ${cameraId} WebSocket 연결 실패 - MJPEG로 전환`);
+        this.initializeMJPEGStream(cameraId, backendId);
+      }
+    });
+  }
+
   initializeMJPEGStream(cameraId, backendId) {
     console.log(`🚀 30 FPS MJPEG 스트림 초기화: 카메라 ${cameraId} (백엔드 ${backendId})`);
     const img = document.getElementById(`camera${cameraId}-stream`);
@@ -223,8 +260,12 @@ class CCTVSystem {
     }
 
     // UI 업데이트
+    if (this.frameSocket) {
+      this.frameSocket.unsubscribe(backendId);
+    }
     img.src = '';
     img.style.display = 'none';
+    this.updateLatency(cameraId, null);
     overlay.classList.remove('hidden');
     status.innerHTML = '<div class="status-dot offline"></div>연결 대기중';
     status.className = 'camera-status';
@@ -261,7 +302,8 @@ class CCTVSystem {
       
       if (response.ok) {
         const data = await response.json();
-        this.showToast(`카메라 ${cameraId} 스냅샷 저장 (${resolutionNames[resolution]}): ${data.data.filename}`, 'success');
+        const source = data.data.source === 'stream' ? '스트림 프레임' : data.data.source;
+        this.showToast(`카메라 ${cameraId} 스냅샷 저장 (${resolutionNames[resolution]}, ${source}): ${data.data.filename}`, 'success');
         this.refreshFileList();
       } else {
         throw new Error('스냅샷 캡처 실패');
@@ -385,31 +427,81 @@ class CCTVSystem {
   }
 
   async refreshFileList() {
+    // 카탈로그 기반 최신순 첫 페이지 (동영상 목록에는 블랙박스 세그먼트 포함)
     try {
-      const response = await fetch('/api/files');
-      if (response.ok) {
-        const files = await response.json();
-        this.displayFiles(files);
-      } else {
-        throw new Error('파일 목록 로드 실패');
+      const [videoPage, imagePage, summary] = await Promise.all([
+        this.fetchFilePage('video,rec'),
+        this.fetchFilePage('image'),
+        fetch('/api/files/summary').then(response => response.json())
+      ]);
+      this.videoFiles = videoPage.items;
+      this.videoCursor = videoPage.next_cursor;
+      this.imageFiles = imagePage.items;
+      this.imageCursor = imagePage.next_cursor;
+      this.displayFiles();
+      this.updateFileCounts(summary.video.count + summary.rec.count, summary.image.count);
+    } catch (error) {
+      console.error('파일 목록 오류:', error);
+      this.showError('파일 목록을 불러올 수 없습니다');
+    }
+  }
+
+  async fetchFilePage(fileType, cursor = null) {
+    const params = new URLSearchParams({ file_type: fileType, limit: 50 });
+    if (cursor) {
+      params.set('cursor', cursor);
+    }
+    const response = await fetch(`/api/files?${params}`);
+    if (!response.ok) {
+      throw new Error('파일 목록 로드 실패');
+    }
+    return response.json();
+  }
+
+  async loadMoreFiles(kind) {
+    // 다음 페이지를 이어 붙임
+    try {
+      if (kind === 'video' && this.videoCursor) {
+        const page = await this.fetchFilePage('video,rec', this.videoCursor);
+        this.videoFiles = this.videoFiles.concat(page.items);
+        this.videoCursor = page.next_cursor;
+      } else if (kind === 'image' && this.imageCursor) {
+        const page = await this.fetchFilePage('image', this.imageCursor);
+        this.imageFiles = this.imageFiles.concat(page.items);
+        this.imageCursor = page.next_cursor;
       }
+      this.displayFiles();
     } catch (error) {
       console.error('파일 목록 오류:', error);
       this.showError('파일 목록을 불러올 수 없습니다');
     }
   }
 
-  displayFiles(files) {
-    // 비디오 파일 표시
-    const videoList = document.getElementById('videoList');
-    const imageList = document.getElementById('imageList');
-    
-    const videoFiles = files.filter(file => file.file_type === 'video');
-    const imageFiles = files.filter(file => file.file_type === 'image');
-    
-    this.updateVideoList(videoFiles);
-    this.updateImageList(imageFiles);
-    this.updateFileCounts(videoFiles.length, imageFiles.length);
+  displayFiles() {
+    this.updateVideoList(this.videoFiles);
+    this.updateImageList(this.imageFiles);
+  }
+
+  renderFileItems(files, kind, cursor) {
+    const items = files
+      .map(file => `
+        <div class="file-item">
+          <img class="file-thumb" src="${file.thumbnail_url}" loading="lazy" alt="" onerror="this.style.visibility='hidden'">
+          <div class="file-info">
+            <div class="file-name">${file.file_type === 'rec' ? '🚗 ' : ''}${file.filename}</div>
+            <div class="file-meta">${this.formatFileSize(file.size)} • ${this.formatDateTime(file.created_at)}</div>
+          </div>
+          <div class="file-actions">
+            <button class="btn btn-small btn-secondary" onclick="cctvSystem.downloadFile('${file.url}', '${file.filename}')">다운로드</button>
+            <button class="btn btn-small btn-secondary" onclick="cctvSystem.deleteFile('${file.url}', '${file.filename}')">삭제</button>
+          </div>
+        </div>
+      `)
+      .join('');
+    const more = cursor
+      ? `<button class="btn btn-small btn-secondary" onclick="cctvSystem.loadMoreFiles('${kind}')">더 보기</button>`
+      : '';
+    return items + more;
   }
 
   updateVideoList(videoFiles) {
@@ -423,20 +515,7 @@ class CCTVSystem {
         </div>
       `;
     } else {
-      videoList.innerHTML = videoFiles
-        .map(file => `
-          <div class="file-item">
-            <div class="file-info">
-              <div class="file-name">${file.filename}</div>
-              <div class="file-meta">${this.formatFileSize(file.size)} • ${this.formatDateTime(file.created_at)}</div>
-            </div>
-            <div class="file-actions">
-              <button class="btn btn-small btn-secondary" onclick="cctvSystem.downloadFile('videos', '${file.filename}')">다운로드</button>
-              <button class="btn btn-small btn-secondary" onclick="cctvSystem.deleteFile('videos', '${file.filename}')">삭제</button>
-            </div>
-          </div>
-        `)
-        .join('');
+      videoList.innerHTML = this.renderFileItems(videoFiles, 'video', this.videoCursor);
     }
   }
 
@@ -451,30 +530,16 @@ class CCTVSystem {
         </div>
       `;
     } else {
-      imageList.innerHTML = imageFiles
-        .map(file => `
-          <div class="file-item">
-            <div class="file-info">
-              <div class="file-name">${file.filename}</div>
-              <div class="file-meta">${this.formatFileSize(file.size)} • ${this.formatDateTime(file.created_at)}</div>
-            </div>
-            <div class="file-actions">
-              <button class="btn btn-small btn-secondary" onclick="cctvSystem.downloadFile('images', '${file.filename}')">다운로드</button>
-              <button class="btn btn-small btn-secondary" onclick="cctvSystem.deleteFile('images', '${file.filename}')">삭제</button>
-            </div>
-          </div>
-        `)
-        .join('');
+      imageList.innerHTML = this.renderFileItems(imageFiles, 'image', this.imageCursor);
     }
   }
 
-  downloadFile(fileType, filename) {
+  downloadFile(url, filename) {
     console.log('30 FPS 파일 다운로드:', filename);
-    const url = `/api/files/${fileType}/${filename}`;
     
     const link = document.createElement('a');
     link.href = url;
-    link.download = filename;
+    link.download = filename.split('/').pop();
     document.body.appendChild(link);
     link.click();
     document.body.removeChild(link);
@@ -482,7 +547,7 @@ class CCTVSystem {
     this.showToast('30 FPS 파일 다운로드를 시작합니다', 'info');
   }
 
-  async deleteFile(fileType, filename) {
+  async deleteFile(url, filename) {
     if (!confirm(`'${filename}' 30 FPS 파일을 삭제하시겠습니까?`)) {
       return;
     }
@@ -490,7 +555,7 @@ class CCTVSystem {
     console.log('30 FPS 파일 삭제:', filename);
     
     try {
-      const response = await fetch(`/api/files/${fileType}/${filename}`, {
+      const response = await fetch(url, {
         method: 'DELETE'
       });
       
@@ -571,7 +636,7 @@ class CCTVSystem {
         if (response.ok) {
           button.textContent = '●REC 시작';
           button.className = 'btn btn-primary';
-          this.showToast(`카메라 ${cameraId + 1} 블랙박스 중지, 스트림 재시작`, 'info');
+          this.showToast(`카메라 ${cameraId + 1} 블랙박스 중지`, 'info');
         }
       } else {
         // 연속 녹화 시작
@@ -597,6 +662,200 @@ class CCTVSystem {
   }
 }
 
+// WebSocket 다중 카메라 프레임 수신기 (/ws/video)
+// 바이너리 메시지 = 14바이트 헤더 + JPEG
+//   헤더(빅엔디언): 카메라 u8, 예약 u8, 시퀀스 u32, 캡처 시각 f64(epoch ms)
+// 프레임을 그린 뒤 {"ack": 카메라}를 보내 서버가 카메라별로 WINDOW개까지만 보내게 함
+// (느린 연결에서는 서버가 중간 프레임을 건너뛰고 최신 프레임만 보냄)
+const WS_FRAME_HEADER = 14;
+const WS_FRAME_WINDOW = 2;
+const LATENCY_SAMPLES = 60;        // 지연 분위수를 계산할 최근 프레임 수
+const LATENCY_UPDATE_MS = 500;     // 지연 표시 갱신 간격
+
+class FrameSocket {
+  constructor() {
+    this.socket = null
+    this.targets = {}       // 백엔드 카메라 번호 → 표시 대상과 통계
+    this.retryTimer = null
+    this.retryDelay = 1000
+    this.failures = 0       // 프레임을 받기 전에 끊긴 횟수
+  }
+
+  static supported() {
+    return 'WebSocket' in window;
+  }
+
+  subscribe(backendId, img, handlers) {
+    this.targets[backendId] = {
+      img,
+      handlers,
+      url: null,          // 현재 표시 중인 object URL
+      pending: null,      // 디코딩 중에 도착한 최신 프레임
+      pendingCapturedAt: 0,
+      busy: false,
+      frames: 0,
+      lastSeq: null,
+      skipped: 0,         // 서버에서 건너뛴 프레임 (시퀀스 간격)
+      latency: 0,         // 캡처 → 수신 (ms, 서버와 시계가 맞아야 의미 있음)
+      glass: [],          // 최근 프레임의 캡처 → 화면 표시 (ms)
+      latencyShownAt: 0
+    };
+    this.updateSubscription();
+  }
+
+  unsubscribe(backendId) {
+    const target = this.targets[backendId];
+    if (!target) return;
+    if (target.url) URL.revokeObjectURL(target.url);
+    delete this.targets[backendId];
+    this.updateSubscription();
+  }
+
+  cameraIds() {
+    return Object.keys(this.targets).map(Number);
+  }
+
+  updateSubscription() {
+    // 연결을 유지한 채 구독만 변경 (재연결하면 시청자가 잠시 0명이 되어 캡처가 재시작될 수 있음)
+    if (this.socket && this.socket.readyState === WebSocket.OPEN) {
+      this.socket.send(JSON.stringify({ cameras: this.cameraIds() }));
+      if (this.cameraIds().length === 0) this.close();
+    } else if (!this.socket && this.cameraIds().length > 0) {
+      this.connect();
+    }
+  }
+
+  connect() {
+    clearTimeout(this.retryTimer);
+    const scheme = location.protocol === 'https:' ? 'wss' : 'ws';
+    const url = `${scheme}://${location.host}/ws/video?cameras=${this.cameraIds().join(',')}&window=${WS_FRAME_WINDOW}`;
+    const socket = new WebSocket(url);
+    socket.binaryType = 'arraybuffer';
+    let received = false;
+
+    socket.onopen = () => {
+      // 연결 중에 바뀐 구독 반영
+      socket.send(JSON.stringify({ cameras: this.cameraIds() }));
+    };
+
+    socket.onmessage = (event) => {
+      if (typeof event.data === 'string') {
+        this.handleEvent(JSON.parse(event.data));
+        return;
+      }
+      if (!received) {
+        received = true;
+        this.failures = 0;
+        this.retryDelay = 1000;
+      }
+      this.handleFrame(event.data);
+    };
+
+    socket.onclose = () => {
+      if (this.socket !== socket) return;
+      this.socket = null;
+      if (this.cameraIds().length === 0) return;
+
+      if (!received && ++this.failures >= 3) {
+        // WebSocket을 쓸 수 없는 환경 (프록시 등) - 카메라별 MJPEG로 전환
+        const targets = this.targets;
+        this.targets = {};
+        Object.values(targets).forEach(target => target.handlers.onFallback());
+        return;
+      }
+      this.retryTimer = setTimeout(() => this.connect(), this.retryDelay);
+      this.retryDelay = Math.min(this.retryDelay * 2, 10000);
+    };
+
+    this.socket = socket;
+  }
+
+  close() {
+    clearTimeout(this.retryTimer);
+    if (this.socket) {
+      const socket = this.socket;
+      this.socket = null;
+      socket.close();
+    }
+  }
+
+  handleEvent(message) {
+    const target = this.targets[message.camera];
+    if (!target) return;
+    console.warn(`WebSocket 스트림 ${message.event} (카메라 ${message.camera})`);
+    delete this.targets[message.camera];
+    target.handlers.onUnavailable();
+  }
+
+  handleFrame(buffer) {
+    const view = new DataView(buffer);
+    const camera = view.getUint8(0);
+    const seq = view.getUint32(2);
+    const capturedAt = view.getFloat64(6);
+    const target = this.targets[camera];
+    if (!target) return;
+
+    if (target.lastSeq !== null && seq > target.lastSeq + 1) {
+      target.skipped += seq - target.lastSeq - 1;
+    }
+    target.lastSeq = seq;
+    target.latency = Date.now() - capturedAt;
+
+    // 디코딩 중이면 최신 프레임만 남기고 확인은 바로 보냄 (그리지 않는 프레임)
+    if (target.pending) this.ack(camera);
+    target.pending = new Blob([new Uint8Array(buffer, WS_FRAME_HEADER)], { type: 'image/jpeg' });
+    target.pendingCapturedAt = capturedAt;
+    if (!target.busy) this.render(camera, target);
+  }
+
+  render(camera, target) {
+    const url = URL.createObjectURL(target.pending);
+    const capturedAt = target.pendingCapturedAt;
+    target.pending = null;
+    target.busy = true;
+
+    const done = (loaded) => {
+      if (this.targets[camera] !== target) {
+        URL.revokeObjectURL(url);
+        return;
+      }
+      if (loaded) {
+        if (target.url) URL.revokeObjectURL(target.url);
+        target.url = url;
+        if (target.frames++ === 0) target.handlers.onFirstFrame();
+        this.recordLatency(target, Date.now() - capturedAt);
+      } else {
+        URL.revokeObjectURL(url);
+      }
+      target.busy = false;
+      this.ack(camera);
+      if (target.pending) this.render(camera, target);
+    };
+    target.img.onload = () => done(true);
+    target.img.onerror = () => done(false);
+    target.img.src = url;
+  }
+
+  // 캡처 → 화면 표시 지연 기록, LATENCY_UPDATE_MS마다 최근 프레임의 p50/p95 전달
+  recordLatency(target, value) {
+    target.glass.push(value);
+    if (target.glass.length > LATENCY_SAMPLES) target.glass.shift();
+    const now = performance.now();
+    if (now - target.latencyShownAt < LATENCY_UPDATE_MS) return;
+    target.latencyShownAt = now;
+
+    const sorted = [...target.glass].sort((a, b) => a - b);
+    const at = (q) => Math.round(sorted[Math.min(sorted.length - 1, Math.floor(sorted.length * q))]);
+    target.handlers.onLatency({ p50: at(0.5), p95: at(0.95), samples: sorted.length });
+  }
+
+  ack(camera) {
+    if (this.socket && this.socket.readyState === WebSocket.OPEN) {
+      this.socket.send(JSON.stringify({ ack: camera }));
+    }
+  }
+}
+
 // 전역 함수들 (HTML onclick 핸들러용)
 let cctvSystem;
 
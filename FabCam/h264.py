@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+H.264 Annex-B 바이트 스트림 처리 - 액세스 유닛 분리 및 키프레임 정렬 파일 기록
+"""
+
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import BinaryIO, Callable, Deque, Iterator, List, Optional
+
+START_CODE = b"\x00\x00\x01"
+
+# NAL 유닛 타입
+NAL_SLICE = 1
+NAL_IDR = 5
+NAL_SEI = 6
+NAL_SPS = 7
+NAL_PPS = 8
+NAL_AUD = 9
+
+
+class AccessUnit:
+    """인코딩된 한 프레임 (SPS/PPS/SEI 포함 가능, 불변)"""
+
+    __slots__ = ("data", "keyframe", "timestamp")
+
+    def __init__(self, data: bytes, keyframe: bool, timestamp: float):
+        self.data = data
+        self.keyframe = keyframe
+        self.timestamp = timestamp  # time.monotonic() 기준 캡처 시각
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+
+class H264AccessUnitParser:
+    """증분 Annex-B 파서 - 시작 코드로 NAL을 나누고 액세스 유닛 단위로 묶음
+
+    새 액세스 유닛은 AUD/SPS/PPS/SEI 또는 first_mb_in_slice == 0 인 슬라이스에서
+    시작한다. 다음 유닛의 시작을 봐야 현재 유닛이 끝난 것을 알 수 있으므로
+    출력은 한 프레임 늦다 (flush()로 마지막 유닛 배출).
+
+    clock: 유닛이 완성될 때 호출되어 타임스탬프를 돌려주는 함수
+    (인코더는 입력 프레임의 캡처 시각을 순서대로 돌려준다)
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._buffer = bytearray()
+        self._scan_pos = 0
+        self._nal_start = -1
+        self._au_nals: List[bytes] = []
+        self._au_has_slice = False
+        self._au_keyframe = False
+
+    def feed(self, data: bytes) -> Iterator[AccessUnit]:
+        """바이트 추가 후 완성된 액세스 유닛 반환"""
+        buffer = self._buffer
+        buffer.extend(data)
+        while True:
+            idx = buffer.find(START_CODE, self._scan_pos)
+            if idx == -1:
+                # 시작 코드가 청크 경계에 걸칠 수 있으므로 마지막 3바이트는 다시 검색
+                self._scan_pos = max(self._scan_pos, len(buffer) - 3, 0)
+                break
+            # 4바이트 시작 코드(00 00 00 01)의 앞 0은 다음 NAL에 포함
+            code_start = idx - 1 if idx > 0 and buffer[idx - 1] == 0 else idx
+            if self._nal_start >= 0 and code_start > self._nal_start:
+                yield from self._push_nal(bytes(buffer[self._nal_start:code_start]))
+            self._nal_start = code_start
+            self._scan_pos = idx + 3
+
+        # 처리 끝난 앞부분 제거 (진행 중인 NAL만 남김)
+        if self._nal_start > 0:
+            consumed = self._nal_start
+            self._nal_start = 0
+        elif self._nal_start < 0:
+            consumed = self._scan_pos  # 첫 시작 코드 이전의 쓰레기 데이터
+        else:
+            consumed = 0
+        if consumed:
+            del buffer[:consumed]
+            self._scan_pos -= consumed
+
+    def flush(self) -> Iterator[AccessUnit]:
+        """남은 데이터를 마지막 액세스 유닛으로 배출"""
+        if self._nal_start >= 0 and len(self._buffer) > self._nal_start:
+            yield from self._push_nal(bytes(self._buffer[self._nal_start:]))
+        self._buffer.clear()
+        self._scan_pos = 0
+        self._nal_start = -1
+        if self._au_has_slice:
+            yield self._emit()
+
+    def _push_nal(self, nal: bytes) -> Iterator[AccessUnit]:
+        offset = nal.find(START_CODE) + 3
+        if offset >= len(nal):
+            return
+        kind = nal[offset] & 0x1F
+        is_slice = kind in (NAL_SLICE, NAL_IDR)
+        first_slice = is_slice and offset + 1 < len(nal) and nal[offset + 1] & 0x80
+
+        if self._au_has_slice and (kind in (NAL_AUD, NAL_SPS, NAL_PPS, NAL_SEI) or first_slice):
+            yield self._emit()
+
+        self._au_nals.append(nal)
+        if is_slice:
+            self._au_has_slice = True
+            if kind == NAL_IDR:
+                self._au_keyframe = True
+
+    def _emit(self) -> AccessUnit:
+        au = AccessUnit(b"".join(self._au_nals), self._au_keyframe, self._clock())
+        self._au_nals = []
+        self._au_has_slice = False
+        self._au_keyframe = False
+        return au
+
+
+class H264FileWriter:
+    """키프레임부터 기록을 시작하는 H.264 파일 기록기"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._file: Optional[BinaryIO] = None
+        self.frames = 0
+        self.bytes_written = 0
+        self.first_timestamp: Optional[float] = None
+        self.last_timestamp: Optional[float] = None
+
+    @property
+    def started(self) -> bool:
+        """첫 키프레임을 기록했는지 여부 (닫은 뒤에도 유지)"""
+        return self.first_timestamp is not None
+
+    def write(self, au: AccessUnit) -> bool:
+        """액세스 유닛 기록 (첫 키프레임 이전 프레임은 버림)"""
+        if not self.started:
+            if not au.keyframe:
+                return False
+            self._file = open(self.path, "wb")
+            self.first_timestamp = au.timestamp
+        elif self._file is None:
+            return False  # 이미 닫힘
+        self._file.write(au.data)
+        self.frames += 1
+        self.bytes_written += len(au.data)
+        self.last_timestamp = au.timestamp
+        return True
+
+    def close(self):
+        """파일 닫기"""
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError as e:
+                print(f"H.264 파일 닫기 오류 ({self.path.name}): {e}")
+            self._file = None
+
+
+class PreRollBuffer:
+    """최근 N초의 액세스 유닛을 GOP 단위로 보관하는 메모리 링 버퍼
+
+    항상 키프레임에서 시작하도록 GOP 전체를 한꺼번에 버린다.
+    보관 시간은 max_seconds 이상(최대 한 GOP 더), 메모리는 max_bytes 이하로 유지한다.
+    """
+
+    def __init__(self, max_seconds: float = 10.0, max_bytes: int = 8 * 1024 * 1024):
+        self.max_seconds = max_seconds
+        self.max_bytes = max_bytes
+        self._gops: Deque[List[AccessUnit]] = deque()
+        self._gop_bytes: Deque[int] = deque()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.frames = 0
+        self.frames_evicted = 0
+
+    def push(self, au: AccessUnit):
+        """액세스 유닛 추가 후 한도를 넘는 오래된 GOP 제거"""
+        with self._lock:
+            if au.keyframe:
+                self._gops.append([au])
+                self._gop_bytes.append(len(au))
+            elif self._gops:
+                self._gops[-1].append(au)
+                self._gop_bytes[-1] += len(au)
+            else:
+                # 첫 키프레임 전 프레임은 단독으로 재생할 수 없으므로 버림
+                self.frames_evicted += 1
+                return
+            self.bytes += len(au)
+            self.frames += 1
+
+            # 두 번째 GOP만으로도 보관 시간을 채우면 첫 GOP는 필요 없음
+            while len(self._gops) > 1 and au.timestamp - self._gops[1][0].timestamp >= self.max_seconds:
+                self._evict()
+            # 메모리 상한은 절대 기준 (현재 GOP까지 버릴 수 있음)
+            while self.bytes > self.max_bytes and self._gops:
+                self._evict()
+
+    def _evict(self):
+        gop = self._gops.popleft()
+        self.bytes -= self._gop_bytes.popleft()
+        self.frames -= len(gop)
+        self.frames_evicted += len(gop)
+
+    def snapshot(self, since: Optional[float] = None) -> List[AccessUnit]:
+        """보관 중인 액세스 유닛 목록 (첫 항목은 키프레임, since: 이 시각을 포함하는 GOP부터)"""
+        with self._lock:
+            gops = list(self._gops)
+        if since is not None:
+            start = 0
+            for index, gop in enumerate(gops):
+                if gop[0].timestamp > since:
+                    break
+                start = index
+            gops = gops[start:]
+        return [au for gop in gops for au in gop]
+
+    def clear(self):
+        """버퍼 비우기"""
+        with self._lock:
+            self._gops.clear()
+            self._gop_bytes.clear()
+            self.bytes = 0
+            self.frames = 0
+
+    def get_stats(self) -> dict:
+        """메모리 사용량 및 보관 구간"""
+        with self._lock:
+            seconds = 0.0
+            if self._gops:
+                seconds = self._gops[-1][-1].timestamp - self._gops[0][0].timestamp
+            return {
+                "seconds": round(seconds, 2),
+                "max_seconds": self.max_seconds,
+                "frames": self.frames,
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "gops": len(self._gops),
+                "frames_evicted": self.frames_evicted
+            }
@@ -1,15 +1,22 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import StreamingResponse, FileResponse, HTMLResponse
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse, FileResponse, HTMLResponse, PlainTextResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
-import os
+import asyncio
+import itertools
+import re
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 import json
 
-from camera import camera_manager
-from models import FileInfo, RecordingStatus, ApiResponse
+from camera import DELIVERY_MODES, FrameMultiplexer, camera_manager
+from catalog import TYPE_DIRS
+from playback import find_segments, stream_segments
+from export import SOURCES as EXPORT_SOURCES
+from mjpeg import epoch_ms
+from models import (ExportRequest, FileInfo, FileListPage, MotionEventInfo, MotionEventPage,
+                    RecordingStatus, ApiResponse)
 
 app = FastAPI(title="Fabcam CCTV System", version="2.0.0")
 
@@ -30,27 +37,30 @@ BASE_DIR = Path(__file__).parent
 STATIC_DIR = BASE_DIR / "static"
 FRONTEND_DIR = BASE_DIR / "frontend"
 
-# 디렉토리가 없으면 생성
-STATIC_DIR.mkdir(exist_ok=True)
-(STATIC_DIR / "videos").mkdir(exist_ok=True)
-(STATIC_DIR / "images").mkdir(exist_ok=True)
-(STATIC_DIR / "rec").mkdir(exist_ok=True)
-
-app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
+# static 디렉토리는 서버 시작 시 camera_manager.open_storage()가 생성 (import에는 부작용 없음)
+app.mount("/static", StaticFiles(directory=str(STATIC_DIR), check_dir=False), name="static")
 app.mount("/frontend", StaticFiles(directory=str(FRONTEND_DIR)), name="frontend")
 
+# 시작 백그라운드 작업 참조 (완료 전에 가비지 수집되지 않도록)
+startup_tasks = set()
+
 @app.on_event("startup")
 async def startup_event():
     print("Starting Fabcam CCTV System (30 FPS)...")
-    # 카메라 초기화 시도
-    camera0_ok = camera_manager.init_camera(0)
-    camera1_ok = camera_manager.init_camera(1)
+    camera_manager.open_storage()
+    camera_manager.resource_monitor.start_sampling()
     
-    if camera0_ok or camera1_ok:
-        print(f"Camera initialized: Camera0={camera0_ok}, Camera1={camera1_ok}")
-        print("🚀 30 FPS 스트리밍 준비됨")
-    else:
-        print("Warning: No cameras initialized")
+    async def sync_storage():
+        # 파일 카탈로그를 디스크와 맞춘 뒤 보존 정책 시작
+        await asyncio.to_thread(camera_manager.catalog.reconcile)
+        camera_manager.retention.start()
+    
+    # 카탈로그 동기화와 카메라 감지/초기화는 백그라운드로 - 서버는 바로 요청을 받음
+    # (감지 전에 들어온 카메라 요청은 감지를 기다린 뒤 처리)
+    for job in (sync_storage(), camera_manager.start_cameras()):
+        task = asyncio.create_task(job)
+        startup_tasks.add(task)
+        task.add_done_callback(startup_tasks.discard)
 
 @app.on_event("shutdown")
 async def shutdown_event():
@@ -71,29 +81,125 @@ async def read_root():
         """)
 
 @app.get("/video_feed/{camera_id}")
-async def video_feed(camera_id: int):
-    """개별 카메라 MJPEG 스트림 (30 FPS)"""
+async def video_feed(camera_id: int, fps: Optional[float] = None, mode: Optional[str] = None):
+    """개별 카메라 MJPEG 스트림 (30 FPS, 비동기 배포 - 시청자당 스레드 없음)
+    
+    fps: 시청자별 목표 프레임률 (예: 대시보드 썸네일 ?fps=2) - 큐에 넣기 전에 고르게 솎아냄
+    mode: 전달 방식 - queue (최근 5프레임 큐) 또는 latest (전송이 끝날 때마다 가장 새 프레임, 저지연)
+    """
     if camera_id not in [0, 1]:
         raise HTTPException(status_code=400, detail="Camera ID must be 0 or 1")
+    if fps is not None and not 0 < fps <= 30:
+        raise HTTPException(status_code=400, detail="fps must be between 0 and 30")
+    if mode is not None and mode not in DELIVERY_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {', '.join(DELIVERY_MODES)}")
     
-    # 카메라 사용 가능 확인
-    status = camera_manager.get_camera_status()
-    camera_key = f"camera{camera_id}"
-    
-    if not status[camera_key]["available"]:
+    # 카메라 사용 가능 확인 (리소스 측정이 포함된 get_camera_status는 이벤트 루프를 막음)
+    if not camera_manager.is_camera_available(camera_id):
         # 카메라 재초기화 시도
         print(f"카메라 {camera_id}번 재초기화 시도...")
-        if camera_manager.init_camera(camera_id):
+        if await camera_manager.init_camera_async(camera_id):
             print(f"카메라 {camera_id}번 재초기화 성공")
         else:
             raise HTTPException(status_code=503, detail=f"Camera {camera_id} not available")
     
-    print(f"🚀 30 FPS 스트림 시작 - 카메라 {camera_id}")
+    print(f"🚀 {fps or 30} FPS 스트림 시작 - 카메라 {camera_id}")
     return StreamingResponse(
-        camera_manager.generate_mjpeg_stream(camera_id),
+        camera_manager.generate_mjpeg_stream(camera_id, fps, mode),
         media_type="multipart/x-mixed-replace; boundary=frame"
     )
 
+def _parse_camera_ids(value) -> Optional[List[int]]:
+    """카메라 목록 ("0,1" 또는 [0, 1]) 검증 (잘못되면 None)"""
+    try:
+        items = value.split(",") if isinstance(value, str) else list(value)
+        camera_ids = sorted({int(item) for item in items if str(item).strip() != ""})
+    except (TypeError, ValueError):
+        return None
+    if any(camera_id not in [0, 1] for camera_id in camera_ids):
+        return None
+    return camera_ids
+
+@app.websocket("/ws/video")
+async def video_ws(websocket: WebSocket, cameras: str = "0,1", fps: Optional[float] = None, window: int = 0,
+                   mode: Optional[str] = None):
+    """여러 카메라 프레임을 WebSocket 하나로 전송 (대시보드당 연결 1개)
+    
+    바이너리 메시지 = 14바이트 헤더 + JPEG
+      헤더(빅엔디언): 카메라 u8, 예약 u8, 시퀀스 u32, 캡처 시각 f64(epoch ms)
+    카메라마다 최신 프레임 하나만 대기하고 전송이 끝나야 다음 프레임을 꺼내므로
+    느린 연결은 지연이 쌓이는 대신 프레임을 건너뛴다.
+    window: 카메라별 미확인 프레임 한도 (0이면 TCP 흐름 제어만, 대시보드는 2)
+      - 클라이언트는 프레임을 그린 뒤 {"ack": 카메라}를 보냄
+    mode: 전달 방식 (queue: 카메라별 1프레임 큐, latest: 공유 최신 프레임 슬롯)
+    
+    텍스트 메시지 (클라이언트 → 서버): {"cameras": [0, 1]} 구독 카메라 변경, {"ack": n} 프레임 확인
+    텍스트 메시지 (서버 → 클라이언트): {"event": "unavailable" | "ended", "camera": n}
+    """
+    camera_ids = _parse_camera_ids(cameras)
+    if camera_ids is None or (fps is not None and not 0 < fps <= 30) or not 0 <= window <= 30 \
+            or (mode is not None and mode not in DELIVERY_MODES):
+        await websocket.close(code=1008)
+        return
+    
+    await websocket.accept()
+    mux = FrameMultiplexer(camera_manager, fps, window, mode or camera_manager.delivery_mode)
+    send_lock = asyncio.Lock()
+    
+    async def send_event(event: str, camera_num: int):
+        async with send_lock:
+            await websocket.send_text(json.dumps({"event": event, "camera": camera_num}))
+    
+    async def subscribe(ids: List[int]):
+        for camera_num in set(mux.subscriptions) - set(ids):
+            mux.unsubscribe(camera_num)
+        for camera_num in ids:
+            if not await mux.subscribe(camera_num):
+                await send_event("unavailable", camera_num)
+    
+    async def sender():
+        async for camera_num, frame in mux.frames():
+            if frame is None:
+                await send_event("ended", camera_num)
+                continue
+            async with send_lock:
+                await websocket.send_bytes(frame.ws_header(camera_num) + frame.data)
+    
+    async def receiver():
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            try:
+                payload = json.loads(message.get("text") or "")
+                if "ack" in payload:
+                    mux.ack(int(payload["ack"]))
+                    continue
+                ids = _parse_camera_ids(payload["cameras"])
+            except (ValueError, KeyError, TypeError):
+                ids = None
+            if ids is not None:
+                await subscribe(ids)
+    
+    print(f"🔌 WebSocket 스트림 연결 - 카메라 {camera_ids}" + (f", {fps} fps" if fps else ""))
+    tasks = []
+    try:
+        await subscribe(camera_ids)
+        tasks = [asyncio.create_task(sender()), asyncio.create_task(receiver())]
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            error = task.exception()
+            if error is not None and not isinstance(error, WebSocketDisconnect):
+                print(f"WebSocket 스트림 오류: {error}")
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        mux.close()
+        print(f"🔌 WebSocket 스트림 종료 - 카메라 {camera_ids}")
+
 @app.get("/api/camera/status")
 async def camera_status():
     return camera_manager.get_camera_status()
@@ -103,6 +209,41 @@ async def system_status():
     """시스템 리소스 상태 확인"""
     return camera_manager.get_system_status()
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """스트림 파이프라인 지표 (Prometheus 텍스트 형식)"""
+    return PlainTextResponse(
+        camera_manager.get_metrics_text(),
+        media_type="text/plain; version=0.0.4"
+    )
+
+@app.get("/api/metrics")
+async def metrics_json():
+    """스트림 파이프라인 지표 (JSON) - fps, 바이트, 프레임 크기 분포, 시청자별 전송/드롭/지연"""
+    return camera_manager.get_metrics()
+
+@app.get("/api/system/history")
+async def system_history(minutes: Optional[float] = None, points: int = 120):
+    """시스템 리소스 이력 (minutes: 최근 구간, points: 최대 데이터 개수)"""
+    if points < 1 or points > 1000:
+        raise HTTPException(status_code=400, detail="points must be between 1 and 1000")
+    return camera_manager.get_system_history(minutes, points)
+
+@app.get("/api/storage/status")
+async def storage_status():
+    """보존 정책 상태 (종류별 사용량/할당량, 확보한 용량, 가득 찰 때까지 남은 시간)"""
+    return camera_manager.get_storage_status()
+
+@app.post("/api/storage/cleanup")
+async def storage_cleanup():
+    """보존 정책 즉시 실행"""
+    evicted = await asyncio.to_thread(camera_manager.retention.run_once)
+    return ApiResponse(
+        success=True,
+        message=f"{len(evicted)}개 파일 정리됨",
+        data={"evicted": [item["path"] for item in evicted], "bytes": sum(item["size"] for item in evicted)}
+    )
+
 @app.get("/api/system/recommendation")
 async def recording_recommendation():
     """녹화 권장사항 확인"""
@@ -114,7 +255,7 @@ async def connect_camera(camera_id: int):
     if camera_id not in [0, 1]:
         raise HTTPException(status_code=400, detail="Camera ID must be 0 or 1")
     
-    if camera_manager.init_camera(camera_id):
+    if await camera_manager.init_camera_async(camera_id, wait_ready=True):
         return ApiResponse(
             success=True,
             message=f"Camera {camera_id} connected (30 FPS)",
@@ -129,7 +270,7 @@ async def disconnect_camera(camera_id: int):
     if camera_id not in [0, 1]:
         raise HTTPException(status_code=400, detail="Camera ID must be 0 or 1")
     
-    camera_manager.stop_stream(camera_id)
+    await camera_manager.stop_stream_async(camera_id)
     return ApiResponse(
         success=True,
         message=f"Camera {camera_id} disconnected",
@@ -137,17 +278,21 @@ async def disconnect_camera(camera_id: int):
     )
 
 @app.post("/api/camera/{camera_id}/start_continuous")
-async def start_continuous_recording(camera_id: int):
-    """개별 카메라 연속 녹화 시작"""
+async def start_continuous_recording(camera_id: int, segment_duration: Optional[float] = None):
+    """개별 카메라 연속 녹화 시작 (segment_duration: 세그먼트 길이(초), 생략 시 기본값)"""
     if camera_id not in [0, 1]:
         raise HTTPException(status_code=400, detail="Camera ID must be 0 or 1")
     
-    success = camera_manager.start_continuous_recording(camera_id)
+    if segment_duration is not None and segment_duration <= 0:
+        raise HTTPException(status_code=400, detail="segment_duration must be positive")
+    
+    success = await camera_manager.start_continuous_recording_async(camera_id, segment_duration)
     if success:
+        status = camera_manager.get_continuous_recording_status(camera_id)
         return ApiResponse(
             success=True,
             message=f"Camera {camera_id} continuous recording started",
-            data={"camera_id": camera_id}
+            data={"camera_id": camera_id, "segment_duration": status.get("segment_duration")}
         )
     else:
         raise HTTPException(status_code=500, detail=f"Failed to start continuous recording for camera {camera_id}")
@@ -158,7 +303,7 @@ async def stop_continuous_recording(camera_id: int):
     if camera_id not in [0, 1]:
         raise HTTPException(status_code=400, detail="Camera ID must be 0 or 1")
     
-    success = camera_manager.stop_continuous_recording(camera_id)
+    success = await camera_manager.stop_continuous_recording_async(camera_id)
     if success:
         return ApiResponse(
             success=True,
@@ -177,13 +322,78 @@ async def get_continuous_recording_status(camera_id: int):
     status = camera_manager.get_continuous_recording_status(camera_id)
     return status
 
+@app.post("/api/motion/{camera_id}/start")
+async def start_motion_detection(camera_id: int):
+    """움직임 감지 시작 (움직임이 있을 때만 프리롤/후행 시간 포함 녹화)"""
+    if camera_id not in [0, 1]:
+        raise HTTPException(status_code=400, detail="Camera ID must be 0 or 1")
+    
+    if await camera_manager.start_motion_detection_async(camera_id):
+        return ApiResponse(
+            success=True,
+            message=f"Camera {camera_id} motion detection started",
+            data=camera_manager.get_motion_status()["config"]
+        )
+    raise HTTPException(status_code=500, detail=f"Failed to start motion detection for camera {camera_id}")
+
+@app.post("/api/motion/{camera_id}/stop")
+async def stop_motion_detection(camera_id: int):
+    """움직임 감지 중지 (진행 중인 이벤트 녹화는 저장)"""
+    if camera_id not in [0, 1]:
+        raise HTTPException(status_code=400, detail="Camera ID must be 0 or 1")
+    
+    if await camera_manager.stop_motion_detection_async(camera_id):
+        return ApiResponse(success=True, message=f"Camera {camera_id} motion detection stopped")
+    raise HTTPException(status_code=400, detail=f"Motion detection is not running for camera {camera_id}")
+
+@app.get("/api/motion/status")
+async def motion_status():
+    """카메라별 움직임 감지 상태 (현재 점수, 진행 중인 이벤트, 분석 CPU 사용률)"""
+    return camera_manager.get_motion_status()
+
+@app.get("/api/events", response_model=MotionEventPage)
+async def get_motion_events(
+    cursor: Optional[str] = None,
+    limit: int = 50,
+    camera: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+):
+    """움직임 이벤트 기록 (최신순 페이지, since/until: 이벤트 시작 시각 ISO 8601)"""
+    if not 1 <= limit <= 500:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 500")
+    
+    try:
+        page = await asyncio.to_thread(
+            camera_manager.events.query,
+            camera=camera,
+            since=since.timestamp() if since else None,
+            until=until.timestamp() if until else None,
+            cursor=cursor,
+            limit=limit
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    items = []
+    for item in page["items"]:
+        path = item.pop("path")
+        # 보존 정책으로 지워진 녹화는 링크하지 않음
+        exists = path is not None and (STATIC_DIR / path).exists()
+        items.append(MotionEventInfo(
+            **item,
+            url=f"/api/files/{path}" if exists else None,
+            thumbnail_url=f"/api/thumbnails/{path}" if exists else None
+        ))
+    return MotionEventPage(items=items, next_cursor=page["next_cursor"])
+
 @app.post("/api/recording/start")
 async def start_recording(request: dict = {}):
     """수동 녹화 시작 (리소스 체크 포함)"""
     try:
         camera_ids = request.get("camera_ids") if request else None
         print(f"🎯 수동 녹화 API 요청: camera_ids={camera_ids}")
-        success = camera_manager.start_manual_recording(camera_ids)
+        success = await camera_manager.start_manual_recording_async(camera_ids)
         if success:
             return ApiResponse(
                 success=True,
@@ -203,7 +413,7 @@ async def start_recording(request: dict = {}):
 async def stop_recording():
     """수동 녹화 중지"""
     try:
-        saved_files = camera_manager.stop_manual_recording()
+        saved_files = await camera_manager.stop_manual_recording_async()
         return ApiResponse(
             success=True,
             message="수동 녹화가 중지되었습니다",
@@ -222,6 +432,56 @@ async def get_recording_status():
         duration=status.get("duration")
     )
 
+ENTITY_TAG = re.compile(r'(?:W/)?"[^"]*"')
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 헤더에 etag가 있는지 (쉼표 목록, *, 약한 검증자 W/ 허용 - GET/HEAD는 약한 비교)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag.removeprefix("W/") in {tag.removeprefix("W/") for tag in ENTITY_TAG.findall(if_none_match)}
+
+@app.get("/api/camera/{camera_id}/latest.jpg")
+async def latest_jpeg(request: Request, camera_id: int, after: Optional[int] = None, timeout: float = 10.0):
+    """최신 스트림 프레임 한 장 (메모리에서 바로 응답 - rpicam-still 실행 없음, NVR/상태 페이지 폴링용)
+    
+    ETag는 프레임 순번 기반이므로 If-None-Match가 같으면 304.
+    after: 이 순번(X-Frame-Seq)보다 새 프레임이 나올 때까지 최대 timeout초 기다림 (롱 폴링, 시간 초과 시 304)
+    """
+    if camera_id not in [0, 1]:
+        raise HTTPException(status_code=400, detail="Camera ID must be 0 or 1")
+    if not 0 <= timeout <= 30:
+        raise HTTPException(status_code=400, detail="timeout must be between 0 and 30")
+    
+    # 캡처 중이면 바로 사용 (카메라 잠금/스레드 전환 없음 - 스냅샷이 잠금을 쥐고 있어도 기다리지 않음)
+    shared_stream = camera_manager.shared_streams.get(camera_id)
+    if shared_stream is None or not shared_stream.is_running:
+        # 꺼져 있으면 시작 (요청이 끝나면 시청자처럼 유휴 유예 시간 동안 유지되므로 주기적 폴링은 캡처를 계속 씀)
+        shared_stream = await camera_manager.ensure_shared_stream(camera_id)
+        if shared_stream is None:
+            raise HTTPException(status_code=503, detail=f"Camera {camera_id} not available")
+    
+    frame = await shared_stream.wait_frame(after, timeout)
+    if frame is None:
+        if after is None:
+            raise HTTPException(status_code=503, detail=f"No frame from camera {camera_id}")
+        shared_stream.metrics.still_served(not_modified=True)
+        return Response(status_code=304, headers={"Cache-Control": "no-cache"})
+    
+    etag = shared_stream.frame_etag(frame)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "no-cache",  # 캐시해도 되지만 매번 ETag로 재검증
+        "X-Frame-Seq": str(frame.seq),
+        "X-Capture-Time": f"{epoch_ms(frame.captured):.3f}"
+    }
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        shared_stream.metrics.still_served(not_modified=True)
+        return Response(status_code=304, headers=headers)
+    shared_stream.metrics.still_served()
+    return Response(content=frame.data, media_type="image/jpeg", headers=headers)
+
 @app.post("/api/snapshot/{camera_id}")
 async def capture_snapshot(camera_id: int, resolution: str = "hd"):
     """개별 카메라 스냅샷 캡처 (해상도 선택 가능)"""
@@ -233,8 +493,8 @@ async def capture_snapshot(camera_id: int, resolution: str = "hd"):
     if resolution not in valid_resolutions:
         raise HTTPException(status_code=400, detail=f"Invalid resolution. Must be one of: {valid_resolutions}")
     
-    filename = camera_manager.capture_snapshot(camera_id, resolution)
-    if filename:
+    snapshot = await camera_manager.capture_snapshot_async(camera_id, resolution)
+    if snapshot:
         resolution_names = {
             "vga": "640×480",
             "hd": "1280×720", 
@@ -243,89 +503,180 @@ async def capture_snapshot(camera_id: int, resolution: str = "hd"):
         return ApiResponse(
             success=True,
             message=f"Snapshot captured from camera {camera_id} at {resolution_names[resolution]}",
-            data={"filename": filename, "camera_id": camera_id, "resolution": resolution}
+            data={
+                "filename": snapshot["filename"],
+                "camera_id": camera_id,
+                "resolution": resolution,
+                "source": snapshot["source"],  # "stream" (최신 스트림 프레임) 또는 백엔드 스틸 명령 ("rpicam-still", "replay")
+                "elapsed_ms": snapshot["elapsed_ms"]
+            }
         )
     else:
         raise HTTPException(status_code=400, detail=f"Failed to capture snapshot from camera {camera_id}")
 
-@app.get("/api/files", response_model=List[FileInfo])
-async def get_files():
-    files = []
-    
-    # 비디오 파일
-    video_dir = STATIC_DIR / "videos"
-    if video_dir.exists():
-        for filename in os.listdir(video_dir):
-            filepath = video_dir / filename
-            if os.path.isfile(filepath):
-                stat = os.stat(filepath)
-                files.append(FileInfo(
-                    filename=filename,
-                    size=stat.st_size,
-                    created_at=datetime.fromtimestamp(stat.st_ctime).isoformat(),
-                    file_type="video"
-                ))
-    
-    # 이미지 파일 (해상도별 폴더 포함)
-    image_dir = STATIC_DIR / "images"
-    if image_dir.exists():
-        # 최상위 이미지 파일
-        for filename in os.listdir(image_dir):
-            filepath = image_dir / filename
-            if os.path.isfile(filepath):
-                stat = os.stat(filepath)
-                files.append(FileInfo(
-                    filename=filename,
-                    size=stat.st_size,
-                    created_at=datetime.fromtimestamp(stat.st_ctime).isoformat(),
-                    file_type="image"
-                ))
-        
-        # 해상도별 폴더의 이미지 파일
-        for res_folder in ["640x480", "1280x720", "1920x1080"]:
-            res_dir = image_dir / res_folder
-            if res_dir.exists() and res_dir.is_dir():
-                for filename in os.listdir(res_dir):
-                    filepath = res_dir / filename
-                    if os.path.isfile(filepath):
-                        stat = os.stat(filepath)
-                        files.append(FileInfo(
-                            filename=f"{res_folder}/{filename}",
-                            size=stat.st_size,
-                            created_at=datetime.fromtimestamp(stat.st_ctime).isoformat(),
-                            file_type="image"
-                        ))
-    
-    return sorted(files, key=lambda x: x.created_at, reverse=True)
+@app.get("/api/files", response_model=FileListPage)
+async def get_files(
+    cursor: Optional[str] = None,
+    limit: int = 50,
+    file_type: Optional[str] = None,
+    camera: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+):
+    """파일 목록 (카탈로그 기반 최신순 페이지)
+    
+    file_type: video, image, rec 중 하나 이상 (쉼표 구분), since/until: ISO 8601 시각
+    """
+    if not 1 <= limit <= 500:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 500")
+    
+    file_types = [t.strip() for t in file_type.split(",") if t.strip()] if file_type else None
+    if file_types and any(t not in TYPE_DIRS for t in file_types):
+        raise HTTPException(status_code=400, detail="Invalid file type")
+    
+    try:
+        page = await asyncio.to_thread(
+            camera_manager.catalog.query,
+            file_types=file_types,
+            camera=camera,
+            since=since.timestamp() if since else None,
+            until=until.timestamp() if until else None,
+            cursor=cursor,
+            limit=limit
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    items = []
+    for item in page["items"]:
+        # 카탈로그 경로는 static 기준 (videos/..., images/640x480/..., rec/camera0/...)
+        type_dir, filename = item["path"].split("/", 1)
+        items.append(FileInfo(
+            filename=filename,
+            size=item["size"],
+            created_at=datetime.fromtimestamp(item["created_at"]).isoformat(),
+            file_type=item["file_type"],
+            camera=item["camera"],
+            url=f"/api/files/{type_dir}/{filename}",
+            thumbnail_url=f"/api/thumbnails/{type_dir}/{filename}"
+        ))
+    return FileListPage(items=items, next_cursor=page["next_cursor"])
+
+@app.get("/api/files/summary")
+async def get_files_summary():
+    """종류별 파일 수와 총 용량"""
+    return camera_manager.catalog.get_summary()
 
-@app.get("/api/files/{file_type}/{path:path}")
-async def download_file(file_type: str, path: str):
-    if file_type not in ["videos", "images"]:
+def _resolve_file(file_type: str, path: str) -> Path:
+    """다운로드/삭제 대상 경로 (종류별 폴더 밖은 거부)"""
+    if file_type not in TYPE_DIRS.values():
         raise HTTPException(status_code=400, detail="Invalid file type")
     
-    # path는 파일명 또는 폴더/파일명 형태
-    filepath = STATIC_DIR / file_type / path
+    base = (STATIC_DIR / file_type).resolve()
+    filepath = (base / path).resolve()
+    if base not in filepath.parents:
+        raise HTTPException(status_code=400, detail="Invalid path")
     
-    if not filepath.exists():
+    if not filepath.is_file():
         raise HTTPException(status_code=404, detail="File not found")
+    return filepath
+
+@app.get("/api/files/{file_type}/{path:path}")
+async def download_file(file_type: str, path: str):
+    # path는 파일명 또는 폴더/파일명 형태
+    filepath = _resolve_file(file_type, path)
+    return FileResponse(str(filepath), filename=filepath.name)
+
+@app.get("/api/playback/{camera_id}")
+async def playback(camera_id: int, start: datetime, end: datetime):
+    """블랙박스 구간 재생 - [start, end)와 겹치는 세그먼트를 이어 붙인 H.264 스트림 (재인코딩 없음)"""
+    if camera_id not in [0, 1]:
+        raise HTTPException(status_code=404, detail="Camera not found")
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
     
-    # 실제 파일명 추출 (경로에서 마지막 부분)
-    actual_filename = Path(path).name
+    segments = find_segments(camera_manager.catalog, camera_id, start.timestamp(), end.timestamp())
+    first = await asyncio.to_thread(next, segments, None)
+    if first is None:
+        raise HTTPException(status_code=404, detail="No recordings in the requested range")
     
-    return FileResponse(str(filepath), filename=actual_filename)
+    filename = f"rec_{camera_id}_{start.strftime('%Y%m%d_%H%M%S')}-{end.strftime('%H%M%S')}.h264"
+    return StreamingResponse(
+        stream_segments(STATIC_DIR, itertools.chain([first], segments)),
+        media_type="video/h264",
+        headers={"Content-Disposition": f'inline; filename="{filename}"'}
+    )
 
-@app.delete("/api/files/{file_type}/{filename}")
-async def delete_file(file_type: str, filename: str):
-    if file_type not in ["videos", "images"]:
-        raise HTTPException(status_code=400, detail="Invalid file type")
+@app.post("/api/exports", status_code=202)
+async def create_export(request: ExportRequest):
+    """구간 클립 내보내기 작업 등록 (키프레임 경계에서 잘라 결합, 재인코딩 없음)"""
+    if request.camera not in [0, 1]:
+        raise HTTPException(status_code=404, detail="Camera not found")
+    if request.end <= request.start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    if request.source not in EXPORT_SOURCES:
+        raise HTTPException(status_code=400, detail=f"source must be one of {', '.join(sorted(EXPORT_SOURCES))}")
+    
+    job = camera_manager.exports.submit(request.camera, request.start, request.end, request.source)
+    if job is None:
+        raise HTTPException(status_code=429, detail="Too many export jobs in progress")
+    return job.to_dict()
+
+@app.get("/api/exports")
+async def list_exports():
+    """내보내기 작업 목록 (최신순)"""
+    return camera_manager.exports.list_jobs()
+
+@app.get("/api/exports/{job_id}")
+async def get_export(job_id: str):
+    """내보내기 작업 상태 (progress 0~1, 완료 시 url)"""
+    job = camera_manager.exports.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    return job.to_dict()
+
+@app.delete("/api/exports/{job_id}")
+async def cancel_export(job_id: str):
+    """내보내기 작업 취소"""
+    if not camera_manager.exports.cancel(job_id):
+        raise HTTPException(status_code=404, detail="No active export job with this id")
+    return ApiResponse(success=True, message="Export cancelled")
+
+@app.get("/api/thumbnails/{file_type}/{path:path}")
+async def get_thumbnail(file_type: str, path: str, request: Request):
+    """썸네일 (캐시 없으면 작업자 풀에서 생성 후 반환, 내용 해시 ETag)"""
+    filepath = _resolve_file(file_type, path)
+    thumbnails = camera_manager.thumbnails
+    rel = filepath.relative_to(STATIC_DIR.resolve()).as_posix()
     
-    filepath = STATIC_DIR / file_type / filename
+    cached = thumbnails.get(rel)
+    if cached is None:
+        future = thumbnails.submit(rel)
+        if future is None or await asyncio.wrap_future(future) is None:
+            raise HTTPException(status_code=404, detail="Thumbnail not available")
+        cached = thumbnails.get(rel)
+        if cached is None:
+            raise HTTPException(status_code=404, detail="Thumbnail not available")
     
-    if not filepath.exists():
-        raise HTTPException(status_code=404, detail="File not found")
+    data, etag = cached
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=86400"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=data, media_type="image/jpeg", headers=headers)
+
+@app.get("/api/thumbnails")
+async def thumbnail_stats():
+    """썸네일 작업자 풀 통계"""
+    return camera_manager.thumbnails.get_stats()
+
+@app.delete("/api/files/{file_type}/{path:path}")
+async def delete_file(file_type: str, path: str):
+    filepath = _resolve_file(file_type, path)
     
     try:
         filepath.unlink()
+        camera_manager.catalog.remove_file(filepath)
+        camera_manager.thumbnails.remove(filepath.relative_to(STATIC_DIR.resolve()).as_posix())
         return ApiResponse(success=True, message="File deleted successfully")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to delete file: {str(e)}")
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+스트림 파이프라인 지표 - 프레임/바이트 카운터, 측정 fps, 히스토그램 (Prometheus 텍스트 및 JSON)
+
+핫 패스(리더 스레드, 이벤트 루프 배포)에서는 정수 덧셈과 bisect 한 번만 수행하고,
+fps 계산과 출력 형식 변환은 조회 시점에 한다.
+"""
+
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence
+
+# 프레임 크기 버킷 (바이트) - 640×480 MJPEG는 보통 20~80KB
+FRAME_SIZE_BUCKETS = (8_192, 16_384, 32_768, 65_536, 131_072, 262_144, 524_288)
+
+# 캡처→전송 지연 버킷 (초)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# 시청자 연결 → 첫 프레임 전송 버킷 (초) - 유지 중인 파이프라인은 수 ms, 캡처 시작부터면 수백 ms~수 초
+FIRST_FRAME_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# 파이프라인 단계별 지연 버킷 (초) - 단계 하나는 보통 1ms 미만~수십 ms
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# 프레임이 거치는 단계 (순서대로, 합 = 캡처 → 전송 완료)
+#   source: 캡처 → FIFO 리더 수신 (소스가 캡처 시각을 기록할 때만)
+#   dispatch: 리더 수신 → 이벤트 루프에서 시청자 큐에 넣음
+#   queue: 시청자 큐 대기
+#   send: 큐에서 꺼냄 → 전송 계층이 받아 감
+STAGES = ("source", "dispatch", "queue", "send")
+
+
+class Histogram:
+    """고정 버킷 누적 히스토그램 (Prometheus histogram 형식)"""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # 마지막 칸은 +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[int]:
+        total = 0
+        out = []
+        for n in self.counts:
+            total += n
+            out.append(total)
+        return out
+
+    def quantile(self, q: float) -> Optional[float]:
+        """버킷 상한 기준 근사 분위수"""
+        if not self.count:
+            return None
+        target = q * self.count
+        for bound, total in zip(self.buckets + (float("inf"),), self.cumulative()):
+            if total >= target:
+                return bound
+        return None
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "buckets": {str(bound): total for bound, total in zip(self.buckets + ("+Inf",), self.cumulative())},
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99)
+        }
+
+
+class RateMeter:
+    """이벤트 발생률 측정 (1초 이상 지난 구간마다 갱신)"""
+
+    __slots__ = ("rate", "_count", "_window_start", "_window_count", "window")
+
+    def __init__(self, window: float = 1.0):
+        self.window = window
+        self.rate = 0.0
+        self._count = 0
+        self._window_start = time.monotonic()
+        self._window_count = 0
+
+    def mark(self, now: float):
+        self._count += 1
+        elapsed = now - self._window_start
+        if elapsed >= self.window:
+            self.rate = (self._count - self._window_count) / elapsed
+            self._window_start = now
+            self._window_count = self._count
+
+    def current(self) -> float:
+        """현재 fps (프레임이 끊긴 경우 0으로 감쇠)"""
+        if time.monotonic() - self._window_start > 2 * self.window:
+            return 0.0
+        return self.rate
+
+
+class ClientMetrics:
+    """시청자 한 명의 전송 지표"""
+
+    __slots__ = ("delivered", "dropped", "skipped", "target_fps", "transport", "delivery", "bytes_out", "latency",
+                 "connected_at", "added_at", "warm")
+
+    def __init__(self, transport: str = "mjpeg", warm: bool = False, delivery: str = "queue"):
+        self.delivered = 0
+        self.dropped = 0
+        self.skipped = 0  # 목표 fps에 맞춰 솎아낸 프레임 (큐에 넣지 않음)
+        self.target_fps: Optional[float] = None
+        self.transport = transport  # "mjpeg" (multipart) 또는 "ws"
+        self.delivery = delivery  # "queue" (시청자별 큐) 또는 "latest" (공유 최신 프레임 슬롯)
+        self.bytes_out = 0
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.connected_at = time.time()
+        self.added_at = time.monotonic()  # 첫 프레임까지 시간 기준
+        self.warm = warm  # 연결 시 캡처 중인 파이프라인의 최신 프레임을 바로 받았는지
+
+
+class StreamMetrics:
+    """카메라 하나의 파이프라인 지표"""
+
+    def __init__(self, camera_num: int):
+        self.camera_num = camera_num
+        self.frames_in = 0
+        self.bytes_in = 0
+        self.fps = RateMeter()
+        self.frame_size = Histogram(FRAME_SIZE_BUCKETS)
+        self.clients: Dict[str, ClientMetrics] = {}
+
+        # 연결이 끊긴 시청자까지 포함한 누적값
+        self.delivered_total = 0
+        self.dropped_total = 0
+        self.bytes_out_total = 0
+        self.latency_total = Histogram(LATENCY_BUCKETS)
+
+        # 시청자 시작: warm = 실행 중인 파이프라인에 연결, cold = 캡처 시작(또는 첫 프레임)을 기다림
+        self.warm_starts = 0
+        self.cold_starts = 0
+        self.first_frame = {"warm": Histogram(FIRST_FRAME_BUCKETS), "cold": Histogram(FIRST_FRAME_BUCKETS)}
+
+        # 단계별 지연 (source는 리더 스레드, 나머지는 이벤트 루프에서만 기록)
+        self.stages = {stage: Histogram(STAGE_BUCKETS) for stage in STAGES}
+
+        # latest.jpg 요청 (200: 프레임 전송, 304: 변경 없음) - 응답하지 못한 요청은 세지 않음
+        self.stills = {"200": 0, "304": 0}
+
+    # 핫 패스 - 리더 스레드
+    def frame_captured(self, size: int, timestamp: float, captured: float):
+        self.frames_in += 1
+        self.bytes_in += size
+        self.frame_size.observe(size)
+        self.fps.mark(timestamp)
+        if captured < timestamp:
+            self.stages["source"].observe(timestamp - captured)
+
+    # 핫 패스 - 이벤트 루프
+    def frame_dropped(self, client: ClientMetrics):
+        client.dropped += 1
+        self.dropped_total += 1
+
+    def frames_conflated(self, client: ClientMetrics, count: int):
+        """latest 전달 시청자가 준비되기 전에 지나간 프레임 (누락으로 집계)"""
+        client.dropped += count
+        self.dropped_total += count
+
+    def frame_dispatched(self, delay: float):
+        self.stages["dispatch"].observe(delay)
+
+    def frame_dequeued(self, client: ClientMetrics, frame_dispatched: float, now: float):
+        """시청자 큐 대기 시간 (연결 직후 받은 최신 프레임은 연결 시각부터)"""
+        self.stages["queue"].observe(now - max(frame_dispatched, client.added_at))
+
+    def frame_sent(self, client: ClientMetrics, size: int, latency: float, send: Optional[float] = None):
+        if not client.delivered:
+            self.first_frame["warm" if client.warm else "cold"].observe(time.monotonic() - client.added_at)
+        client.delivered += 1
+        client.bytes_out += size
+        client.latency.observe(latency)
+        self.delivered_total += 1
+        self.bytes_out_total += size
+        self.latency_total.observe(latency)
+        if send is not None:
+            self.stages["send"].observe(send)
+
+    def still_served(self, not_modified: bool = False):
+        self.stills["304" if not_modified else "200"] += 1
+
+    def add_client(self, client_id: str, transport: str = "mjpeg", warm: bool = False,
+                   delivery: str = "queue") -> ClientMetrics:
+        self.clients[client_id] = ClientMetrics(transport, warm, delivery)
+        if warm:
+            self.warm_starts += 1
+        else:
+            self.cold_starts += 1
+        return self.clients[client_id]
+
+    def remove_client(self, client_id: str):
+        self.clients.pop(client_id, None)
+
+    def to_dict(self, queue_depths: Dict[str, int]) -> dict:
+        return {
+            "camera": self.camera_num,
+            "fps": round(self.fps.current(), 2),
+            "frames_in": self.frames_in,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out_total,
+            "frames_delivered": self.delivered_total,
+            "frames_dropped": self.dropped_total,
+            "frame_size_bytes": self.frame_size.to_dict(),
+            "latency_seconds": self.latency_total.to_dict(),
+            "starts": {"warm": self.warm_starts, "cold": self.cold_starts},
+            "time_to_first_frame_seconds": {kind: hist.to_dict() for kind, hist in self.first_frame.items()},
+            "stage_latency_seconds": {stage: hist.to_dict() for stage, hist in self.stages.items()},
+            "latest_jpeg_requests": dict(self.stills),
+            "clients": {
+                client_id[:8]: {
+                    "delivered": client.delivered,
+                    "dropped": client.dropped,
+                    "skipped": client.skipped,
+                    "target_fps": client.target_fps,
+                    "transport": client.transport,
+                    "delivery": client.delivery,
+                    "bytes_out": client.bytes_out,
+                    "queue_depth": queue_depths.get(client_id, 0),
+                    "latency_seconds": client.latency.to_dict()
+                }
+                for client_id, client in list(self.clients.items())
+            }
+        }
+
+
+def _histogram_lines(name: str, labels: str, hist: Histogram) -> List[str]:
+    lines = []
+    for bound, total in zip(hist.buckets + ("+Inf",), hist.cumulative()):
+        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {total}')
+    lines.append(f"{name}_sum{{{labels}}} {hist.sum:.6f}")
+    lines.append(f"{name}_count{{{labels}}} {hist.count}")
+    return lines
+
+
+def render_prometheus(streams: Dict[int, "StreamMetrics"], queue_depths: Dict[int, Dict[str, int]]) -> str:
+    """Prometheus 텍스트 노출 형식 (version 0.0.4)"""
+    lines = [
+        "# HELP fabcam_stream_fps Measured capture frame rate",
+        "# TYPE fabcam_stream_fps gauge",
+    ]
+    for cam, m in streams.items():
+        lines.append(f'fabcam_stream_fps{{camera="{cam}"}} {m.fps.current():.2f}')
+
+    counters = [
+        ("fabcam_frames_in_total", "Frames read from the camera", lambda m: m.frames_in),
+        ("fabcam_bytes_in_total", "JPEG bytes read from the camera", lambda m: m.bytes_in),
+        ("fabcam_bytes_out_total", "JPEG bytes sent to viewers", lambda m: m.bytes_out_total),
+        ("fabcam_frames_delivered_total", "Frames sent to viewers", lambda m: m.delivered_total),
+        ("fabcam_frames_dropped_total", "Frames dropped because a viewer queue was full", lambda m: m.dropped_total),
+    ]
+    for name, help_text, value in counters:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for cam, m in streams.items():
+            lines.append(f'{name}{{camera="{cam}"}} {value(m)}')
+
+    lines.append("# HELP fabcam_viewers Connected viewers")
+    lines.append("# TYPE fabcam_viewers gauge")
+    for cam, m in streams.items():
+        lines.append(f'fabcam_viewers{{camera="{cam}"}} {len(m.clients)}')
+
+    lines.append("# HELP fabcam_frame_size_bytes JPEG frame size")
+    lines.append("# TYPE fabcam_frame_size_bytes histogram")
+    for cam, m in streams.items():
+        lines += _histogram_lines("fabcam_frame_size_bytes", f'camera="{cam}"', m.frame_size)
+
+    lines.append("# HELP fabcam_send_latency_seconds Capture to send latency")
+    lines.append("# TYPE fabcam_send_latency_seconds histogram")
+    for cam, m in streams.items():
+        lines += _histogram_lines("fabcam_send_latency_seconds", f'camera="{cam}"', m.latency_total)
+
+    lines.append("# HELP fabcam_viewer_starts_total Viewers that joined a running pipeline (warm) or waited for capture (cold)")
+    lines.append("# TYPE fabcam_viewer_starts_total counter")
+    for cam, m in streams.items():
+        lines.append(f'fabcam_viewer_starts_total{{camera="{cam}",kind="warm"}} {m.warm_starts}')
+        lines.append(f'fabcam_viewer_starts_total{{camera="{cam}",kind="cold"}} {m.cold_starts}')
+
+    lines.append("# HELP fabcam_time_to_first_frame_seconds Viewer connect to first frame sent")
+    lines.append("# TYPE fabcam_time_to_first_frame_seconds histogram")
+    for cam, m in streams.items():
+        for kind, hist in m.first_frame.items():
+            lines += _histogram_lines("fabcam_time_to_first_frame_seconds", f'camera="{cam}",kind="{kind}"', hist)
+
+    lines.append("# HELP fabcam_stage_latency_seconds Per-stage frame latency (source, dispatch, queue, send)")
+    lines.append("# TYPE fabcam_stage_latency_seconds histogram")
+    for cam, m in streams.items():
+        for stage, hist in m.stages.items():
+            lines += _histogram_lines("fabcam_stage_latency_seconds", f'camera="{cam}",stage="{stage}"', hist)
+
+    lines.append("# HELP fabcam_latest_jpeg_requests_total latest.jpg responses (200 frame, 304 not modified)")
+    lines.append("# TYPE fabcam_latest_jpeg_requests_total counter")
+    for cam, m in streams.items():
+        for status, count in m.stills.items():
+            lines.append(f'fabcam_latest_jpeg_requests_total{{camera="{cam}",status="{status}"}} {count}')
+
+    # 시청자별 지표
+    per_client = [
+        ("fabcam_client_frames_delivered_total", "counter", lambda c, d: c.delivered),
+        ("fabcam_client_frames_dropped_total", "counter", lambda c, d: c.dropped),
+        ("fabcam_client_frames_skipped_total", "counter", lambda c, d: c.skipped),
+        ("fabcam_client_queue_depth", "gauge", lambda c, d: d),
+    ]
+    for name, kind, value in per_client:
+        lines.append(f"# TYPE {name} {kind}")
+        for cam, m in streams.items():
+            depths = queue_depths.get(cam, {})
+            for client_id, client in list(m.clients.items()):
+                lines.append(f'{name}{{camera="{cam}",client="{client_id[:8]}"}} {value(client, depths.get(client_id, 0))}')
+
+    lines.append("# HELP fabcam_client_send_latency_seconds Capture to send latency per viewer")
+    lines.append("# TYPE fabcam_client_send_latency_seconds histogram")
+    for cam, m in streams.items():
+        for client_id, client in list(m.clients.items()):
+            lines += _histogram_lines("fabcam_client_send_latency_seconds", f'camera="{cam}",client="{client_id[:8]}"', client.latency)
+
+    return "\n".join(lines) + "\n"
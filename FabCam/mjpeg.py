@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+MJPEG 바이트 스트림 프레임 추출기 - 재사용 버퍼 기반 (프레임당 1회 복사)
+"""
+
+import os
+import struct
+import time
+from typing import Iterator, Optional
+
+SOI = b"\xff\xd8"
+EOI = b"\xff\xd9"
+
+# multipart 파트 구분자: 앞 파트의 CRLF를 헤더에 합쳐 프레임당 2회 전송
+# (첫 파트 앞의 CRLF는 빈 preamble로 처리됨)
+# 파트마다 프레임 번호와 캡처/서버 수신 시각(epoch 밀리초)을 함께 보냄
+PART_HEADER_TEMPLATE = (
+    b"\r\n--frame\r\nContent-Type: image/jpeg\r\nContent-Length: %d\r\n"
+    b"X-Frame-Seq: %d\r\nX-Capture-Time: %.3f\r\nX-Arrival-Time: %.3f\r\n\r\n"
+)
+
+# WebSocket 바이너리 메시지 헤더 (빅엔디언, 14바이트) + JPEG
+#   카메라 번호 u8, 예약 u8, 시퀀스 u32, 캡처 시각 f64 (epoch 밀리초)
+WS_HEADER = struct.Struct("!BBId")
+
+
+def epoch_ms(timestamp: float) -> float:
+    """time.monotonic() 시각을 epoch 밀리초로 변환"""
+    return (time.time() - (time.monotonic() - timestamp)) * 1000
+
+
+class MJPEGFrame:
+    """완성된 JPEG 프레임 (불변, 모든 클라이언트가 공유)"""
+
+    __slots__ = ("data", "timestamp", "seq", "captured", "dispatched", "_part_header", "_ws_header")
+
+    def __init__(self, data: bytes, timestamp: Optional[float] = None):
+        self.data = data
+        self.timestamp = timestamp if timestamp is not None else time.monotonic()  # 수신 시각
+        self.seq = 0  # 카메라별 프레임 번호 (SharedStreamManager가 부여)
+        self.captured = self.timestamp  # 캡처 시각 (소스가 기록하지 않으면 수신 시각)
+        self.dispatched = self.timestamp  # 시청자 큐에 넣은 시각
+        self._part_header: Optional[bytes] = None
+        self._ws_header: Optional[bytes] = None
+
+    @property
+    def part_header(self) -> bytes:
+        """multipart 파트 헤더 (프레임당 한 번만 생성)"""
+        if self._part_header is None:
+            self._part_header = PART_HEADER_TEMPLATE % (
+                len(self.data), self.seq, epoch_ms(self.captured), epoch_ms(self.timestamp)
+            )
+        return self._part_header
+
+    def ws_header(self, camera_num: int) -> bytes:
+        """WebSocket 메시지 헤더 (프레임당 한 번만 생성, 캡처 시각은 벽시계로 변환)"""
+        if self._ws_header is None:
+            self._ws_header = WS_HEADER.pack(camera_num, 0, self.seq & 0xFFFFFFFF, epoch_ms(self.captured))
+        return self._ws_header
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+
+class MJPEGFrameParser:
+    """SOI/EOI 스캔 위치를 유지하는 증분 MJPEG 파서
+
+    큰 청크를 재사용 bytearray에 직접 읽어 들이고(os.readv), 이미 스캔한
+    구간은 다시 검색하지 않는다. 버퍼 앞쪽 정리는 남은 부분 프레임만 옮긴다.
+    """
+
+    def __init__(self, chunk_size: int = 64 * 1024, max_frame_size: int = 4 * 1024 * 1024):
+        self.chunk_size = chunk_size
+        self.max_frame_size = max_frame_size
+        self._buffer = bytearray(chunk_size * 4)
+        self._head = 0          # 아직 소비되지 않은 데이터 시작
+        self._tail = 0          # 유효 데이터 끝
+        self._frame_start = -1  # 진행 중인 프레임의 SOI 위치
+        self._scan_pos = 0      # 다음 검색 시작 위치
+
+        # 통계 (벤치마크/모니터링용)
+        self.frames = 0
+        self.bytes_read = 0
+        self.bytes_copied = 0
+        self.frames_dropped = 0
+
+    def reset(self):
+        """버퍼 상태 초기화 (통계는 유지)"""
+        self._head = self._tail = self._scan_pos = 0
+        self._frame_start = -1
+
+    def _reserve(self):
+        """읽기 공간 확보 (부분 프레임만 앞으로 이동, 필요 시 버퍼 확장)"""
+        buffer = self._buffer
+        if len(buffer) - self._tail >= self.chunk_size:
+            return
+
+        pending = self._tail - self._head
+        if pending > self.max_frame_size:
+            # 비정상적으로 큰 프레임 - 버리고 재동기화
+            self.frames_dropped += 1
+            self.reset()
+            return
+
+        if pending + self.chunk_size > len(buffer):
+            new_buffer = bytearray(max(len(buffer) * 2, pending + self.chunk_size))
+            new_buffer[:pending] = buffer[self._head:self._tail]
+            self._buffer = new_buffer
+        elif pending:
+            buffer[:pending] = buffer[self._head:self._tail]
+        self.bytes_copied += pending
+
+        offset = self._head
+        self._head = 0
+        self._tail = pending
+        self._scan_pos -= offset
+        if self._frame_start >= 0:
+            self._frame_start -= offset
+
+    def read_from(self, fd: int) -> int:
+        """파일 디스크립터에서 버퍼로 직접 읽기 (0 = EOF, BlockingIOError 전파)"""
+        self._reserve()
+        with memoryview(self._buffer) as view:
+            n = os.readv(fd, [view[self._tail:]])
+        self._tail += n
+        self.bytes_read += n
+        return n
+
+    def feed(self, data: bytes):
+        """외부 데이터 추가 (리플레이/테스트용)"""
+        with memoryview(data) as src:
+            pos = 0
+            while pos < len(src):
+                self._reserve()
+                n = min(len(self._buffer) - self._tail, len(src) - pos)
+                self._buffer[self._tail:self._tail + n] = src[pos:pos + n]
+                self._tail += n
+                pos += n
+        self.bytes_read += len(data)
+
+    def frames_available(self) -> Iterator[MJPEGFrame]:
+        """버퍼에서 완성된 프레임을 순서대로 반환"""
+        while True:
+            buffer = self._buffer
+            if self._frame_start < 0:
+                start_idx = buffer.find(SOI, self._scan_pos, self._tail)
+                if start_idx == -1:
+                    # 마지막 바이트는 마커의 0xFF일 수 있으므로 남겨 둠
+                    self._head = max(self._head, self._tail - 1)
+                    self._scan_pos = self._head
+                    return
+                self._frame_start = self._head = start_idx
+                self._scan_pos = start_idx + 2
+
+            end_idx = buffer.find(EOI, self._scan_pos, self._tail)
+            if end_idx == -1:
+                self._scan_pos = max(self._frame_start + 2, self._tail - 1)
+                return
+
+            # 완전한 프레임 추출 (프레임당 유일한 복사)
+            frame_end = end_idx + 2
+            with memoryview(buffer) as view:
+                frame_data = bytes(view[self._frame_start:frame_end])
+            self.bytes_copied += len(frame_data)
+            self.frames += 1
+
+            self._head = self._scan_pos = frame_end
+            self._frame_start = -1
+            yield MJPEGFrame(frame_data)
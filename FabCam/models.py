@@ -3,10 +3,38 @@ from typing import List, Optional
 from datetime import datetime
 
 class FileInfo(BaseModel):
-    filename: str
+    filename: str  # 종류별 폴더 기준 경로 (예: 640x480/camera0_..., camera0/rec_0_...)
     size: int
     created_at: str
-    file_type: str  # 'video' or 'image'
+    file_type: str  # 'video', 'image' or 'rec' (블랙박스 세그먼트)
+    camera: Optional[int] = None
+    url: Optional[str] = None  # 다운로드/삭제 경로
+    thumbnail_url: Optional[str] = None
+
+class FileListPage(BaseModel):
+    items: List[FileInfo]
+    next_cursor: Optional[str] = None  # 다음 페이지 요청 시 cursor로 전달 (없으면 마지막 페이지)
+
+class ExportRequest(BaseModel):
+    camera: int
+    start: datetime
+    end: datetime
+    source: str = "rec"  # 'rec' (블랙박스 세그먼트), 'manual' (수동 녹화) or 'event' (움직임 이벤트 녹화)
+
+class MotionEventInfo(BaseModel):
+    id: int
+    camera: int
+    started_at: str
+    ended_at: Optional[str] = None  # 진행 중이면 None
+    duration: Optional[float] = None
+    peak_score: float  # 변한 픽셀 비율 최댓값 (0~1)
+    motion_samples: int
+    url: Optional[str] = None  # 이벤트 녹화 파일 (녹화하지 않았거나 보존 정책으로 삭제되면 None)
+    thumbnail_url: Optional[str] = None
+
+class MotionEventPage(BaseModel):
+    items: List[MotionEventInfo]
+    next_cursor: Optional[str] = None
 
 class RecordingStatus(BaseModel):
     is_recording: bool
@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+움직임 감지 - 공유 스트림 JPEG 프레임을 몇 fps로 솎아 축소 디코딩 후 배경 차분
+
+  - 솎아내기: 리더 스레드에서는 프레임 시각만 비교하고 최신 프레임 참조를 넘김 (복사 없음)
+  - 디코딩: JPEG DCT 축소(IMREAD_REDUCED_GRAYSCALE_4)로 640×480 → 160×120 흑백만 복원
+  - 차분: NumPy로 지수 이동 평균 배경과 비교해 변한 픽셀 비율(점수) 계산
+  - 이벤트: trigger_samples회 연속 움직임이면 시작, 마지막 움직임 후 post_roll초가 지나면 종료
+
+이벤트는 SQLite 로그(data/events.db)에 기록되고, 시작/종료 콜백으로 녹화를 제어한다.
+"""
+
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Optional
+
+try:
+    import cv2
+    import numpy as np
+except ImportError:  # opencv-python 미설치 시 움직임 감지 비활성화
+    cv2 = None
+
+from catalog import decode_cursor, encode_cursor
+
+SAMPLE_TOLERANCE = 0.5 / 30  # 원본 프레임 간격(30 fps)의 절반 - 간격이 조금 짧게 도착해도 샘플로 인정
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS motion_events (
+    id INTEGER PRIMARY KEY,
+    camera INTEGER NOT NULL,
+    started_at REAL NOT NULL,
+    ended_at REAL,
+    peak_score REAL NOT NULL DEFAULT 0,
+    motion_samples INTEGER NOT NULL DEFAULT 0,
+    path TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_events_started ON motion_events (started_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_events_camera_started ON motion_events (camera, started_at DESC, id DESC);
+"""
+
+
+def wall_time(timestamp: float) -> float:
+    """time.monotonic() 시각 → epoch 초"""
+    return time.time() - (time.monotonic() - timestamp)
+
+
+class MotionDetector:
+    """축소 흑백 디코딩 + 배경 차분 움직임 점수
+
+    배경은 지수 이동 평균(alpha)으로 천천히 따라가 서서히 바뀌는 조명에 적응하고,
+    화면 대부분이 한꺼번에 바뀌면(조명 on/off, 노출 변경) 움직임 대신 배경을 새로 잡는다.
+    """
+
+    def __init__(self, scale: int = 4, threshold: float = 25.0, min_area: float = 0.005,
+                 max_area: float = 0.8, alpha: float = 0.05):
+        self.scale = scale
+        self.threshold = threshold  # 픽셀 밝기 차이 (0~255)
+        self.min_area = min_area    # 움직임으로 볼 변한 픽셀 비율
+        self.max_area = max_area    # 이 이상은 조명 변화로 간주
+        self.alpha = alpha
+        self.enabled = cv2 is not None
+        self.lighting_resets = 0
+        self._flag = self._reduced_flag(scale) if self.enabled else None
+        self._background = None
+
+    @staticmethod
+    def _reduced_flag(scale: int) -> int:
+        """DCT 축소 배율에 맞는 흑백 디코딩 플래그"""
+        return {
+            1: cv2.IMREAD_GRAYSCALE,
+            2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+            4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+            8: cv2.IMREAD_REDUCED_GRAYSCALE_8,
+        }[scale]
+
+    def analyze(self, jpeg: bytes) -> Optional[float]:
+        """변한 픽셀 비율 (0~1, 디코딩 실패 시 None)"""
+        image = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), self._flag)
+        if image is None:
+            return None
+        frame = image.astype(np.float32)
+        if self._background is None or self._background.shape != frame.shape:
+            self._background = frame
+            return 0.0
+
+        delta = frame - self._background
+        score = np.count_nonzero(np.abs(delta) > self.threshold) / delta.size
+        if score >= self.max_area:
+            self._background = frame
+            self.lighting_resets += 1
+            return 0.0
+        delta *= self.alpha
+        self._background += delta
+        return score
+
+    def is_motion(self, score: float) -> bool:
+        return score >= self.min_area
+
+    def reset(self):
+        self._background = None
+
+
+class MotionEvent:
+    """진행 중이거나 끝난 움직임 이벤트"""
+
+    def __init__(self, camera: int, started: float):
+        self.id: Optional[int] = None
+        self.camera = camera
+        self.started = started  # time.monotonic() 기준
+        self.started_at = wall_time(started)
+        self.ended_at: Optional[float] = None
+        self.peak_score = 0.0
+        self.motion_samples = 0
+        self.path: Optional[str] = None  # 녹화 파일 (static 기준 상대 경로)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "camera": self.camera,
+            "started_at": datetime.fromtimestamp(self.started_at).isoformat(),
+            "ended_at": datetime.fromtimestamp(self.ended_at).isoformat() if self.ended_at else None,
+            "peak_score": round(self.peak_score, 4),
+            "motion_samples": self.motion_samples,
+            "path": self.path
+        }
+
+
+class MotionMonitor:
+    """카메라 하나의 움직임 감시기 (리더 스레드에서 feed, 분석은 전용 스레드)
+
+    on_start(event, frame) / on_end(event)는 감시 스레드에서 호출된다 (frame: 움직임이 감지된 JPEG 프레임).
+    """
+
+    def __init__(self, camera_num: int, detector: MotionDetector, fps: float = 5.0,
+                 trigger_samples: int = 2, post_roll: float = 10.0, max_event_seconds: float = 600.0,
+                 on_start: Optional[Callable[[MotionEvent, object], None]] = None,
+                 on_end: Optional[Callable[[MotionEvent], None]] = None):
+        self.camera_num = camera_num
+        self.detector = detector
+        self.fps = fps
+        self.interval = 1.0 / fps
+        self.trigger_samples = trigger_samples
+        self.post_roll = post_roll
+        self.max_event_seconds = max_event_seconds
+        self.on_start = on_start
+        self.on_end = on_end
+
+        self.event: Optional[MotionEvent] = None
+        self._streak = 0
+        self._last_motion = 0.0
+        self._next_sample: Optional[float] = None
+        self._pending = None  # 분석 대기 중인 최신 프레임 (1개 슬롯)
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+        # 통계
+        self.frames_seen = 0
+        self.samples = 0
+        self.samples_dropped = 0  # 분석이 밀려 건너뛴 샘플
+        self.events_total = 0
+        self.last_score = 0.0
+        self.cpu_seconds = 0.0
+        self._started_wall: Optional[float] = None
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._started_wall = time.monotonic()
+        self._thread = threading.Thread(target=self._worker, daemon=True)
+        self._thread.start()
+        print(f"👁️ 움직임 감지 시작 (카메라 {self.camera_num}, {self.fps} fps, 후행 {self.post_roll}초)")
+
+    def stop(self):
+        """감시 중지 (진행 중인 이벤트는 종료 처리)"""
+        if not self._running:
+            return
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self._thread = None
+        if self.event is not None:
+            self._finish(time.monotonic())
+        self.detector.reset()
+        print(f"👁️ 움직임 감지 중지 (카메라 {self.camera_num})")
+
+    def accept(self, timestamp: float) -> bool:
+        """분석할 프레임인지 (목표 fps 간격, 멈췄다 다시 오면 현재 프레임부터)"""
+        self.frames_seen += 1
+        if self._next_sample is not None and timestamp + SAMPLE_TOLERANCE < self._next_sample:
+            return False
+        if self._next_sample is None or timestamp > self._next_sample + self.interval:
+            self._next_sample = timestamp + self.interval
+        else:
+            self._next_sample += self.interval
+        return True
+
+    def feed(self, frame):
+        """프레임 관찰자 콜백 (리더 스레드, 즉시 반환)"""
+        if not self.accept(frame.timestamp):
+            return
+        with self._cond:
+            if self._pending is not None:
+                self.samples_dropped += 1
+            self._pending = frame
+            self._cond.notify()
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                if self._running and self._pending is None:
+                    # 프레임이 끊겨도 후행 시간이 지나면 이벤트를 끝낼 수 있도록 주기적으로 깨어남
+                    self._cond.wait(timeout=max(self.interval * 2, 0.5))
+                if not self._running:
+                    return
+                frame, self._pending = self._pending, None
+
+            started = time.thread_time()
+            try:
+                if frame is not None:
+                    self.process(frame)
+                else:
+                    self.tick(time.monotonic())
+            except Exception as e:
+                print(f"움직임 감지 오류 (카메라 {self.camera_num}): {e}")
+            self.cpu_seconds += time.thread_time() - started
+
+    def process(self, frame) -> Optional[float]:
+        """프레임 하나 분석 후 이벤트 상태 갱신 (점수 반환)"""
+        score = self.detector.analyze(frame.data)
+        if score is None:
+            return None
+        now = frame.timestamp
+        self.samples += 1
+        self.last_score = score
+
+        if self.detector.is_motion(score):
+            self._streak += 1
+            self._last_motion = now
+        else:
+            self._streak = 0
+
+        if self.event is None:
+            if self._streak >= self.trigger_samples:
+                # 연속 샘플 중 첫 움직임 시각부터 이벤트로 기록
+                self._begin(now - (self.trigger_samples - 1) * self.interval, frame)
+        if self.event is not None:
+            if self._streak:
+                self.event.motion_samples += 1
+                self.event.peak_score = max(self.event.peak_score, score)
+            self.tick(now)
+        return score
+
+    def tick(self, now: float):
+        """후행 시간/최대 길이 경과 시 이벤트 종료"""
+        if self.event is None:
+            return
+        if now - self._last_motion >= self.post_roll or now - self.event.started >= self.max_event_seconds:
+            self._finish(now)
+
+    def _begin(self, started: float, frame):
+        self.event = MotionEvent(self.camera_num, started)
+        self.event.motion_samples = self.trigger_samples - 1  # 현재 샘플은 process()에서 더함
+        self.events_total += 1
+        print(f"🏃 움직임 감지 (카메라 {self.camera_num}, 점수 {self.last_score:.3f})")
+        if self.on_start:
+            try:
+                self.on_start(self.event, frame)
+            except Exception as e:
+                print(f"움직임 이벤트 시작 처리 오류 (카메라 {self.camera_num}): {e}")
+
+    def _finish(self, now: float):
+        event, self.event = self.event, None
+        self._streak = 0
+        event.ended_at = wall_time(now)
+        print(f"🏁 움직임 이벤트 종료 (카메라 {self.camera_num}, {event.ended_at - event.started_at:.1f}초)")
+        if self.on_end:
+            try:
+                self.on_end(event)
+            except Exception as e:
+                print(f"움직임 이벤트 종료 처리 오류 (카메라 {self.camera_num}): {e}")
+
+    def get_stats(self) -> dict:
+        elapsed = time.monotonic() - self._started_wall if self._started_wall else 0.0
+        return {
+            "running": self._running,
+            "fps": self.fps,
+            "post_roll": self.post_roll,
+            "frames_seen": self.frames_seen,
+            "samples": self.samples,
+            "samples_dropped": self.samples_dropped,
+            "last_score": round(self.last_score, 4),
+            "lighting_resets": self.detector.lighting_resets,
+            "events_total": self.events_total,
+            "active_event": self.event.to_dict() if self.event else None,
+            # 분석 스레드가 쓴 CPU (코어 하나 대비 %)
+            "cpu_percent": round(self.cpu_seconds / elapsed * 100, 2) if elapsed > 0 else 0.0,
+            "analyze_ms": round(self.cpu_seconds / self.samples * 1000, 3) if self.samples else None
+        }
+
+
+class MotionEventLog:
+    """움직임 이벤트 기록 (SQLite, 스레드 안전)"""
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        # 비정상 종료로 끝나지 않은 이벤트 정리
+        self._conn.execute("UPDATE motion_events SET ended_at = started_at WHERE ended_at IS NULL")
+
+    def begin(self, event: MotionEvent) -> int:
+        """이벤트 시작 기록 (id 반환)"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO motion_events (camera, started_at, path) VALUES (?, ?, ?)",
+                (event.camera, event.started_at, event.path)
+            )
+            return cursor.lastrowid
+
+    def finish(self, event: MotionEvent):
+        """이벤트 종료 기록"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE motion_events SET ended_at = ?, peak_score = ?, motion_samples = ?, path = ? WHERE id = ?",
+                (event.ended_at, event.peak_score, event.motion_samples, event.path, event.id)
+            )
+
+    def query(self, camera: Optional[int] = None, since: Optional[float] = None,
+              until: Optional[float] = None, cursor: Optional[str] = None, limit: int = 50) -> dict:
+        """최신순 페이지 조회 (since/until: 이벤트 시작 시각, cursor: 이전 페이지의 next_cursor)"""
+        where = []
+        params: list = []
+        if camera is not None:
+            where.append("camera = ?")
+            params.append(camera)
+        if since is not None:
+            where.append("started_at >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("started_at < ?")
+            params.append(until)
+        if cursor:
+            started_at, row_id = decode_cursor(cursor)
+            where.append("(started_at, id) < (?, ?)")
+            params += [started_at, row_id]
+
+        sql = "SELECT id, camera, started_at, ended_at, peak_score, motion_samples, path FROM motion_events"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY started_at DESC, id DESC LIMIT ?"
+        params.append(limit + 1)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1][2], rows[-1][0])
+
+        return {
+            "items": [
+                {
+                    "id": row_id,
+                    "camera": camera_num,
+                    "started_at": datetime.fromtimestamp(started_at).isoformat(),
+                    "ended_at": datetime.fromtimestamp(ended_at).isoformat() if ended_at else None,
+                    "duration": round(ended_at - started_at, 1) if ended_at else None,
+                    "peak_score": round(peak_score, 4),
+                    "motion_samples": motion_samples,
+                    "path": path
+                }
+                for row_id, camera_num, started_at, ended_at, peak_score, motion_samples, path in rows
+            ],
+            "next_cursor": next_cursor
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
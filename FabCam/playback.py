@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+블랙박스 구간 재생 - 시간 범위에 걸친 세그먼트를 이어 붙여 하나의 H.264 스트림으로 전송
+
+세그먼트는 모두 SPS/PPS + IDR로 시작하는 Annex-B H.264이므로 바이트를 그대로 이어 붙이면
+재인코딩 없이 연속 재생된다. 세그먼트 목록은 카탈로그에서 작은 묶음 단위로 가져오므로
+구간 안의 세그먼트 수와 관계없이 첫 바이트까지의 시간이 일정하다.
+"""
+
+import asyncio
+import os
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator, Iterator, Optional
+
+from catalog import FileCatalog
+
+CHUNK_SIZE = 512 * 1024
+BATCH_SIZE = 16
+
+# 파일명의 시작 시각: rec_N_YYYYMMDD_HHMMSS.mp4, manual_YYYYMMDD_HHMMSS_camN.mp4
+START_PATTERN = re.compile(r"(\d{8}_\d{6})")
+
+
+def segment_start(path: str) -> Optional[float]:
+    """녹화 파일명의 첫 프레임 시각 (초 단위)"""
+    match = START_PATTERN.search(Path(path).name)
+    if not match:
+        return None
+    return datetime.strptime(match.group(1), "%Y%m%d_%H%M%S").timestamp()
+
+
+def find_segments(catalog: FileCatalog, camera: int, since: float, until: float,
+                  file_type: str = "rec", prefix: str = "rec_") -> Iterator[dict]:
+    """[since, until)과 겹치는 녹화 파일을 시간 순으로 (카탈로그에서 BATCH_SIZE개씩 조회)
+
+    카탈로그 시각은 파일이 닫힌 시각(녹화 끝)이므로 끝 >= since부터 읽고,
+    파일명의 시작 시각이 until 이후인 파일이 나오면 멈춘다.
+    file_type/prefix: 블랙박스 세그먼트("rec", "rec_") 또는 수동 녹화("video", "manual_")
+    """
+    after = (since, 0)
+    while True:
+        batch = catalog.oldest([file_type], limit=BATCH_SIZE, after=after, camera=camera)
+        if not batch:
+            return
+        for item in batch:
+            after = (item["created_at"], item["id"])
+            if not Path(item["path"]).name.startswith(prefix):
+                continue
+            start = segment_start(item["path"])
+            if start is not None and start >= until:
+                return
+            item["start"] = start
+            yield item
+
+
+async def stream_segments(static_dir: Path, segments: Iterator[dict]) -> AsyncIterator[bytes]:
+    """세그먼트 파일 내용을 순서대로 전송 (파일 읽기는 스레드에서)"""
+    # 카탈로그 조회도 파일 읽기와 같이 이벤트 루프 밖에서
+    item = await asyncio.to_thread(next, segments, None)
+    while item is not None:
+        try:
+            fd = os.open(static_dir / item["path"], os.O_RDONLY)
+        except OSError:
+            fd = None  # 보존 정책으로 막 삭제된 세그먼트는 건너뜀
+        if fd is not None:
+            try:
+                offset = 0
+                while True:
+                    chunk = await asyncio.to_thread(os.pread, fd, CHUNK_SIZE, offset)
+                    if not chunk:
+                        break
+                    offset += len(chunk)
+                    yield chunk
+            finally:
+                os.close(fd)
+        item = await asyncio.to_thread(next, segments, None)
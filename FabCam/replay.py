@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+재생 카메라 - rpicam-vid / rpicam-still 대신 실행되는 하드웨어 없는 프레임 소스 (ReplayBackend)
+
+  - synthetic: 움직이는 막대와 카메라 번호가 있는 합성 화면 (opencv-python 필요)
+               첫 한 바퀴(2초)만 인코딩하고 이후에는 캐시한 JPEG를 반복하므로 재생 자체의 CPU는 작다
+  - MJPEG 파일: rpicam-vid --codec mjpeg 녹화를 프레임 단위로 나눠 끝나면 처음부터 반복
+
+프레임은 --framerate 간격(단조 시계 기준, 밀려도 몰아 보내지 않음)으로 --output(FIFO 경로 또는 "-")에 쓴다.
+각 프레임에는 순번과 출력 시각을 담은 JPEG 주석(COM) 세그먼트를 넣으므로, 시청자가 받은 프레임만으로
+캡처 → 수신 지연과 건너뛴 프레임을 잴 수 있다 (read_stamp, benchmarks/bench_load.py).
+--still이면 한 장만 --output에 저장하고 종료한다.
+
+사용법:
+    python replay.py --source synthetic --output /tmp/fifo [--camera 0] [--width 640] [--height 480] [--framerate 30]
+    python replay.py --source clip.mjpeg --output snap.jpg --still
+"""
+
+import argparse
+import os
+import re
+import struct
+import sys
+import time
+from typing import Iterator, Optional, Tuple
+
+from mjpeg import MJPEGFrameParser
+
+try:
+    import cv2
+    import numpy as np
+except ImportError:  # opencv-python 미설치 시 합성 소스/스냅샷 크기 조정 불가
+    cv2 = None
+
+SYNTHETIC_LOOP_SECONDS = 2
+STAMP_PATTERN = re.compile(rb"fabcam seq=(\d+) ts=([\d.]+)")
+
+
+def stamp(data: bytes, seq: int, timestamp: float) -> bytes:
+    """SOI 바로 뒤에 주석 세그먼트 삽입 (디코더는 무시)"""
+    payload = b"fabcam seq=%d ts=%.6f" % (seq, timestamp)
+    return data[:2] + b"\xff\xfe" + struct.pack(">H", len(payload) + 2) + payload + data[2:]
+
+
+def read_stamp(data: bytes) -> Optional[Tuple[int, float]]:
+    """stamp()가 넣은 (순번, epoch 초) - 없으면 None"""
+    match = STAMP_PATTERN.match(data, 6)
+    return (int(match.group(1)), float(match.group(2))) if match else None
+
+
+def synthetic_frame(camera: int, index: int, count: int, width: int, height: int) -> bytes:
+    """count 프레임 주기로 가로지르는 막대 (카메라마다 색이 다름)"""
+    image = np.full((height, width, 3), 40, np.uint8)
+    color = (60, 200, 60) if camera == 0 else (200, 120, 60)
+    bar = max(width // 10, 8)
+    x = index * (width + bar) // count - bar
+    cv2.rectangle(image, (x, height // 4), (x + bar, height * 3 // 4), color, -1)
+    cv2.putText(image, f"CAM {camera}", (16, 40), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (220, 220, 220), 2)
+    ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 85])
+    return encoded.tobytes()
+
+
+def synthetic_frames(camera: int, width: int, height: int, framerate: float) -> Iterator[bytes]:
+    count = max(int(framerate * SYNTHETIC_LOOP_SECONDS), 1)
+    cache = []
+    for index in range(count):
+        cache.append(synthetic_frame(camera, index, count, width, height))
+        yield cache[-1]
+    while True:
+        yield from cache
+
+
+def mjpeg_frames(path: str, loop: bool = True) -> Iterator[bytes]:
+    """MJPEG 파일의 프레임 (loop: 끝나면 처음부터)"""
+    parser = MJPEGFrameParser()
+    while True:
+        found = False
+        with open(path, "rb", buffering=0) as f:
+            while parser.read_from(f.fileno()) > 0:
+                for frame in parser.frames_available():
+                    found = True
+                    yield frame.data
+        parser.reset()
+        if not loop or not found:
+            return
+
+
+def resize_jpeg(data: bytes, width: int, height: int) -> bytes:
+    """요청 크기로 다시 인코딩 (opencv 없거나 크기가 같으면 그대로)"""
+    if cv2 is None:
+        return data
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    if image is None or image.shape[:2] == (height, width):
+        return data
+    image = cv2.resize(image, (width, height), interpolation=cv2.INTER_LINEAR)
+    ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 90])
+    return encoded.tobytes() if ok else data
+
+
+def frame_source(args) -> Iterator[bytes]:
+    if args.source == "synthetic":
+        if cv2 is None:
+            raise SystemExit("합성 소스에는 opencv-python이 필요합니다")
+        return synthetic_frames(args.camera, args.width, args.height, args.framerate)
+    return mjpeg_frames(args.source, loop=not args.still)
+
+
+def write_still(args):
+    data = next(frame_source(args), None)
+    if data is None:
+        raise SystemExit(f"프레임 없음: {args.source}")
+    with open(args.output, "wb") as f:
+        f.write(resize_jpeg(data, args.width, args.height))
+
+
+def stream(args):
+    out = open(args.output, "wb", buffering=0) if args.output != "-" else os.fdopen(1, "wb", buffering=0)
+    interval = 1.0 / args.framerate
+    next_at = time.monotonic()
+    try:
+        for seq, data in enumerate(frame_source(args)):
+            out.write(stamp(data, seq, time.time()))
+            next_at += interval
+            delay = next_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_at = time.monotonic()  # 밀린 만큼 몰아 보내지 않음
+    except BrokenPipeError:  # 읽는 쪽(SharedStreamManager)이 FIFO를 닫음
+        pass
+    finally:
+        try:
+            out.close()
+        except BrokenPipeError:
+            pass
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--source", default="synthetic", help='"synthetic" 또는 MJPEG 파일')
+    ap.add_argument("--output", required=True, help='FIFO/파일 경로 또는 "-" (stdout)')
+    ap.add_argument("--camera", type=int, default=0)
+    ap.add_argument("--width", type=int, default=640)
+    ap.add_argument("--height", type=int, default=480)
+    ap.add_argument("--framerate", type=float, default=30)
+    ap.add_argument("--still", action="store_true", help="한 장만 저장하고 종료")
+    args = ap.parse_args()
+
+    if args.still:
+        write_still(args)
+    else:
+        stream(args)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        sys.exit(0)
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+녹화/스냅샷 보존 정책 - 디렉토리별/전체 용량 할당과 디스크 사용률 워터마크
+
+파일 카탈로그의 (종류, 생성 시각) 인덱스를 오래된 순 큐로 사용하므로 파일 하나를
+지울 때마다 B-tree 탐색 한 번(O(log n))이면 되고, 종류별 총 용량은 카탈로그가 유지하는
+카운터를 그대로 읽는다. 디렉토리를 훑거나 파일마다 stat 하지 않는다.
+
+정리 규칙 (interval초마다 또는 check_now() 호출 시):
+  - 종류별 할당량: 사용량이 할당량을 넘으면 할당량 × low_ratio까지 오래된 파일 삭제
+  - 전체 할당량: 세 종류 합이 넘으면 evict_types 중 오래된 파일부터 삭제
+  - 디스크 워터마크: 사용률이 high_percent 이상이면 low_percent 아래까지 evict_types 삭제
+쓰는 중인 파일(protected_paths)은 건너뛴다.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set
+
+import psutil
+
+from catalog import FileCatalog, TYPE_DIRS
+
+GB = 1024 ** 3
+
+
+def _env_gb(name: str) -> Optional[int]:
+    """용량 환경 변수 (GB, 0 또는 미설정이면 제한 없음)"""
+    value = float(os.environ.get(name, "0"))
+    return int(value * GB) if value > 0 else None
+
+
+class RetentionManager:
+    """백그라운드 보존 정책 실행기"""
+
+    def __init__(self, catalog: FileCatalog, static_dir: Path,
+                 quotas: Optional[Dict[str, Optional[int]]] = None,
+                 total_quota: Optional[int] = None,
+                 high_percent: float = 90.0, low_percent: float = 80.0,
+                 low_ratio: float = 0.9, evict_types: Optional[List[str]] = None,
+                 interval: float = 30.0,
+                 protected_paths: Optional[Callable[[], Set[str]]] = None,
+                 on_evict: Optional[Callable[[str], None]] = None):
+        self.catalog = catalog
+        self.static_dir = static_dir
+        self.quotas = quotas or {}  # 종류 → 바이트 (None이면 제한 없음)
+        self.total_quota = total_quota
+        self.high_percent = high_percent
+        self.low_percent = low_percent
+        self.low_ratio = low_ratio
+        self.evict_types = evict_types or ["rec"]  # 전체/디스크 한도 초과 시 지울 종류
+        self.interval = interval
+        self.protected_paths = protected_paths or (lambda: set())
+        self.on_evict = on_evict  # 삭제된 파일의 상대 경로 (썸네일 등 부속 파일 정리)
+
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # 통계
+        self.bytes_reclaimed = 0
+        self.files_evicted = 0
+        self.reclaimed_by_type: Dict[str, int] = {file_type: 0 for file_type in TYPE_DIRS}
+        self.skipped_protected = 0
+        self.last_run: Optional[float] = None
+        self.last_run_ms: Optional[float] = None
+        self.last_evictions: List[dict] = []
+        # 유입 속도 추정용 (시각, 누적 유입 바이트 = 현재 총량 + 누적 삭제량)
+        self._ingest_samples: deque = deque(maxlen=64)
+
+    @classmethod
+    def from_env(cls, catalog: FileCatalog, static_dir: Path,
+                 protected_paths: Optional[Callable[[], Set[str]]] = None,
+                 on_evict: Optional[Callable[[str], None]] = None) -> "RetentionManager":
+        """FABCAM_QUOTA_*_GB, FABCAM_DISK_HIGH/LOW_PERCENT, FABCAM_RETENTION_INTERVAL 환경 변수로 생성"""
+        return cls(
+            catalog,
+            static_dir,
+            quotas={
+                "rec": _env_gb("FABCAM_QUOTA_REC_GB"),
+                "video": _env_gb("FABCAM_QUOTA_VIDEOS_GB"),
+                "image": _env_gb("FABCAM_QUOTA_IMAGES_GB"),
+            },
+            total_quota=_env_gb("FABCAM_QUOTA_TOTAL_GB"),
+            high_percent=float(os.environ.get("FABCAM_DISK_HIGH_PERCENT", "90")),
+            low_percent=float(os.environ.get("FABCAM_DISK_LOW_PERCENT", "80")),
+            interval=float(os.environ.get("FABCAM_RETENTION_INTERVAL", "30")),
+            protected_paths=protected_paths,
+            on_evict=on_evict
+        )
+
+    def start(self):
+        """백그라운드 정리 스레드 시작"""
+        if self._thread:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._worker, daemon=True)
+        self._thread.start()
+        print(f"🧹 보존 정책 시작 (디스크 {self.high_percent}% → {self.low_percent}%, {self.interval}초 간격)")
+
+    def stop(self):
+        """백그라운드 정리 스레드 중지"""
+        if not self._thread:
+            return
+        self._stop_event.set()
+        self._wake_event.set()
+        self._thread.join(timeout=5)
+        self._thread = None
+
+    def check_now(self):
+        """다음 주기를 기다리지 않고 정리 (세그먼트 완료 등)"""
+        self._wake_event.set()
+
+    def _worker(self):
+        while not self._stop_event.is_set():
+            self.run_once()
+            self._wake_event.wait(self.interval)
+            self._wake_event.clear()
+
+    def run_once(self) -> List[dict]:
+        """할당량/워터마크 검사 후 필요한 만큼 삭제, 삭제 목록 반환"""
+        with self._lock:
+            started = time.perf_counter()
+            evicted: List[dict] = []
+            try:
+                summary = self.catalog.get_summary()
+
+                # 종류별 할당량
+                for file_type, quota in self.quotas.items():
+                    used = summary[file_type]["bytes"]
+                    if quota and used > quota:
+                        evicted += self._evict([file_type], used - int(quota * self.low_ratio))
+
+                # 전체 할당량
+                if self.total_quota:
+                    used = sum(v["bytes"] for v in self.catalog.get_summary().values())
+                    if used > self.total_quota:
+                        evicted += self._evict(self.evict_types, used - int(self.total_quota * self.low_ratio))
+
+                # 디스크 워터마크
+                disk = psutil.disk_usage(str(self.static_dir))
+                if disk.percent >= self.high_percent:
+                    target_used = disk.total * self.low_percent / 100
+                    evicted += self._evict(self.evict_types, int(disk.used - target_used))
+
+            except Exception as e:
+                print(f"❌ 보존 정책 실행 오류: {e}")
+
+            now = time.time()
+            total_bytes = sum(v["bytes"] for v in self.catalog.get_summary().values())
+            self._ingest_samples.append((now, total_bytes + self.bytes_reclaimed))
+            self.last_run = now
+            self.last_run_ms = round((time.perf_counter() - started) * 1000, 2)
+            if evicted:
+                self.last_evictions = evicted[-20:]
+                freed = sum(item["size"] for item in evicted)
+                print(f"🗑️ 보존 정책: {len(evicted)}개 파일 삭제, {freed / (1024 ** 2):.1f}MB 확보")
+            return evicted
+
+    def _evict(self, file_types: List[str], need: int) -> List[dict]:
+        """오래된 파일부터 need 바이트 이상 삭제 (쓰는 중인 파일 제외)"""
+        evicted: List[dict] = []
+        freed = 0
+        protected = self.protected_paths()
+        after = None
+        while freed < need:
+            batch = self.catalog.oldest(file_types, limit=64, after=after)
+            if not batch:
+                break
+            removed_paths = []
+            for item in batch:
+                after = (item["created_at"], item["id"])
+                if item["path"] in protected:
+                    self.skipped_protected += 1
+                    continue
+                try:
+                    (self.static_dir / item["path"]).unlink()
+                except FileNotFoundError:
+                    pass  # 이미 지워진 파일은 카탈로그에서만 제거
+                except OSError as e:
+                    print(f"⚠️ 파일 삭제 실패: {item['path']} ({e})")
+                    continue
+                removed_paths.append(item["path"])
+                if self.on_evict:
+                    self.on_evict(item["path"])
+                evicted.append(item)
+                freed += item["size"]
+                self.bytes_reclaimed += item["size"]
+                self.reclaimed_by_type[item["file_type"]] += item["size"]
+                self.files_evicted += 1
+                if freed >= need:
+                    break
+            self.catalog.remove_paths(removed_paths)
+        return evicted
+
+    def _ingest_rate(self) -> Optional[float]:
+        """최근 유입 속도 (바이트/초)"""
+        if len(self._ingest_samples) < 2:
+            return None
+        (t0, b0), (t1, b1) = self._ingest_samples[0], self._ingest_samples[-1]
+        if t1 - t0 <= 0:
+            return None
+        return max(0.0, (b1 - b0) / (t1 - t0))
+
+    def get_stats(self) -> dict:
+        """보존 정책 상태: 사용량, 할당량, 확보한 용량, 가득 찰 때까지 남은 시간"""
+        summary = self.catalog.get_summary()
+        disk = psutil.disk_usage(str(self.static_dir))
+        rate = self._ingest_rate()
+
+        seconds_to_full = None
+        seconds_to_high_watermark = None
+        if rate:
+            seconds_to_full = round(disk.free / rate)
+            seconds_to_high_watermark = round(max(0.0, disk.total * self.high_percent / 100 - disk.used) / rate)
+
+        return {
+            "usage": {
+                file_type: {
+                    "files": values["count"],
+                    "bytes": values["bytes"],
+                    "quota": self.quotas.get(file_type)
+                }
+                for file_type, values in summary.items()
+            },
+            "total_bytes": sum(v["bytes"] for v in summary.values()),
+            "total_quota": self.total_quota,
+            "disk": {
+                "percent": disk.percent,
+                "free_bytes": disk.free,
+                "high_percent": self.high_percent,
+                "low_percent": self.low_percent
+            },
+            "evict_types": self.evict_types,
+            "bytes_reclaimed": self.bytes_reclaimed,
+            "reclaimed_by_type": dict(self.reclaimed_by_type),
+            "files_evicted": self.files_evicted,
+            "skipped_protected": self.skipped_protected,
+            "ingest_bytes_per_sec": round(rate, 1) if rate is not None else None,
+            # 삭제 없이 현재 속도로 쓸 때 (디스크가 가득 참 / 워터마크 도달)
+            "seconds_to_full": seconds_to_full,
+            "seconds_to_high_watermark": seconds_to_high_watermark,
+            "last_run": self.last_run,
+            "last_run_ms": self.last_run_ms,
+            "last_evictions": [item["path"] for item in self.last_evictions]
+        }
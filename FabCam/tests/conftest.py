@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# 모듈이 패키지가 아니라 앱 디렉토리에 바로 있으므로 (benchmarks/와 같은 방식)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,197 @@
+"""
+제어 API가 실시간 프레임 전달을 막지 않는지 - 스냅샷/녹화 요청이 진행 중일 때 프레임 간격과 상태 응답 시간
+
+카메라와 ffmpeg 없이 실행되도록 모두 대역으로 바꾼다.
+  - 캡처: 재생 백엔드가 작은 MJPEG 파일을 30 fps로 반복 출력
+  - 스틸 명령: rpicam-still처럼 STILL_SECONDS초 걸림 (그동안 해당 카메라 캡처는 중지됨)
+  - H.264 인코더: 입력 JPEG마다 합성 액세스 유닛을 내보내는 파이썬 프로세스
+
+서버(main.app)는 같은 프로세스의 스레드에서 띄운다. 이벤트 루프가 요청 처리 중에
+막히면 다른 카메라의 프레임 간격과 /api/camera/status 응답 시간이 요청 시간만큼 늘어난다.
+"""
+
+import asyncio
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+import uvicorn
+
+import main
+from backends import ReplayBackend
+from camera import H264Encoder, camera_manager
+from thumbnails import ThumbnailService
+
+APP_DIR = Path(__file__).resolve().parent.parent
+STILL_SECONDS = 1.0
+# 절대 시간 대신 잡아내려는 멈춤(스틸 촬영 시간)의 절반 - 부하가 걸린 CI에서도 루프가 막힌 경우만 실패
+MAX_STALL_MS = STILL_SECONDS * 1000 / 2
+
+# 디코딩하지 않으므로 SOI/EOI 사이에 0xFF가 없는 바이트면 충분
+FAKE_JPEG = b"\xff\xd8" + bytes(range(1, 255)) * 4 + b"\xff\xd9"
+
+# 입력 JPEG마다 액세스 유닛 하나 (30프레임마다 SPS/PPS/IDR, 나머지는 P 슬라이스)
+FAKE_ENCODER = f"""
+import sys
+sys.path.insert(0, {str(APP_DIR)!r})
+from mjpeg import MJPEGFrameParser
+
+parser = MJPEGFrameParser()
+out = sys.stdout.buffer
+count = 0
+while parser.read_from(0) > 0:
+    for frame in parser.frames_available():
+        if count % 30 == 0:
+            out.write(b"\\x00\\x00\\x00\\x01\\x67\\x42\\xc0\\x1e" + bytes(8) + b"\\x00\\x00\\x00\\x01\\x68\\xce\\x3c\\x80"
+                      + b"\\x00\\x00\\x00\\x01\\x65\\x88" + bytes(range(1, 200)))
+        else:
+            out.write(b"\\x00\\x00\\x00\\x01\\x41\\x9a" + bytes(range(1, 100)))
+        out.flush()
+        count += 1
+"""
+
+
+class SlowStillBackend(ReplayBackend):
+    """스틸 촬영이 rpicam-still처럼 오래 걸리는 재생 백엔드"""
+
+    def still_command(self, camera_num: int, width: int, height: int, output: str):
+        command = super().still_command(camera_num, width, height, output)
+        return [sys.executable, "-c", f"import subprocess, time; time.sleep({STILL_SECONDS}); "
+                                      f"subprocess.run({command!r}, check=True)"]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    """대역 백엔드/인코더와 임시 저장소로 서버 실행 (포트 반환)"""
+    source = tmp_path / "clip.mjpeg"
+    source.write_bytes(FAKE_JPEG)
+    static = tmp_path / "static"
+    monkeypatch.setattr(camera_manager, "backend", SlowStillBackend([str(source)], cameras=2, fps=30))
+    monkeypatch.setattr(camera_manager, "shared_streams", {})
+    monkeypatch.setattr(camera_manager, "base_dir", tmp_path)
+    monkeypatch.setattr(camera_manager, "snapshot_dir", static / "images")
+    monkeypatch.setattr(camera_manager, "video_dir", static / "videos")
+    monkeypatch.setattr(camera_manager, "rec_dir", static / "rec")
+    monkeypatch.setattr(camera_manager, "catalog_path", tmp_path / "data" / "catalog.db")
+    monkeypatch.setattr(camera_manager, "events_path", tmp_path / "data" / "events.db")
+    monkeypatch.setattr(camera_manager, "thumbnails", ThumbnailService(static, tmp_path / "data" / "thumbs"))
+    monkeypatch.setattr(H264Encoder, "select_codec", classmethod(lambda cls: "fake"))
+    monkeypatch.setattr(H264Encoder, "_build_command", lambda self, codec: [sys.executable, "-c", FAKE_ENCODER])
+
+    port = free_port()
+    instance = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=instance.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 15
+    while not instance.started:
+        assert time.monotonic() < deadline, "서버가 시작되지 않았습니다"
+        time.sleep(0.05)
+    try:
+        yield port
+    finally:
+        instance.should_exit = True
+        thread.join(timeout=15)
+        camera_manager.cleanup()
+
+
+async def http_request(port: int, method: str, path: str) -> tuple:
+    """(응답 시간 ms, 상태 코드)"""
+    started = time.perf_counter()
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: 0\r\nConnection: close\r\n\r\n".encode())
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return (time.perf_counter() - started) * 1000, int(response.split(b" ", 2)[1])
+
+
+async def viewer(port: int, camera: int, arrivals: list):
+    """MJPEG 스트림을 받아 프레임 도착 시각 기록 (취소될 때까지)"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET /video_feed/{camera} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+    await writer.drain()
+    try:
+        while True:
+            chunk = await reader.read(65536)
+            if not chunk:
+                return
+            # 파트 헤더마다 한 프레임
+            arrivals.extend([time.perf_counter()] * chunk.count(b"Content-Type: image/jpeg"))
+    finally:
+        writer.close()
+
+
+async def probe(port: int, samples: list):
+    """상태 API 응답 시간 주기 측정 (취소될 때까지)"""
+    while True:
+        started = time.perf_counter()
+        elapsed, status = await http_request(port, "GET", "/api/camera/status")
+        samples.append((started, elapsed))
+        await asyncio.sleep(0.05)
+
+
+def max_gap(arrivals: list, start: float, end: float) -> float:
+    """구간 안에서 프레임이 끊긴 최장 시간 ms (구간 직전 프레임과 구간 끝까지 포함)"""
+    window = [t for t in arrivals if t < start][-1:] + [t for t in arrivals if start <= t <= end] + [end]
+    return max(b - a for a, b in zip(window, window[1:])) * 1000
+
+
+def test_frames_keep_flowing_during_snapshot_and_record_start(server):
+    async def scenario():
+        arrivals = {0: [], 1: []}
+        samples = []
+        tasks = [asyncio.create_task(viewer(server, camera, arrivals[camera])) for camera in (0, 1)]
+        tasks.append(asyncio.create_task(probe(server, samples)))
+
+        # 두 카메라 모두 프레임이 들어올 때까지 (카메라 감지/캡처 시작)
+        deadline = time.perf_counter() + 15
+        while not (arrivals[0] and arrivals[1]):
+            assert time.perf_counter() < deadline, "스트림이 시작되지 않았습니다"
+            await asyncio.sleep(0.1)
+        await asyncio.sleep(0.5)
+
+        results = {}
+        actions = [
+            ("snapshot_hd", "POST", "/api/snapshot/0?resolution=hd"),  # 스틸 명령 - 카메라 0 캡처 중지
+            ("record_start", "POST", "/api/recording/start"),
+        ]
+        for name, method, path in actions:
+            start = time.perf_counter()
+            elapsed, status = await http_request(server, method, path)
+            end = time.perf_counter()
+            results[name] = {
+                "elapsed": elapsed,
+                "status": status,
+                "gap": {camera: max_gap(arrivals[camera], start, end) for camera in (0, 1)},
+                # 구간과 겹친 상태 요청 (구간 전에 보내 막힌 요청 포함)
+                "status_max": max((ms for t, ms in samples if t <= end and t + ms / 1000 >= start), default=0.0)
+            }
+            await asyncio.sleep(0.5)
+
+        await http_request(server, "POST", "/api/recording/stop")
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return results
+
+    results = asyncio.run(scenario())
+
+    snapshot = results["snapshot_hd"]
+    assert snapshot["status"] == 200
+    assert snapshot["elapsed"] >= STILL_SECONDS * 1000  # 요청이 끝날 때까지 측정 구간이 이어짐
+    assert snapshot["gap"][1] < MAX_STALL_MS  # 카메라 0이 스틸을 찍는 동안에도 카메라 1은 계속
+    assert snapshot["status_max"] < MAX_STALL_MS
+
+    record = results["record_start"]
+    assert record["status"] == 200
+    assert max(record["gap"].values()) < MAX_STALL_MS
+    assert record["status_max"] < MAX_STALL_MS
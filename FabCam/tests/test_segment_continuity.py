@@ -0,0 +1,98 @@
+"""
+블랙박스 세그먼트 연속성 - 합성 H.264 스트림으로 세그먼트 사이 공백 검사
+
+SPS/PPS/IDR 및 P 슬라이스 NAL로 만든 합성 Annex-B 스트림을 임의 크기 청크로
+H264AccessUnitParser에 넣고, 나온 액세스 유닛을 ContinuousRecorder에 전달한다.
+모든 세그먼트가 키프레임으로 시작하는지, 프레임 누락이 없는지, 이전 세그먼트의
+마지막 프레임과 다음 세그먼트의 첫 프레임 간격이 한 프레임 간격인지 확인한다.
+"""
+
+import random
+from pathlib import Path
+from typing import Callable, Dict
+
+import pytest
+
+from camera import ContinuousRecorder
+from h264 import AccessUnit, H264AccessUnitParser
+
+SPS = b"\x00\x00\x00\x01\x67\x42\xc0\x1e" + bytes(8)
+PPS = b"\x00\x00\x00\x01\x68\xce\x3c\x80"
+FPS = 30
+
+
+class FakeStream:
+    """캡처 브로커 대역 - 녹화 소비자 등록만 흉내냄"""
+
+    def __init__(self):
+        self.sinks: Dict[str, Callable[[AccessUnit], None]] = {}
+
+    def add_sink(self, name: str, callback: Callable[[AccessUnit], None]) -> bool:
+        self.sinks[name] = callback
+        return True
+
+    def remove_sink(self, name: str):
+        self.sinks.pop(name, None)
+
+
+def synthetic_stream(frames: int, gop: int, rng: random.Random) -> bytes:
+    """GOP마다 IDR이 오는 합성 Annex-B 스트림"""
+    out = bytearray()
+    for i in range(frames):
+        payload = rng.randbytes(rng.randint(200, 2000)).replace(b"\x00", b"\x01")
+        if i % gop == 0:
+            out += SPS + PPS + b"\x00\x00\x00\x01\x65\x88" + payload
+        else:
+            out += b"\x00\x00\x00\x01\x41\x9a" + payload
+    return bytes(out)
+
+
+def record(tmp_path: Path, seconds: float, segment: float, gop: int) -> tuple:
+    """합성 스트림을 임의 크기 청크로 녹화 (입력 프레임 수, 세그먼트 목록)"""
+    rng = random.Random(0)
+    total = int(seconds * FPS)
+    data = synthetic_stream(total, gop, rng)
+
+    # 캡처 시각: fps 간격의 가상 시계
+    ticks = iter(i / FPS for i in range(total + 1))
+    parser = H264AccessUnitParser(clock=lambda: next(ticks))
+
+    stream = FakeStream()
+    recorder = ContinuousRecorder(0, tmp_path, stream, segment_duration=segment)
+    recorder.start_continuous_recording()
+    sink = stream.sinks[ContinuousRecorder.SINK_NAME]
+
+    pos = 0
+    while pos < len(data):
+        size = rng.randint(1, 8192)
+        for au in parser.feed(data[pos:pos + size]):
+            sink(au)
+        pos += size
+    for au in parser.flush():
+        sink(au)
+    recorder.stop_continuous_recording()
+    return total, list(recorder.segments)
+
+
+@pytest.mark.parametrize("segment, gop", [(3, 30), (2, 45), (5, 30)])
+def test_segments_are_gapless_and_keyframe_aligned(tmp_path, segment, gop):
+    total, segments = record(tmp_path, seconds=20, segment=segment, gop=gop)
+
+    assert len(segments) > 1
+    for seg in segments:
+        head = (tmp_path / seg["filename"]).read_bytes()[:len(SPS)]
+        assert head == SPS, f"{seg['filename']}: SPS로 시작하지 않음"
+        if seg["gap_before"] is not None:
+            assert seg["gap_before"] == pytest.approx(1.0 / FPS, abs=1e-3), seg["filename"]
+    assert sum(seg["frames"] for seg in segments) == total
+
+
+def test_segments_within_one_second_get_distinct_files(tmp_path):
+    # 0.2초 세그먼트 → 같은 초에 여러 세그먼트가 시작됨
+    total, segments = record(tmp_path, seconds=2, segment=0.2, gop=3)
+
+    names = [seg["filename"] for seg in segments]
+    assert len(segments) > 2
+    assert len(set(names)) == len(names)
+    assert sorted(path.name for path in tmp_path.glob("rec_0_*.mp4")) == sorted(names)
+    assert all((tmp_path / seg["filename"]).stat().st_size == seg["size"] for seg in segments)
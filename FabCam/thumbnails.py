@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+스냅샷/녹화 썸네일 - 작업자 풀에서 생성하고 디스크에 캐시
+
+  - 스냅샷: 저장 직후 작업자 풀에 등록, JPEG 축소 디코딩(IMREAD_REDUCED_COLOR_*)으로
+    원본 해상도 전체를 풀지 않고 썸네일 크기에 가깝게 읽음
+  - 녹화: 녹화 시작 시점의 실시간 스트림 JPEG 프레임을 포스터로 사용
+  - 기존 파일: 썸네일이 처음 요청될 때 생성 (녹화 파일은 첫 프레임 디코딩)
+
+캐시는 data/thumbs 아래에 static과 같은 경로 구조로 저장하고, ETag는 썸네일
+내용 해시를 사용한다.
+"""
+
+import hashlib
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+try:
+    import cv2
+    import numpy as np
+except ImportError:  # opencv-python 미설치 시 썸네일 비활성화
+    cv2 = None
+
+THUMB_WIDTH = 320
+JPEG_QUALITY = 70
+
+VIDEO_SUFFIXES = (".mp4", ".h264")
+
+
+class ThumbnailService:
+    """썸네일 생성 작업자 풀과 디스크 캐시"""
+
+    def __init__(self, static_dir: Path, cache_dir: Path, workers: int = 2, width: int = THUMB_WIDTH):
+        self.static_dir = static_dir
+        self.cache_dir = cache_dir
+        self.width = width
+        self.enabled = cv2 is not None
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="thumbnail")
+        self._pending: Dict[str, Future] = {}  # 상대 경로 → 생성 작업
+        self._etags: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+        # 통계
+        self.generated = 0
+        self.failed = 0
+        self.generate_ms_total = 0.0
+
+        if not self.enabled:
+            print("⚠️ opencv-python이 없어 썸네일을 생성하지 않습니다")
+
+    def _cache_path(self, rel: str) -> Path:
+        return self.cache_dir / f"{rel}.jpg"
+
+    def submit(self, rel: str, jpeg: Optional[bytes] = None) -> Optional[Future]:
+        """썸네일 생성 예약 (jpeg: 녹화 포스터로 쓸 스트림 프레임, 없으면 원본 파일에서 생성)"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            future = self._pending.get(rel)
+            if future is not None:
+                return future
+            future = self._executor.submit(self._generate, rel, jpeg)
+            self._pending[rel] = future
+        # 잠금 밖에서 등록 (이미 끝난 작업이면 콜백이 바로 이 스레드에서 불려 _lock을 다시 잡음)
+        future.add_done_callback(lambda _, rel=rel: self._done(rel))
+        return future
+
+    def submit_path(self, path: Path, jpeg: Optional[bytes] = None) -> Optional[Future]:
+        """static 아래 절대 경로로 생성 예약"""
+        return self.submit(path.relative_to(self.static_dir).as_posix(), jpeg)
+
+    def _done(self, rel: str):
+        with self._lock:
+            self._pending.pop(rel, None)
+
+    def _generate(self, rel: str, jpeg: Optional[bytes]) -> Optional[bytes]:
+        """썸네일 생성 후 캐시에 저장 (작업자 스레드)"""
+        started = time.perf_counter()
+        try:
+            image = self._decode(rel, jpeg)
+            if image is None:
+                self.failed += 1
+                return None
+
+            height, width = image.shape[:2]
+            if width > self.width:
+                image = cv2.resize(image, (self.width, round(height * self.width / width)),
+                                   interpolation=cv2.INTER_AREA)
+            ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+            if not ok:
+                self.failed += 1
+                return None
+
+            data = encoded.tobytes()
+            cache_path = self._cache_path(rel)
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = cache_path.with_suffix(".tmp")
+            tmp_path.write_bytes(data)
+            tmp_path.replace(cache_path)
+            with self._lock:
+                self._etags[rel] = self._etag(data)
+
+            self.generated += 1
+            self.generate_ms_total += (time.perf_counter() - started) * 1000
+            return data
+
+        except Exception as e:
+            self.failed += 1
+            print(f"썸네일 생성 오류 ({rel}): {e}")
+            return None
+
+    def _decode(self, rel: str, jpeg: Optional[bytes]):
+        """원본을 썸네일 크기에 가깝게 디코딩"""
+        if jpeg is not None:
+            return cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), self._reduced_flag(640))
+
+        source = self.static_dir / rel
+        if source.suffix.lower() in VIDEO_SUFFIXES:
+            capture = cv2.VideoCapture(str(source))
+            try:
+                ok, frame = capture.read()
+            finally:
+                capture.release()
+            return frame if ok else None
+
+        # 파일명의 해상도 폴더(예: 1920x1080)로 축소 배율 선택
+        folder = Path(rel).parent.name
+        source_width = int(folder.split("x")[0]) if "x" in folder and folder.split("x")[0].isdigit() else 0
+        return cv2.imread(str(source), self._reduced_flag(source_width))
+
+    def _reduced_flag(self, source_width: int) -> int:
+        """썸네일 폭보다 작아지지 않는 가장 큰 JPEG 축소 디코딩 배율"""
+        for factor, flag in ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4),
+                             (2, cv2.IMREAD_REDUCED_COLOR_2)):
+            if source_width and source_width // factor >= self.width:
+                return flag
+        return cv2.IMREAD_COLOR
+
+    @staticmethod
+    def _etag(data: bytes) -> str:
+        return '"' + hashlib.blake2b(data, digest_size=12).hexdigest() + '"'
+
+    def get(self, rel: str) -> Optional[Tuple[bytes, str]]:
+        """캐시된 썸네일 (내용, ETag) - 없으면 None (요청 경로에서 디코딩하지 않음)"""
+        try:
+            data = self._cache_path(rel).read_bytes()
+        except OSError:
+            return None
+        with self._lock:
+            etag = self._etags.get(rel)
+            if etag is None:
+                etag = self._etags[rel] = self._etag(data)
+        return data, etag
+
+    def remove(self, rel: str):
+        """원본 삭제 시 썸네일도 삭제"""
+        with self._lock:
+            self._etags.pop(rel, None)
+        try:
+            self._cache_path(rel).unlink()
+        except OSError:
+            pass
+
+    def get_stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "width": self.width,
+            "generated": self.generated,
+            "failed": self.failed,
+            "pending": len(self._pending),
+            "avg_generate_ms": round(self.generate_ms_total / self.generated, 1) if self.generated else None
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)